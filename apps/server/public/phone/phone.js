@@ -7,6 +7,7 @@ import { installAudioUnlock, playSfx } from "/shared/audio.js";
 import { errorCode, humanizeErrorMessage } from "/shared/error-copy.js";
 import { computeVpBreakdownByPlayerId } from "/shared/vp-breakdown.js";
 import { supportsWebGL } from "/shared/render-capabilities.js";
+import { iconUrl } from "/shared/icon-url.js";
 import { createMomentQueue, detectMoments } from "/shared/moment-detector.js";
 import { scenarioDisplay } from "/shared/scenarios.js";
 import { getWhatsNextCopy } from "/shared/host-copy.js";
@@ -4046,11 +4047,11 @@ function renderDevCards(room, me, you) {
 
   // Dev card type to icon path mapping
   const DEV_CARD_ICONS = {
-    knight: '/shared/icons/dev-knight.png',
-    road_building: '/shared/icons/dev-road-building.png',
-    year_of_plenty: '/shared/icons/dev-year-of-plenty.png',
-    monopoly: '/shared/icons/dev-monopoly.png',
-    victory_point: '/shared/icons/dev-victory-point.png'
+    knight: iconUrl("dev-knight.png"),
+    road_building: iconUrl("dev-road-building.png"),
+    year_of_plenty: iconUrl("dev-year-of-plenty.png"),
+    monopoly: iconUrl("dev-monopoly.png"),
+    victory_point: iconUrl("dev-victory-point.png")
   };
 
   // In-hand playable cards.
@@ -4062,7 +4063,7 @@ function renderDevCards(room, me, you) {
       const name = titleDevCard(t);
       const label = n === 1 ? name : `${name} ×${n}`;
       const disabled = !canPlay ? "disabled" : "";
-      const iconSrc = DEV_CARD_ICONS[t] || '/shared/icons/dev-card-back.png';
+      const iconSrc = DEV_CARD_ICONS[t] || iconUrl("dev-card-back.png");
       return `<div class="devCardRow">
         <img src="${iconSrc}" alt="" class="devCardIcon" />
         <div class="devCardLabel">${escapeHtml(label)}</div>
@@ -4082,7 +4083,7 @@ function renderDevCards(room, me, you) {
       const n = parseNonNegativeInt(newCounts[t] ?? 0);
       const name = titleDevCard(t);
       const label = n === 1 ? name : `${name} ×${n}`;
-      const iconSrc = DEV_CARD_ICONS[t] || '/shared/icons/dev-card-back.png';
+      const iconSrc = DEV_CARD_ICONS[t] || iconUrl("dev-card-back.png");
       return `<div class="devCardRow">
         <img src="${iconSrc}" alt="" class="devCardIcon" />
         <div class="devCardLabel">${escapeHtml(label)}</div>
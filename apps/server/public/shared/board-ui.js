@@ -1,3 +1,5 @@
+import { iconUrl } from "/shared/icon-url.js";
+
 function resourceFill(resource) {
   switch (resource) {
     case "wood":
@@ -339,7 +341,7 @@ export function createBoardView(container, board) {
     const iconSize = hexSize * 0.9;
     robberIcon.setAttribute("class", "robber-icon");
     setSvgAttrs(robberIcon, {
-      href: "/shared/icons/robber.png",
+      href: iconUrl("robber.png"),
       x: fmt2(Number(h.center?.x) - iconSize / 2),
       y: fmt2(Number(h.center?.y) - iconSize / 2),
       width: fmt2(iconSize),
@@ -402,7 +404,7 @@ export function createBoardView(container, board) {
     const boatImg = svgEl("image");
     boatImg.setAttribute("class", "port-boat");
     setSvgAttrs(boatImg, {
-      href: `/shared/icons/port-boat-${kind}.png`,
+      href: iconUrl(`port-boat-${kind}.png`),
       x: fmt2(px - boatSize / 2),
       y: fmt2(py - boatSize / 2),
       width: fmt2(boatSize),
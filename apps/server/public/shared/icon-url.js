@@ -0,0 +1,23 @@
+// Icon URLs through the server's content-hash manifest, so repeat visits load icons from
+// the browser cache. The server inlines { "version": 1, "icons": { "<name>": "<hashed name>" } }
+// into each page as <script type="application/json" id="icon-manifest">; without it
+// (tests, or a page served some other way) the plain URL is used.
+
+let cachedIcons = null;
+
+function manifestIcons() {
+  if (cachedIcons != null) return cachedIcons;
+  try {
+    const el = typeof document !== "undefined" ? document.getElementById("icon-manifest") : null;
+    const icons = el ? JSON.parse(el.textContent || "{}")?.icons : null;
+    cachedIcons = icons && typeof icons === "object" ? icons : {};
+  } catch {
+    cachedIcons = {};
+  }
+  return cachedIcons;
+}
+
+export function iconUrl(name) {
+  const hashed = manifestIcons()[name];
+  return `/shared/icons/${typeof hashed === "string" ? hashed : name}`;
+}
@@ -15,6 +15,7 @@ import { scenarioDisplay } from "/shared/scenarios.js";
 import { getSettings, initSettings, onSettingsChange, setSettings } from "/shared/settings.js";
 import { installAudioUnlock, playSfx, setMusicMode, preloadMusic } from "/shared/audio.js";
 import { supportsWebGL } from "/shared/render-capabilities.js";
+import { iconUrl } from "/shared/icon-url.js";
 import { createMomentQueue, detectMoments } from "/shared/moment-detector.js";
 import { createShowLayer } from "/tv/show-layer.js";
 import { createSegmentTracker, getSegment, hostCopyForMoment } from "/shared/host-copy.js";
@@ -583,21 +584,21 @@ function playerRow(
     if (knights > 0) {
       const knightClass = hasLargestArmy ? "playerBadge award" : "playerBadge muted";
       badges.push(
-        `<span class="${knightClass}"><img src="/shared/icons/dev-knight.png" class="badgeIcon" alt="Knights">${knights}</span>`
+        `<span class="${knightClass}"><img src="${iconUrl("dev-knight.png")}" class="badgeIcon" alt="Knights">${knights}</span>`
       );
     }
 
     // Largest Army award
     if (hasLargestArmy) {
       badges.push(
-        `<img src="/shared/icons/award-largest-army.png" class="awardIcon" alt="Largest Army" title="Largest Army">`
+        `<img src="${iconUrl("award-largest-army.png")}" class="awardIcon" alt="Largest Army" title="Largest Army">`
       );
     }
 
     // Longest Road award
     if (hasLongestRoad) {
       badges.push(
-        `<img src="/shared/icons/award-longest-road.png" class="awardIcon" alt="Longest Road" title="Longest Road">`
+        `<img src="${iconUrl("award-longest-road.png")}" class="awardIcon" alt="Longest Road" title="Longest Road">`
       );
     }
 
@@ -15,6 +15,7 @@ const __dirname = path.dirname(__filename);
 const repoDir = path.join(__dirname, "../..");
 const publicDir = path.join(__dirname, "public");
 const buildDir = path.join(publicDir, "build");
+const iconsDir = path.join(publicDir, "shared", "icons");
 const vendorThreeDir = path.join(repoDir, "node_modules", "three", "build");
 const dataDir = process.env.DATA_DIR ? path.resolve(String(process.env.DATA_DIR)) : path.join(__dirname, "data");
 const persistRoomsDir = path.join(dataDir, "rooms");
@@ -1092,6 +1093,7 @@ function contentTypeFor(filePath) {
     case ".ico":
       return "image/x-icon";
     case ".map":
+    case ".json":
       return "application/json; charset=utf-8";
     default:
       return "application/octet-stream";
@@ -1205,6 +1207,106 @@ async function serveBuildAssets(req, res, pathname) {
   }
 }
 
+// Content-hashed icon URLs: /shared/icons/brick.ddc9b5aa.png serves brick.png with a
+// one-year immutable Cache-Control. Hashes are computed here, not shipped: each file's
+// entry is revalidated against its mtime and size on every lookup, so an edited icon
+// gets a new URL on the next page load. Icon URLs in the HTML/CSS served below are
+// rewritten to the hashed names, and each page carries the map for /shared/icon-url.js.
+const ICON_HASH_LENGTH = 8;
+const ICON_FILE_RE = /^[\w-]+\.(?:png|svg)$/;
+const HASHED_ICON_RE = /^([\w-]+)\.([0-9a-f]{8})\.(png|svg)$/;
+const ICON_URL_RE = /\/shared\/icons\/([\w-]+\.(?:png|svg))\b/g;
+const REWRITE_ICON_EXTS = new Set([".html", ".css"]);
+
+// Logical icon name -> { mtimeMs, size, hashed }.
+const iconHashCache = new Map();
+
+function iconHash(buf) {
+  return crypto.createHash("sha256").update(buf).digest("hex").slice(0, ICON_HASH_LENGTH);
+}
+
+function hashedIconName(name, hash) {
+  const dot = name.lastIndexOf(".");
+  return `${name.slice(0, dot)}.${hash}${name.slice(dot)}`;
+}
+
+async function iconManifest() {
+  // { logical name: hashed name } for every icon file currently on disk.
+  let names;
+  try {
+    names = (await readdir(iconsDir)).filter((name) => ICON_FILE_RE.test(name));
+  } catch {
+    return new Map();
+  }
+  const icons = new Map();
+  await Promise.all(
+    names.map(async (name) => {
+      try {
+        const filePath = path.join(iconsDir, name);
+        const info = await stat(filePath);
+        if (!info.isFile()) return;
+        let entry = iconHashCache.get(name);
+        if (!entry || entry.mtimeMs !== info.mtimeMs || entry.size !== info.size) {
+          entry = { mtimeMs: info.mtimeMs, size: info.size, hashed: hashedIconName(name, iconHash(await readFile(filePath))) };
+          iconHashCache.set(name, entry);
+        }
+        icons.set(name, entry.hashed);
+      } catch {
+        iconHashCache.delete(name);
+      }
+    })
+  );
+  return icons;
+}
+
+function rewriteIconUrls(text, icons) {
+  return text.replace(ICON_URL_RE, (url, name) => (icons.has(name) ? `/shared/icons/${icons.get(name)}` : url));
+}
+
+function iconManifestJson(icons) {
+  return JSON.stringify({ version: 1, icons: Object.fromEntries([...icons].sort(([a], [b]) => (a < b ? -1 : 1))) });
+}
+
+async function serveIcons(req, res, pathname) {
+  const prefix = "/shared/icons/";
+  if (!pathname.startsWith(prefix)) return false;
+  const name = pathname.slice(prefix.length);
+
+  if (name === "icons-manifest.json") {
+    const body = iconManifestJson(await iconManifest());
+    res.writeHead(200, { "Content-Type": "application/json; charset=utf-8", "Cache-Control": "no-store" });
+    res.end(req.method === "HEAD" ? undefined : body);
+    return true;
+  }
+
+  const m = HASHED_ICON_RE.exec(name);
+  if (!m) return false;
+  const logical = `${m[1]}.${m[3]}`;
+  const filePath = path.join(iconsDir, logical);
+  let buf;
+  try {
+    buf = await readFile(filePath);
+  } catch {
+    notFound(res);
+    return true;
+  }
+  // The bytes just read are checked against the name, so an immutable response can
+  // never carry content other than what the hash says.
+  const hash = iconHash(buf);
+  if (hash !== m[2]) {
+    // A page from before the icon changed: send it to the current version, uncached.
+    res.writeHead(302, { Location: `${prefix}${hashedIconName(logical, hash)}`, "Cache-Control": "no-store" });
+    res.end();
+    return true;
+  }
+  res.writeHead(200, {
+    "Content-Type": contentTypeFor(filePath),
+    "Cache-Control": "public, max-age=31536000, immutable"
+  });
+  res.end(req.method === "HEAD" ? undefined : buf);
+  return true;
+}
+
 async function serveStatic(req, res, pathname) {
   let rel = pathname;
   if (rel === "/") rel = "/tv";
@@ -1221,7 +1323,18 @@ async function serveStatic(req, res, pathname) {
   try {
     const info = await stat(filePath);
     if (!info.isFile()) return notFound(res);
-    const buf = await readFile(filePath);
+    let buf = await readFile(filePath);
+    const ext = path.extname(filePath).toLowerCase();
+    if (REWRITE_ICON_EXTS.has(ext)) {
+      const icons = await iconManifest();
+      let text = rewriteIconUrls(buf.toString("utf8"), icons);
+      if (ext === ".html") {
+        // "<" is escaped so the JSON can never close the script element.
+        const script = `<script type="application/json" id="icon-manifest">${iconManifestJson(icons).replace(/</g, "\\u003c")}</script>`;
+        text = text.includes("</head>") ? text.replace("</head>", `${script}\n</head>`) : script + text;
+      }
+      buf = Buffer.from(text, "utf8");
+    }
     res.writeHead(200, {
       "Content-Type": contentTypeFor(filePath),
       "Cache-Control": "no-store"
@@ -2935,6 +3048,7 @@ const server = http.createServer(async (req, res) => {
     if (await serveBuildAssets(req, res, pathname)) return;
     // Serve vendor files (Three.js from node_modules for dev mode)
     if (await serveVendorThree(req, res, pathname)) return;
+    if (await serveIcons(req, res, pathname)) return;
     return serveStatic(req, res, pathname);
   }
 
@@ -375,3 +375,57 @@ test("server: house rules validation", { timeout: 20000 }, async (t) => {
   assert.equal(tooHighVP.json?.ok, false);
   assert.equal(tooHighVP.json?.error?.code, "BAD_VICTORY_POINTS_TO_WIN");
 });
+
+test("server: icons resolve through content-hashed URLs", { timeout: 20000 }, async (t) => {
+  const dataDir = await mkdtemp(path.join(os.tmpdir(), "catan-lan-test-icons-"));
+  t.after(async () => {
+    await rm(dataDir, { recursive: true, force: true });
+  });
+
+  const child = spawn("node", ["apps/server/server.js"], {
+    env: { ...process.env, PORT: "0", HOST: "127.0.0.1", DATA_DIR: dataDir, LOG_LEVEL: "info" },
+    stdio: ["ignore", "pipe", "pipe"]
+  });
+
+  t.after(async () => {
+    child.kill("SIGTERM");
+    await Promise.race([once(child, "exit"), new Promise((r) => setTimeout(r, 3000))]);
+  });
+
+  const listenLine = await waitForLine(child.stdout, (line) => line.includes("listening on http://"));
+  const baseUrl = listenLine.match(/listening on (http:\/\/\S+)/)[1];
+
+  const manifestRes = await fetch(`${baseUrl}/shared/icons/icons-manifest.json`);
+  assert.equal(manifestRes.status, 200);
+  assert.match(manifestRes.headers.get("content-type"), /application\/json/);
+  const manifest = await manifestRes.json();
+  const hashed = manifest.icons["brick.png"];
+  assert.match(hashed, /^brick\.[0-9a-f]{8}\.png$/);
+  assert.match(manifest.icons["robber.png"], /^robber\.[0-9a-f]{8}\.png$/);
+
+  // Hashed URL: same bytes as the logical file, cacheable forever.
+  const hashedRes = await fetch(`${baseUrl}/shared/icons/${hashed}`);
+  assert.equal(hashedRes.status, 200);
+  assert.equal(hashedRes.headers.get("cache-control"), "public, max-age=31536000, immutable");
+  const plainRes = await fetch(`${baseUrl}/shared/icons/brick.png`);
+  assert.equal(plainRes.headers.get("cache-control"), "no-store");
+  assert.deepEqual(Buffer.from(await hashedRes.arrayBuffer()), Buffer.from(await plainRes.arrayBuffer()));
+
+  // A hash that no longer matches the file redirects to the current one, uncached.
+  const stale = await fetch(`${baseUrl}/shared/icons/brick.00000000.png`, { redirect: "manual" });
+  assert.equal(stale.status, 302);
+  assert.equal(stale.headers.get("location"), `/shared/icons/${hashed}`);
+  assert.equal(stale.headers.get("cache-control"), "no-store");
+  const missing = await fetch(`${baseUrl}/shared/icons/nope.00000000.png`);
+  assert.equal(missing.status, 404);
+
+  // HTML and CSS reference the hashed names; pages carry the manifest for client JS.
+  const html = await (await fetch(`${baseUrl}/phone/`)).text();
+  assert.ok(html.includes(`/shared/icons/${hashed}`));
+  assert.ok(!html.includes("/shared/icons/brick.png"));
+  const inlined = html.match(/<script type="application\/json" id="icon-manifest">([^<]*)<\/script>/);
+  assert.ok(inlined);
+  assert.deepEqual(JSON.parse(inlined[1]), manifest);
+  const css = await (await fetch(`${baseUrl}/shared/styles.css`)).text();
+  assert.ok(css.includes(`/shared/icons/${manifest.icons["brick.svg"]}`));
+});
@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+
+"""
+Benchmarks for tools/generate_resource_icons.py.
+
+Times each Canvas primitive across shape sizes and rotations, plus every icon end to end,
+and compares the results against a committed baseline:
+
+  python3 tools/bench_resource_icons.py                    # run, compare, exit 1 on regression
+  python3 tools/bench_resource_icons.py --json out.json    # also write this run's results
+  python3 tools/bench_resource_icons.py --update-baseline  # re-record the baseline
+  python3 tools/bench_resource_icons.py --update-baseline -k numpy/icon  # re-record matching cases only
+
+A case with no baseline entry fails the comparison, so new cases have to be recorded.
+
+Standard library only (NumPy cases run when it is installed); no network access.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import math
+import platform
+import sys
+import time
+from pathlib import Path
+from typing import Callable
+
+import generate_resource_icons as gen
+
+BASELINE = Path(__file__).with_name("bench_resource_icons.baseline.json")
+
+# A benchmark case: (name, setup) where setup() returns (run, pixels). run() is the timed
+# body; pixels is the work one call does (shape bounding box, or canvas area), and run()
+# may return bytes whose length is reported.
+Case = tuple[str, Callable[[], tuple[Callable[[], object], int]]]
+
+
+def _ngon(cx: float, cy: float, r: float, n: int, angle: float) -> list[tuple[float, float]]:
+  return [(cx + r * math.cos(angle + 2 * math.pi * i / n), cy + r * math.sin(angle + 2 * math.pi * i / n)) for i in range(n)]
+
+
+def _painted(canvas_cls: type[gen.Canvas], size: int) -> gen.Canvas:
+  # A canvas with icon-like content, so downsampling/encoding don't see a blank buffer.
+  canvas = canvas_cls.create(size, size)
+  gen.record_icon(gen.draw_bricks_icon).replay(canvas, size / gen.ICON_SIZE)
+  return canvas
+
+
+def primitive_cases(backend: str) -> list[Case]:
+  canvas_cls = gen.canvas_backend(backend)
+  color = gen.rgba(180, 90, 60, 200)
+  w = 512
+  cases: list[Case] = []
+
+  for r in (4, 32, 128):
+    for deg in (0, 35):
+      def setup(r: float = r, deg: float = deg) -> tuple[Callable[[], object], int]:
+        canvas = canvas_cls.create(w, w)
+        return (lambda: canvas.fill_ellipse(w / 2, w / 2, r, r * 0.6, math.radians(deg), color)), (2 * r + 1) ** 2
+      cases.append((f"{backend}/fill_ellipse/r{r}/rot{deg}", setup))
+
+  for r in (16, 128):
+    for n in (5, 32):
+      for deg in (0, 35):
+        def setup(r: float = r, n: int = n, deg: float = deg) -> tuple[Callable[[], object], int]:
+          canvas = canvas_cls.create(w, w)
+          pts = _ngon(w / 2, w / 2, r, n, math.radians(deg))
+          return (lambda: canvas.fill_polygon(pts, color)), (2 * r + 1) ** 2
+        cases.append((f"{backend}/fill_polygon/r{r}/n{n}/rot{deg}", setup))
+
+  for length in (64, 400):
+    for width in (3, 24):
+      for deg in (0, 35):
+        def setup(length: float = length, width: float = width, deg: float = deg) -> tuple[Callable[[], object], int]:
+          canvas = canvas_cls.create(w, w)
+          dx = length / 2 * math.cos(math.radians(deg))
+          dy = length / 2 * math.sin(math.radians(deg))
+          box = (abs(2 * dx) + width + 1) * (abs(2 * dy) + width + 1)
+          return (lambda: canvas.stroke_segment(w / 2 - dx, w / 2 - dy, w / 2 + dx, w / 2 + dy, width, color)), int(box)
+        cases.append((f"{backend}/stroke_segment/len{length}/w{width}/rot{deg}", setup))
+
+  def setup_downsample() -> tuple[Callable[[], object], int]:
+    canvas = _painted(canvas_cls, gen.ICON_SIZE * 2)
+    return canvas.downsample2, canvas.w * canvas.h
+  cases.append((f"{backend}/downsample2/{gen.ICON_SIZE * 2}", setup_downsample))
+
+  for k in (4, 8):
+    for filt in gen.SSAA_FILTERS:
+      def setup_reduce(k: int = k, filt: str = filt) -> tuple[Callable[[], object], int]:
+        canvas = _painted(canvas_cls, gen.ICON_SIZE * k // 2)
+        return (lambda: canvas.downsample(k, filt)), canvas.w * canvas.h
+      cases.append((f"{backend}/downsample/{gen.ICON_SIZE * k // 2}/x{k}/{filt}", setup_reduce))
+
+  for png_filter in ("none", "adaptive"):
+    def setup_png(png_filter: str = png_filter) -> tuple[Callable[[], object], int]:
+      canvas = _painted(canvas_cls, gen.ICON_SIZE)
+      options = gen.PngOptions(filter=png_filter)
+      return (lambda: canvas.to_png_bytes(options)), canvas.w * canvas.h
+    cases.append((f"{backend}/to_png_bytes/{gen.ICON_SIZE}/{png_filter}", setup_png))
+  return cases
+
+
+def icon_cases(backend: str) -> list[Case]:
+  cases: list[Case] = []
+  for filename, draw_fn in gen.ICONS:
+    for aa in gen.AA_MODES:
+      def setup(draw_fn: Callable[[gen.DisplayList], None] = draw_fn, aa: str = aa) -> tuple[Callable[[], object], int]:
+        return (lambda: gen.render_icon(draw_fn, backend=backend, aa=aa)), gen.ICON_SIZE * gen.ICON_SIZE
+      cases.append((f"{backend}/icon/{filename.rpartition('.')[0]}/{aa}", setup))
+
+      def setup_cull(draw_fn: Callable[[gen.DisplayList], None] = draw_fn, aa: str = aa) -> tuple[Callable[[], object], int]:
+        return (lambda: gen.render_icon(draw_fn, backend=backend, aa=aa, cull=True)), gen.ICON_SIZE * gen.ICON_SIZE
+      cases.append((f"{backend}/icon/{filename.rpartition('.')[0]}/{aa}/cull", setup_cull))
+  return cases
+
+
+def time_case(setup: Callable[[], tuple[Callable[[], object], int]], min_time: float, repeat: int) -> dict[str, float | int]:
+  # Best-of-`repeat` seconds per call, each sample looping long enough to exceed min_time.
+  run, pixels = setup()
+  out = run()
+  loops = 1
+  while True:
+    t0 = time.perf_counter()
+    for _ in range(loops):
+      run()
+    elapsed = time.perf_counter() - t0
+    if elapsed >= min_time or loops >= 1 << 20:
+      break
+    loops *= 2 if elapsed <= 0 else max(2, min(10, math.ceil(min_time / elapsed)))
+  best = elapsed / loops
+  for _ in range(repeat - 1):
+    t0 = time.perf_counter()
+    for _ in range(loops):
+      run()
+    best = min(best, (time.perf_counter() - t0) / loops)
+  result: dict[str, float | int] = {"seconds": best, "pixels": pixels, "pixels_per_sec": pixels / best if best > 0 else 0.0}
+  if isinstance(out, (bytes, bytearray)):
+    result["bytes"] = len(out)
+  return result
+
+
+def compare(results: dict[str, dict], baseline: dict[str, dict], threshold: float) -> list[str]:
+  # Lines describing cases that got slower than baseline * (1 + threshold), whose output
+  # size changed (encoder output is deterministic, so any change is a behaviour change), or
+  # that have no baseline entry at all (a new case must be recorded before it can regress).
+  problems = []
+  for name, cur in results.items():
+    base = baseline.get(name)
+    if base is None:
+      problems.append(f"{name}: not in baseline")
+      continue
+    ratio = cur["seconds"] / base["seconds"] if base["seconds"] > 0 else 1.0
+    if ratio > 1.0 + threshold:
+      problems.append(f"{name}: {ratio:.2f}x slower ({base['seconds'] * 1e3:.3f} -> {cur['seconds'] * 1e3:.3f} ms)")
+    if "bytes" in base and cur.get("bytes") != base["bytes"]:
+      problems.append(f"{name}: output {base['bytes']} -> {cur.get('bytes')} bytes")
+  return problems
+
+
+def main(argv: list[str] | None = None) -> int:
+  parser = argparse.ArgumentParser(description="Benchmark the resource icon generator.")
+  parser.add_argument("--backend", action="append", choices=["python", "numpy"], help="backend(s) to benchmark (default: every installed one)")
+  parser.add_argument("-k", "--filter", default="", metavar="TEXT", help="only run cases whose name contains TEXT")
+  parser.add_argument("--min-time", type=float, default=0.05, metavar="S", help="minimum seconds per timing sample (default: 0.05)")
+  parser.add_argument("--repeat", type=int, default=3, metavar="N", help="timing samples per case; the fastest is kept (default: 3)")
+  parser.add_argument("--json", type=Path, metavar="PATH", help="write this run's results as JSON")
+  parser.add_argument("--baseline", type=Path, default=BASELINE, metavar="PATH", help=f"baseline to compare against (default: {BASELINE.name})")
+  parser.add_argument("--threshold", type=float, default=0.25, metavar="F", help="fail when a case is more than F slower than baseline, 0.25 = 25%% (default: 0.25)")
+  parser.add_argument("--update-baseline", action="store_true", help="write the results to --baseline instead of comparing")
+  args = parser.parse_args(argv)
+  if args.repeat < 1 or args.min_time < 0 or args.threshold < 0:
+    parser.error("--repeat must be >= 1, --min-time and --threshold >= 0")
+
+  backends = args.backend or list(gen.CANVAS_BACKENDS)
+  for backend in backends:
+    if backend not in gen.CANVAS_BACKENDS:
+      parser.error(f"--backend {backend} requires NumPy, which is not installed")
+  cases = [case for backend in backends for case in (*primitive_cases(backend), *icon_cases(backend)) if args.filter in case[0]]
+
+  results: dict[str, dict] = {}
+  for name, setup in cases:
+    results[name] = time_case(setup, args.min_time, args.repeat)
+    r = results[name]
+    size = f"  {r['bytes']} bytes" if "bytes" in r else ""
+    print(f"{name:<48} {r['seconds'] * 1e3:10.3f} ms  {r['pixels_per_sec'] / 1e6:9.2f} Mpx/s{size}", flush=True)
+
+  report = {
+    "version": 1,
+    "python": platform.python_version(),
+    "numpy": getattr(gen.np, "__version__", None),
+    "machine": platform.machine(),
+    "results": results,
+  }
+  if args.json:
+    args.json.write_text(json.dumps(report, indent=2, sort_keys=True) + "\n")
+  if args.update_baseline:
+    if args.filter:
+      # A filtered run only re-records its own cases; the rest of the baseline is kept.
+      try:
+        kept = json.loads(args.baseline.read_text())["results"]
+      except (OSError, ValueError, KeyError):
+        kept = {}
+      report["results"] = {**kept, **results}
+    args.baseline.write_text(json.dumps(report, indent=2, sort_keys=True) + "\n")
+    print("Wrote baseline:", args.baseline)
+    return 0
+
+  try:
+    baseline = json.loads(args.baseline.read_text())["results"]
+  except (OSError, ValueError, KeyError):
+    print("No baseline to compare against:", args.baseline)
+    return 0
+  problems = compare(results, baseline, args.threshold)
+  for line in problems:
+    print("FAIL", line)
+  if any(line.endswith("not in baseline") for line in problems):
+    print("Record new cases with --update-baseline -k TEXT; other baseline entries are kept.")
+  if not problems:
+    print(f"No regressions against {args.baseline.name} (threshold {args.threshold:.0%}).")
+  return 1 if problems else 0
+
+
+if __name__ == "__main__":
+  sys.exit(main())
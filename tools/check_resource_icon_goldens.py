@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+
+"""
+Golden-image check for tools/generate_resource_icons.py.
+
+Renders every icon through each installed Canvas backend (plain and with --cull), in both
+--aa modes, encodes it with every PNG filter, decodes the PNG again and compares the pixels
+with the committed goldens in tools/goldens/resource_icons/<aa>/:
+
+  python3 tools/check_resource_icon_goldens.py                  # exit 1 on any mismatch
+  python3 tools/check_resource_icon_goldens.py --tolerance 2    # allow +-2 per channel
+  python3 tools/check_resource_icon_goldens.py --update         # re-record the goldens
+
+On failure a heatmap per mismatching case is written to --diff-dir (brighter red = larger
+channel error). Standard library only; NumPy, when installed, speeds up diffing.
+"""
+
+from __future__ import annotations
+
+import argparse
+import io
+import sys
+import time
+from dataclasses import dataclass
+from pathlib import Path
+
+import generate_resource_icons as gen
+from resource_icons.png import PngWriter
+
+GOLDENS = Path(__file__).with_name("goldens") / "resource_icons"
+# The goldens are rendered with the reference backend and the default encoder.
+REFERENCE_BACKEND = "python"
+
+
+@dataclass
+class DiffStats:
+  max_error: tuple[int, int, int, int]  # Per channel, R G B A.
+  mean_error: float  # Mean absolute error over all channels.
+  mismatched: int  # Pixels with any channel off by more than the tolerance.
+  heat: bytes | None = None  # Max channel error per pixel, when requested.
+
+
+def diff_pixels(a: bytes, b: bytes, tolerance: int = 0, heat: bool = False) -> DiffStats:
+  # a and b are straight RGBA buffers of the same size.
+  if a == b:
+    return DiffStats((0, 0, 0, 0), 0.0, 0, bytes(len(a) // 4) if heat else None)
+  if gen.np is not None:
+    np = gen.np
+    d = np.abs(np.frombuffer(a, dtype=np.uint8).astype(np.int16) - np.frombuffer(b, dtype=np.uint8)).reshape(-1, 4)
+    worst = d.max(axis=1)
+    return DiffStats(
+      tuple(int(v) for v in d.max(axis=0)),  # type: ignore[arg-type]
+      float(d.mean()),
+      int(np.count_nonzero(worst > tolerance)),
+      worst.astype(np.uint8).tobytes() if heat else None,
+    )
+  channels = [[abs(x - y) for x, y in zip(a[c::4], b[c::4])] for c in range(4)]
+  worst_px = [max(px) for px in zip(*channels)]
+  return DiffStats(
+    tuple(max(ch) for ch in channels),  # type: ignore[arg-type]
+    sum(map(sum, channels)) / len(a),
+    sum(1 for v in worst_px if v > tolerance),
+    bytes(worst_px) if heat else None,
+  )
+
+
+def heatmap_png(w: int, h: int, heat: bytes) -> bytes:
+  # Black where the pixels match, red scaled up so that small errors stay visible.
+  lut = bytes(min(255, 64 + v * 8) if v else 0 for v in range(256))
+  rgba = bytearray(w * h * 4)
+  rgba[0::4] = heat.translate(lut)
+  rgba[3::4] = b"\xff" * (w * h)
+  out = io.BytesIO()
+  writer = PngWriter(out, w, h)
+  writer.write_rows(bytes(rgba))
+  writer.close()
+  return out.getvalue()
+
+
+def golden_path(aa: str, filename: str) -> Path:
+  return GOLDENS / aa / filename
+
+
+def update_goldens() -> None:
+  for aa in gen.AA_MODES:
+    (GOLDENS / aa).mkdir(parents=True, exist_ok=True)
+    for filename, draw_fn in gen.ICONS:
+      golden_path(aa, filename).write_bytes(gen.render_icon(draw_fn, backend=REFERENCE_BACKEND, aa=aa))
+      print("Wrote", golden_path(aa, filename))
+
+
+def main(argv: list[str] | None = None) -> int:
+  parser = argparse.ArgumentParser(description="Compare rendered resource icons against the committed goldens.")
+  parser.add_argument("--tolerance", type=int, default=0, metavar="N", help="allowed absolute error per channel (default: 0)")
+  parser.add_argument("--diff-dir", type=Path, default=Path("golden-diffs"), metavar="DIR", help="where to write heatmaps of failing cases (default: ./golden-diffs)")
+  parser.add_argument("-k", "--filter", default="", metavar="TEXT", help="only check cases whose name contains TEXT")
+  parser.add_argument("--update", action="store_true", help=f"re-record the goldens with the {REFERENCE_BACKEND} backend")
+  args = parser.parse_args(argv)
+  if not 0 <= args.tolerance <= 255:
+    parser.error("--tolerance must be 0-255")
+  if args.update:
+    update_goldens()
+    return 0
+
+  failures = 0
+  checked = 0
+  t0 = time.perf_counter()
+  for filename, draw_fn in gen.ICONS:
+    recording = gen.record_icon(draw_fn)
+    for aa in gen.AA_MODES:
+      try:
+        gw, gh, golden = gen.decode_png(golden_path(aa, filename).read_bytes())
+      except OSError:
+        print(f"MISSING {golden_path(aa, filename)} (run with --update)")
+        failures += 1
+        continue
+      # Occlusion culling (--cull) must reproduce the plain render exactly.
+      for backend in (*gen.CANVAS_BACKENDS, *(f"{b}+cull" for b in gen.CANVAS_BACKENDS)):
+        canvas = None
+        for png_filter in gen.PNG_FILTERS:
+          name = f"{filename.rpartition('.')[0]}/{aa}/{backend}/{png_filter}"
+          if args.filter not in name:
+            continue
+          if canvas is None:
+            canvas = gen.rasterize_canvas(recording, gen.ICON_SIZE, backend.removesuffix("+cull"), aa, cull=backend.endswith("+cull"))
+          w, h, pixels = gen.decode_png(canvas.to_png_bytes(gen.PngOptions(filter=png_filter)))
+          checked += 1
+          if (w, h) != (gw, gh):
+            print(f"FAIL {name}: size {w}x{h}, golden is {gw}x{gh}")
+            failures += 1
+            continue
+          stats = diff_pixels(pixels, golden, args.tolerance, heat=True)
+          if stats.mismatched == 0:
+            continue
+          failures += 1
+          args.diff_dir.mkdir(parents=True, exist_ok=True)
+          out = args.diff_dir / f"{name.replace('/', '-')}.png"
+          out.write_bytes(heatmap_png(w, h, stats.heat or b""))
+          print(f"FAIL {name}: {stats.mismatched} pixels differ, max error RGBA {stats.max_error}, mean {stats.mean_error:.4f} -> {out}")
+  elapsed = time.perf_counter() - t0
+  print(f"{checked} cases checked in {elapsed:.1f}s, {failures} failed (tolerance {args.tolerance}).")
+  return 1 if failures else 0
+
+
+if __name__ == "__main__":
+  sys.exit(main())
@@ -1,262 +1,94 @@
 #!/usr/bin/env python3
-from __future__ import annotations
-
-import binascii
-import math
-import os
-import random
-import struct
-import zlib
-from dataclasses import dataclass
-from pathlib import Path
-
-
-def clamp_int(n: float, lo: int, hi: int) -> int:
-  if n < lo:
-    return lo
-  if n > hi:
-    return hi
-  return int(n)
-
 
-def rgba(r: int, g: int, b: int, a: int = 255) -> tuple[int, int, int, int]:
-  return (clamp_int(r, 0, 255), clamp_int(g, 0, 255), clamp_int(b, 0, 255), clamp_int(a, 0, 255))
+"""
+Offline generator for the client art in apps/server/public/shared/: the resource icons,
+plus optional palette variants, SVGs, procedural backgrounds and hex tiles.
 
+  python3 tools/generate_resource_icons.py                         # icons (incremental)
+  python3 tools/generate_resource_icons.py --hex-tiles --jobs 0    # CI: icons + all 30 hex tiles, one process per CPU
+  python3 tools/generate_resource_icons.py --watch                 # re-render on every save
+  python3 tools/generate_resource_icons.py --profile               # per-primitive cost report
 
-@dataclass
-class Canvas:
-  w: int
-  h: int
-  # Premultiplied RGBA bytes.
-  buf: bytearray
+The draw functions and CLI live here; the rasterizer backends, PNG and SVG writers, build
+cache, backgrounds and hex tiles are modules of tools/resource_icons/.
 
-  @classmethod
-  def create(cls, w: int, h: int) -> "Canvas":
-    return cls(w=w, h=h, buf=bytearray(w * h * 4))
-
-  def _blend_px_premul(self, x: int, y: int, pr: int, pg: int, pb: int, pa: int) -> None:
-    if pa <= 0:
-      return
-    if x < 0 or y < 0 or x >= self.w or y >= self.h:
-      return
-    i = (y * self.w + x) * 4
-    dst_r = self.buf[i + 0]
-    dst_g = self.buf[i + 1]
-    dst_b = self.buf[i + 2]
-    dst_a = self.buf[i + 3]
-    inv = 255 - pa
-    self.buf[i + 0] = pr + (dst_r * inv) // 255
-    self.buf[i + 1] = pg + (dst_g * inv) // 255
-    self.buf[i + 2] = pb + (dst_b * inv) // 255
-    self.buf[i + 3] = pa + (dst_a * inv) // 255
-
-  def blend_px(self, x: int, y: int, color: tuple[int, int, int, int]) -> None:
-    r, g, b, a = color
-    if a <= 0:
-      return
-    pr = (r * a) // 255
-    pg = (g * a) // 255
-    pb = (b * a) // 255
-    self._blend_px_premul(x, y, pr, pg, pb, a)
-
-  def fill_ellipse(self, cx: float, cy: float, rx: float, ry: float, angle_rad: float, color: tuple[int, int, int, int]) -> None:
-    if rx <= 0 or ry <= 0:
-      return
-    cos_a = math.cos(angle_rad)
-    sin_a = math.sin(angle_rad)
-
-    min_x = clamp_int(math.floor(cx - rx - 2), 0, self.w - 1)
-    max_x = clamp_int(math.ceil(cx + rx + 2), 0, self.w - 1)
-    min_y = clamp_int(math.floor(cy - ry - 2), 0, self.h - 1)
-    max_y = clamp_int(math.ceil(cy + ry + 2), 0, self.h - 1)
-
-    inv_rx2 = 1.0 / (rx * rx)
-    inv_ry2 = 1.0 / (ry * ry)
-
-    for y in range(min_y, max_y + 1):
-      py = (y + 0.5) - cy
-      for x in range(min_x, max_x + 1):
-        px = (x + 0.5) - cx
-        lx = px * cos_a + py * sin_a
-        ly = -px * sin_a + py * cos_a
-        if (lx * lx) * inv_rx2 + (ly * ly) * inv_ry2 <= 1.0:
-          self.blend_px(x, y, color)
-
-  def fill_circle(self, cx: float, cy: float, r: float, color: tuple[int, int, int, int]) -> None:
-    self.fill_ellipse(cx, cy, r, r, 0.0, color)
-
-  def fill_polygon(self, pts: list[tuple[float, float]], color: tuple[int, int, int, int]) -> None:
-    if len(pts) < 3:
-      return
-
-    min_y_f = min(y for _, y in pts)
-    max_y_f = max(y for _, y in pts)
-    min_y = clamp_int(math.floor(min_y_f), 0, self.h - 1)
-    max_y = clamp_int(math.ceil(max_y_f), 0, self.h - 1)
-
-    n = len(pts)
-    for y in range(min_y, max_y + 1):
-      scan_y = y + 0.5
-      xs: list[float] = []
-      for i in range(n):
-        x1, y1 = pts[i]
-        x2, y2 = pts[(i + 1) % n]
-        if y1 == y2:
-          continue
-        if (y1 <= scan_y < y2) or (y2 <= scan_y < y1):
-          t = (scan_y - y1) / (y2 - y1)
-          xs.append(x1 + t * (x2 - x1))
-      xs.sort()
-      for i in range(0, len(xs), 2):
-        if i + 1 >= len(xs):
-          break
-        x0 = int(math.ceil(xs[i] - 0.5))
-        x1 = int(math.floor(xs[i + 1] - 0.5))
-        if x1 < x0:
-          continue
-        x0 = max(0, x0)
-        x1 = min(self.w - 1, x1)
-        for x in range(x0, x1 + 1):
-          self.blend_px(x, y, color)
-
-  def stroke_segment(self, x1: float, y1: float, x2: float, y2: float, width: float, color: tuple[int, int, int, int]) -> None:
-    if width <= 0:
-      return
-    r = width / 2.0
-    min_x = clamp_int(math.floor(min(x1, x2) - r - 2), 0, self.w - 1)
-    max_x = clamp_int(math.ceil(max(x1, x2) + r + 2), 0, self.w - 1)
-    min_y = clamp_int(math.floor(min(y1, y2) - r - 2), 0, self.h - 1)
-    max_y = clamp_int(math.ceil(max(y1, y2) + r + 2), 0, self.h - 1)
-
-    vx = x2 - x1
-    vy = y2 - y1
-    vv = vx * vx + vy * vy
-    if vv <= 1e-6:
-      self.fill_circle(x1, y1, r, color)
-      return
-    inv_vv = 1.0 / vv
-    rr = r * r
-
-    for y in range(min_y, max_y + 1):
-      py = y + 0.5
-      for x in range(min_x, max_x + 1):
-        px = x + 0.5
-        wx = px - x1
-        wy = py - y1
-        t = (wx * vx + wy * vy) * inv_vv
-        if t < 0.0:
-          t = 0.0
-        elif t > 1.0:
-          t = 1.0
-        proj_x = x1 + t * vx
-        proj_y = y1 + t * vy
-        dx = px - proj_x
-        dy = py - proj_y
-        if dx * dx + dy * dy <= rr:
-          self.blend_px(x, y, color)
-
-  def stroke_polyline(self, pts: list[tuple[float, float]], width: float, color: tuple[int, int, int, int], closed: bool = False) -> None:
-    if len(pts) < 2:
-      return
-    for i in range(len(pts) - 1):
-      x1, y1 = pts[i]
-      x2, y2 = pts[i + 1]
-      self.stroke_segment(x1, y1, x2, y2, width, color)
-    if closed:
-      x1, y1 = pts[-1]
-      x2, y2 = pts[0]
-      self.stroke_segment(x1, y1, x2, y2, width, color)
-
-  def downsample2(self) -> "Canvas":
-    # 2x downsample with box filter. Works on premultiplied buffer.
-    out_w = self.w // 2
-    out_h = self.h // 2
-    out = Canvas.create(out_w, out_h)
-    for y in range(out_h):
-      for x in range(out_w):
-        acc_r = 0
-        acc_g = 0
-        acc_b = 0
-        acc_a = 0
-        for dy in (0, 1):
-          for dx in (0, 1):
-            sx = x * 2 + dx
-            sy = y * 2 + dy
-            i = (sy * self.w + sx) * 4
-            acc_r += self.buf[i + 0]
-            acc_g += self.buf[i + 1]
-            acc_b += self.buf[i + 2]
-            acc_a += self.buf[i + 3]
-        oi = (y * out_w + x) * 4
-        out.buf[oi + 0] = acc_r // 4
-        out.buf[oi + 1] = acc_g // 4
-        out.buf[oi + 2] = acc_b // 4
-        out.buf[oi + 3] = acc_a // 4
-    return out
-
-  def to_png_bytes(self) -> bytes:
-    # Convert premultiplied buffer -> straight alpha for PNG encoding.
-    raw = bytearray()
-    for y in range(self.h):
-      raw.append(0)  # filter: none
-      for x in range(self.w):
-        i = (y * self.w + x) * 4
-        pr = self.buf[i + 0]
-        pg = self.buf[i + 1]
-        pb = self.buf[i + 2]
-        a = self.buf[i + 3]
-        if a == 0:
-          raw.extend((0, 0, 0, 0))
-          continue
-        r = min(255, (pr * 255) // a)
-        g = min(255, (pg * 255) // a)
-        b = min(255, (pb * 255) // a)
-        raw.extend((r, g, b, a))
-
-    compressed = zlib.compress(bytes(raw), level=9)
-
-    def chunk(tag: bytes, data: bytes) -> bytes:
-      crc = binascii.crc32(tag)
-      crc = binascii.crc32(data, crc) & 0xFFFFFFFF
-      return struct.pack(">I", len(data)) + tag + data + struct.pack(">I", crc)
-
-    signature = b"\x89PNG\r\n\x1a\n"
-    ihdr = struct.pack(">IIBBBBB", self.w, self.h, 8, 6, 0, 0, 0)
-    return signature + chunk(b"IHDR", ihdr) + chunk(b"IDAT", compressed) + chunk(b"IEND", b"")
-
-
-def rot(x: float, y: float, angle: float) -> tuple[float, float]:
-  c = math.cos(angle)
-  s = math.sin(angle)
-  return (x * c - y * s, x * s + y * c)
-
-
-def transform_points(pts: list[tuple[float, float]], cx: float, cy: float, angle: float) -> list[tuple[float, float]]:
-  out: list[tuple[float, float]] = []
-  for x, y in pts:
-    rx, ry = rot(x, y, angle)
-    out.append((rx + cx, ry + cy))
-  return out
-
-
-def chamfered_rect_points(w: float, h: float, c: float) -> list[tuple[float, float]]:
-  hw = w / 2.0
-  hh = h / 2.0
-  c = max(0.0, min(c, hw, hh))
-  # Clockwise.
-  return [
-    (hw - c, -hh),
-    (hw, -hh + c),
-    (hw, hh - c),
-    (hw - c, hh),
-    (-hw + c, hh),
-    (-hw, hh - c),
-    (-hw, -hh + c),
-    (-hw + c, -hh),
-  ]
+Outputs whose inputs are unchanged are skipped (see tools/.cache/); --force re-renders.
+Standard library only; NumPy, when installed, speeds up rasterization.
+"""
 
+from __future__ import annotations
 
-def draw_brick(canvas: Canvas, cx: float, cy: float, angle: float, scale: float, seed: int) -> None:
+import argparse
+import colorsys
+import hashlib
+import importlib.util
+import json
+import math
+import os
+import random
+import re
+import sys
+import time
+import traceback
+import types
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass, replace
+from pathlib import Path
+from typing import Callable
+
+try:
+  import numpy as np
+except ImportError:  # NumPy is optional; the pure-Python Canvas always works.
+  np = None
+
+from resource_icons.backends import (
+  CANVAS_BACKENDS,
+  canvas_backend,
+  capture_backend,
+  composite_fragments,
+  replay_occluded,
+)
+from resource_icons.backgrounds import (
+  BACKGROUNDS,
+  BACKGROUND_DIR,
+  BACKGROUND_SIZE,
+  background_filename,
+  generate_backgrounds,
+)
+from resource_icons.bands import BAND_ROWS, render_shared
+from resource_icons.cache import (
+  PUBLIC_DIR,
+  SOURCE_FILES,
+  cache_hit,
+  cache_manifest_path,
+  load_cache_manifest,
+  render_key,
+  save_cache_manifest,
+  write_atomic,
+)
+from resource_icons.canvas import (
+  AA_MODES,
+  RGB,
+  SSAA_FILTERS,
+  SSAA_MAX,
+  TILE_SIZE,
+  Canvas,
+  TiledCanvas,
+  aa_params,
+  chamfered_rect_points,
+  raster_side,
+  reduce_ssaa,
+  rgba,
+  ssaa_mode,
+)
+from resource_icons.display_list import DisplayList
+from resource_icons.hex_tiles import HEX_TILE_SIZE, HEX_VARIANTS, TERRAINS, generate_hex_tiles, hex_tile_filename
+from resource_icons.png import PNG_FILTERS, PngOptions, decode_png, quantize_rgba
+from resource_icons.profile import RenderProfile, profiled_backend
+from resource_icons.svg import SVG_DIGITS, render_svg
+
+
+def draw_brick(canvas: DisplayList, cx: float, cy: float, angle: float, scale: float, seed: int) -> None:
   rnd = random.Random(seed)
 
   base_w = 80.0 * scale
@@ -271,11 +103,18 @@ def draw_brick(canvas: Canvas, cx: float, cy: float, angle: float, scale: float,
   lo = rgba(0, 0, 0, 38)
 
   local = chamfered_rect_points(base_w, base_h, chamfer)
-  pts = transform_points(local, cx, cy, angle)
 
-  # Drop-shadow under brick.
-  shadow_pts = [(x + 7 * scale, y + 9 * scale) for x, y in pts]
-  canvas.fill_polygon(shadow_pts, shadow)
+  # Drop-shadow under brick (offset in icon space, not along the brick).
+  canvas.save()
+  canvas.translate(cx + 7 * scale, cy + 9 * scale)
+  canvas.rotate(angle)
+  canvas.fill_polygon(local, shadow)
+  canvas.restore()
+
+  # Everything else is drawn in the brick's own frame.
+  canvas.save()
+  canvas.translate(cx, cy)
+  canvas.rotate(angle)
 
   # Brick fill: slightly varied per brick.
   mix = rnd.random()
@@ -285,7 +124,7 @@ def draw_brick(canvas: Canvas, cx: float, cy: float, angle: float, scale: float,
     int(fill[2] * (1 - mix) + fill2[2] * mix),
     255,
   )
-  canvas.fill_polygon(pts, brick_fill)
+  canvas.fill_polygon(local, brick_fill)
 
   # Simple lighting: highlight on top-left, shadow on bottom-right (in local space).
   # Highlight triangle.
@@ -294,7 +133,7 @@ def draw_brick(canvas: Canvas, cx: float, cy: float, angle: float, scale: float,
     (base_w * 0.15, -base_h / 2 + chamfer),
     (-base_w / 2 + chamfer, base_h * 0.15),
   ]
-  canvas.fill_polygon(transform_points(hl_local, cx, cy, angle), hi)
+  canvas.fill_polygon(hl_local, hi)
 
   # Shadow quad.
   sh_local = [
@@ -303,7 +142,7 @@ def draw_brick(canvas: Canvas, cx: float, cy: float, angle: float, scale: float,
     (base_w / 2 - chamfer, base_h / 2 - chamfer),
     (base_w * 0.05, base_h / 2 - chamfer),
   ]
-  canvas.fill_polygon(transform_points(sh_local, cx, cy, angle), lo)
+  canvas.fill_polygon(sh_local, lo)
 
   # Chips / mortar smears.
   if rnd.random() < 0.65:
@@ -317,7 +156,7 @@ def draw_brick(canvas: Canvas, cx: float, cy: float, angle: float, scale: float,
       (sx + 8 * scale, sy + 5 * scale),
       (sx - 6 * scale, sy + 6 * scale),
     ]
-    canvas.fill_polygon(transform_points(smear_local, cx, cy, angle), smear)
+    canvas.fill_polygon(smear_local, smear)
 
   # Cracks.
   crack = rgba(40, 25, 22, 150)
@@ -326,22 +165,21 @@ def draw_brick(canvas: Canvas, cx: float, cy: float, angle: float, scale: float,
     y0 = (rnd.random() - 0.5) * base_h * 0.6
     x1 = x0 + (rnd.random() - 0.5) * base_w * 0.25
     y1 = y0 + (rnd.random() - 0.5) * base_h * 0.18
-    p0 = transform_points([(x0, y0), (x1, y1)], cx, cy, angle)
-    canvas.stroke_segment(p0[0][0], p0[0][1], p0[1][0], p0[1][1], 2.0 * scale, crack)
+    canvas.stroke_segment(x0, y0, x1, y1, 2.0 * scale, crack)
 
   # Speckles (limited so it stays fast).
   speck = rgba(0, 0, 0, 24)
   for _ in range(12):
     lx = (rnd.random() - 0.5) * base_w * 0.85
     ly = (rnd.random() - 0.5) * base_h * 0.7
-    rx, ry = rot(lx, ly, angle)
-    canvas.fill_circle(cx + rx, cy + ry, 1.4 * scale, speck)
+    canvas.fill_circle(lx, ly, 1.4 * scale, speck)
 
   # Outline last.
-  canvas.stroke_polyline(pts, 6.5 * scale, outline, closed=True)
+  canvas.stroke_polyline(local, 6.5 * scale, outline, closed=True)
+  canvas.restore()
 
 
-def draw_bricks_icon(canvas: Canvas) -> None:
+def draw_bricks_icon(canvas: DisplayList) -> None:
   # Background smudge.
   canvas.fill_ellipse(126, 140, 92, 62, 0.0, rgba(50, 54, 62, 26))
   canvas.fill_ellipse(170, 152, 70, 48, 0.0, rgba(50, 54, 62, 18))
@@ -374,18 +212,24 @@ def draw_bricks_icon(canvas: Canvas) -> None:
 
   # Draw back-to-front in order.
   for cx, cy, a, s, seed in bricks:
-    draw_brick(canvas, cx, cy, a, s, seed)
+    with canvas.group(f"draw_brick seed={seed}"):
+      draw_brick(canvas, cx, cy, a, s, seed)
 
   # Small loose brick chips.
   outline = rgba(25, 23, 23, 255)
   chip = rgba(200, 80, 62, 255)
-  for (cx, cy, a) in [(72, 224, -12), (196, 224, 14), (62, 216, 6)]:
-    pts = transform_points(chamfered_rect_points(22, 12, 3), cx, cy, math.radians(a))
-    canvas.fill_polygon(pts, chip)
-    canvas.stroke_polyline(pts, 5.5, outline, closed=True)
-
-
-def draw_wheat_icon(canvas: Canvas) -> None:
+  with canvas.group("chips"):
+    for (cx, cy, a) in [(72, 224, -12), (196, 224, 14), (62, 216, 6)]:
+      canvas.save()
+      canvas.translate(cx, cy)
+      canvas.rotate(math.radians(a))
+      pts = chamfered_rect_points(22, 12, 3)
+      canvas.fill_polygon(pts, chip)
+      canvas.stroke_polyline(pts, 5.5, outline, closed=True)
+      canvas.restore()
+
+
+def draw_wheat_icon(canvas: DisplayList) -> None:
   outline = rgba(24, 22, 22, 255)
   grain = rgba(244, 194, 74, 255)
   grain_hi = rgba(255, 234, 160, 255)
@@ -402,15 +246,17 @@ def draw_wheat_icon(canvas: Canvas) -> None:
     [(100, 236), (96, 196), (96, 160), (92, 124), (90, 98)],
   ]
 
-  for pts in stems:
-    canvas.stroke_polyline(pts, 10.0, outline)
-    canvas.stroke_polyline(pts, 6.6, stem)
+  with canvas.group("stems"):
+    for pts in stems:
+      canvas.stroke_polyline(pts, 10.0, outline)
+      canvas.stroke_polyline(pts, 6.6, stem)
 
   def grain_ellipse(cx: float, cy: float, angle_deg: float, size: float) -> None:
     ang = math.radians(angle_deg)
-    canvas.fill_ellipse(cx, cy, 9.0 * size, 6.0 * size, ang, outline)
-    canvas.fill_ellipse(cx, cy, 7.2 * size, 4.8 * size, ang, grain)
-    canvas.fill_ellipse(cx - 1.5 * size, cy - 1.2 * size, 3.2 * size, 2.2 * size, ang, rgba(grain_hi[0], grain_hi[1], grain_hi[2], 140))
+    with canvas.group("grain_ellipse"):
+      canvas.fill_ellipse(cx, cy, 9.0 * size, 6.0 * size, ang, outline)
+      canvas.fill_ellipse(cx, cy, 7.2 * size, 4.8 * size, ang, grain)
+      canvas.fill_ellipse(cx - 1.5 * size, cy - 1.2 * size, 3.2 * size, 2.2 * size, ang, rgba(grain_hi[0], grain_hi[1], grain_hi[2], 140))
 
   # Heads: scatter grains along stems.
   placements = []
@@ -458,7 +304,7 @@ def draw_wheat_icon(canvas: Canvas) -> None:
   canvas.fill_polygon([(138, 202), (146, 198), (142, 208)], rgba(255, 255, 255, 24))
 
 
-def draw_sheep(canvas: Canvas) -> None:
+def draw_sheep(canvas: DisplayList) -> None:
   outline = rgba(22, 22, 24, 255)
   wool = rgba(245, 247, 250, 255)
   wool2 = rgba(214, 222, 232, 255)
@@ -519,11 +365,13 @@ def draw_sheep(canvas: Canvas) -> None:
     canvas.fill_ellipse(hx - 6 * scale * facing, hy - 14 * scale, 16 * scale, 10 * scale, 0.0, face_hi)
 
   # Back sheep first.
-  sheep(100, 150, 0.85, facing=1, back=True)
-  sheep(146, 166, 1.0, facing=1, back=False)
+  with canvas.group("sheep back"):
+    sheep(100, 150, 0.85, facing=1, back=True)
+  with canvas.group("sheep front"):
+    sheep(146, 166, 1.0, facing=1, back=False)
 
 
-def draw_wood(canvas: Canvas) -> None:
+def draw_wood(canvas: DisplayList) -> None:
   outline = rgba(22, 22, 24, 255)
   bark = rgba(154, 96, 54, 255)
   bark_hi = rgba(210, 168, 120, 255)
@@ -559,12 +407,12 @@ def draw_wood(canvas: Canvas) -> None:
       canvas.stroke_segment(px - 4, py - 8, px + 2, py + 8, 3.2, rgba(0, 0, 0, 22))
 
   # Three stacked logs.
-  log(64, 150, 196, 170, 28, 1)
-  log(56, 184, 206, 206, 30, 2)
-  log(86, 118, 206, 126, 26, 3)
+  for x1, y1, x2, y2, radius, seed in [(64, 150, 196, 170, 28, 1), (56, 184, 206, 206, 30, 2), (86, 118, 206, 126, 26, 3)]:
+    with canvas.group(f"log seed={seed}"):
+      log(x1, y1, x2, y2, radius, seed)
 
 
-def draw_ore(canvas: Canvas) -> None:
+def draw_ore(canvas: DisplayList) -> None:
   outline = rgba(22, 22, 24, 255)
   rock = rgba(26, 33, 44, 255)
   rock_hi = rgba(88, 104, 124, 255)
@@ -598,10 +446,11 @@ def draw_ore(canvas: Canvas) -> None:
     [(70, 130), (110, 112), (146, 120), (190, 106)],
     [(90, 186), (126, 168), (164, 172), (206, 150)],
   ]
-  for pts2 in veins:
-    canvas.stroke_polyline(pts2, 14.0, outline)
-    canvas.stroke_polyline(pts2, 9.0, gold if pts2[0][1] < 160 else silver)
-    canvas.stroke_polyline(pts2, 4.5, rgba(255, 255, 255, 46))
+  with canvas.group("veins"):
+    for pts2 in veins:
+      canvas.stroke_polyline(pts2, 14.0, outline)
+      canvas.stroke_polyline(pts2, 9.0, gold if pts2[0][1] < 160 else silver)
+      canvas.stroke_polyline(pts2, 4.5, rgba(255, 255, 255, 46))
 
   # Gems.
   def gem(cx: float, cy: float, s: float, fill: tuple[int, int, int, int]) -> None:
@@ -618,71 +467,687 @@ def draw_ore(canvas: Canvas) -> None:
     canvas.fill_polygon(inner, fill)
     canvas.fill_polygon([(cx - 6 * s, cy - 6 * s), (cx + 4 * s, cy - 10 * s), (cx + 8 * s, cy - 2 * s), (cx - 2 * s, cy + 2 * s)], rgba(255, 255, 255, 70))
 
-  gem(184, 140, 1.0, rgba(95, 211, 255, 255))
-  gem(132, 148, 1.0, rgba(176, 137, 255, 255))
-  gem(96, 176, 1.0, rgba(201, 255, 79, 255))
+  with canvas.group("gems"):
+    gem(184, 140, 1.0, rgba(95, 211, 255, 255))
+    gem(132, 148, 1.0, rgba(176, 137, 255, 255))
+    gem(96, 176, 1.0, rgba(201, 255, 79, 255))
 
   # Glints.
   for cx, cy, a in [(202, 124, 0.85), (116, 196, 0.65)]:
     canvas.fill_polygon([(cx, cy - 10), (cx + 4, cy - 2), (cx + 12, cy), (cx + 4, cy + 2), (cx, cy + 10), (cx - 4, cy + 2), (cx - 12, cy), (cx - 4, cy - 2)], rgba(255, 255, 255, int(210 * a)))
 
 
-def generate_icons(out_dir: Path) -> None:
-  out_dir.mkdir(parents=True, exist_ok=True)
+ICON_SIZE = 256
+
+ICONS: list[tuple[str, Callable[[DisplayList], None]]] = [
+  ("brick.png", draw_bricks_icon),
+  ("wheat.png", draw_wheat_icon),
+  ("sheep.png", draw_sheep),
+  ("wood.png", draw_wood),
+  ("ore.png", draw_ore),
+]
+
+
+ICON_SIZES = (16, 32, 64, 128, 256)
+
+
+def icon_filename(filename: str, size: int = ICON_SIZE) -> str:
+  # brick.png at the native size, brick-64.png for a 64px variant.
+  if size == ICON_SIZE:
+    return filename
+  stem, _, ext = filename.rpartition(".")
+  return f"{stem}-{size}.{ext}"
+
+
+def record_icon(draw_fn: Callable[[DisplayList], None]) -> DisplayList:
+  # Run a draw function once, in its 256-unit icon space.
+  recording = DisplayList(ICON_SIZE, ICON_SIZE)
+  with recording.group(draw_fn.__name__):
+    draw_fn(recording)
+  return recording
+
+
+def rasterize_canvas(recording: DisplayList, size: int = ICON_SIZE, backend: str = "auto", aa: str = "ssaa", tile: int = 0, tile_jobs: int = 1, profile: RenderProfile | None = None, cull: bool = False) -> Canvas:
+  # tile > 0 rasterizes through a TiledCanvas with that tile size (same output). With a
+  # profile, ops are replayed one at a time into an instrumented canvas instead (no tiling).
+  # cull replays front-to-back with occlusion culling (same output; see replay_occluded).
+  canvas_cls = canvas_backend(backend)
+  if profile is not None:
+    canvas_cls = profiled_backend(canvas_cls)
+    tile = 0
+  side = raster_side(size, aa)
+  scale = side / ICON_SIZE
+  canvas = canvas_cls.create(side, side, antialias=aa == "analytic")
+  sink = TiledCanvas(canvas, tile) if tile else canvas
+  if profile is not None:
+    profile.replay(recording, canvas, scale)
+  elif cull and sink is canvas:
+    replay_occluded(recording, canvas, scale)
+  else:
+    recording.replay(sink, scale)
+  if isinstance(sink, TiledCanvas):
+    sink.flush(tile_jobs)
+  if profile is not None and aa_params(aa)[0] > 1:
+    with profile.timed(*recording.groups[0][1], "downsample"):
+      return reduce_ssaa(canvas, aa)
+  return reduce_ssaa(canvas, aa)
+
+
+def rasterize_icon(recording: DisplayList, size: int = ICON_SIZE, backend: str = "auto", png: PngOptions = PngOptions(), aa: str = "ssaa", tile: int = 0, tile_jobs: int = 1, profile: RenderProfile | None = None, cull: bool = False) -> bytes:
+  canvas = rasterize_canvas(recording, size, backend, aa, tile, tile_jobs, profile, cull=cull)
+  if profile is not None:
+    with profile.timed(*recording.groups[0][1], "to_png_bytes"):
+      return canvas.to_png_bytes(png)
+  return canvas.to_png_bytes(png)
+
+
+def render_icon(draw_fn: Callable[[DisplayList], None], backend: str = "auto", png: PngOptions = PngOptions(), aa: str = "ssaa", tile: int = 0, tile_jobs: int = 1, size: int = ICON_SIZE, cull: bool = False) -> bytes:
+  return rasterize_icon(record_icon(draw_fn), size, backend, png, aa, tile, tile_jobs, cull=cull)
 
-  icons: list[tuple[str, callable[[Canvas], None]]] = [
-    ("brick.png", draw_bricks_icon),
-    ("wheat.png", draw_wheat_icon),
-    ("sheep.png", draw_sheep),
-    ("wood.png", draw_wood),
-    ("ore.png", draw_ore),
-  ]
 
-  for filename, draw_fn in icons:
-    hi = Canvas.create(512, 512)
-    # Transparent background by default; just draw centered at 256-scale by using coordinates already in 256.
-    # Scale 256-coordinates up 2x by drawing into a larger canvas and scaling all coordinates in draw fns.
-    # Instead, draw at 256-space and multiply coordinates by 2 using a temporary transform:
-    # easiest: call draw into a proxy canvas by monkeypatching dimensions. We'll just scale coordinates manually:
-    # Here: render by scaling the canvas itself and scaling inside by a factor of 2 via helper.
-    scaled = Canvas.create(512, 512)
+def render_icon_sizes(draw_fn: Callable[[DisplayList], None], sizes: tuple[int, ...], backend: str = "auto", png: PngOptions = PngOptions(), aa: str = "ssaa", tile: int = 0, tile_jobs: int = 1, cull: bool = False) -> list[bytes]:
+  # One PNG per size, all rasterized from a single run of draw_fn.
+  recording = record_icon(draw_fn)
+  return [rasterize_icon(recording, size, backend, png, aa, tile, tile_jobs, cull=cull) for size in sizes]
 
-    # Draw function expects 256-space; we render by temporarily drawing into a 256 canvas then upsample via nearest,
-    # but that loses quality. So: draw directly into hi with coordinates doubled by wrapping methods.
-    class ScaledCanvas(Canvas):
-      def blend_px(self, x: int, y: int, color: tuple[int, int, int, int]) -> None:  # type: ignore[override]
-        return hi.blend_px(x, y, color)
 
-      def fill_ellipse(self, cx: float, cy: float, rx: float, ry: float, angle_rad: float, color: tuple[int, int, int, int]) -> None:  # type: ignore[override]
-        return hi.fill_ellipse(cx * 2, cy * 2, rx * 2, ry * 2, angle_rad, color)
+def render_settings(png: PngOptions, aa: str, size: int = ICON_SIZE) -> dict[str, object]:
+  # Everything outside the draw functions' source that changes the output bytes.
+  return {"size": size, "aa": aa, "png": asdict(png)}
 
-      def fill_circle(self, cx: float, cy: float, r: float, color: tuple[int, int, int, int]) -> None:  # type: ignore[override]
-        return hi.fill_circle(cx * 2, cy * 2, r * 2, color)
 
-      def fill_polygon(self, pts: list[tuple[float, float]], color: tuple[int, int, int, int]) -> None:  # type: ignore[override]
-        return hi.fill_polygon([(x * 2, y * 2) for x, y in pts], color)
+def icon_cache_key(draw_fn: Callable[[DisplayList], None], png: PngOptions = PngOptions(), aa: str = "ssaa", size: int = ICON_SIZE) -> str:
+  return render_key((draw_fn.__name__, "render_icon", "Canvas"), render_settings(png, aa, size))
 
-      def stroke_segment(self, x1: float, y1: float, x2: float, y2: float, width: float, color: tuple[int, int, int, int]) -> None:  # type: ignore[override]
-        return hi.stroke_segment(x1 * 2, y1 * 2, x2 * 2, y2 * 2, width * 2, color)
 
-      def stroke_polyline(self, pts: list[tuple[float, float]], width: float, color: tuple[int, int, int, int], closed: bool = False) -> None:  # type: ignore[override]
-        return hi.stroke_polyline([(x * 2, y * 2) for x, y in pts], width * 2, color, closed=closed)
+def _render_icon_sizes_timed(*args: object) -> tuple[list[bytes], float]:
+  t0 = time.perf_counter()
+  pngs = render_icon_sizes(*args)  # type: ignore[arg-type]
+  return pngs, time.perf_counter() - t0
 
-    draw_fn(ScaledCanvas(w=512, h=512, buf=hi.buf))
 
-    lo = hi.downsample2()
-    out_path = out_dir / filename
-    out_path.write_bytes(lo.to_png_bytes())
+def generate_icons(out_dir: Path, backend: str = "auto", jobs: int = 1, force: bool = False, png: PngOptions = PngOptions(), aa: str = "ssaa", tile: int = 0, tile_jobs: int = 1, sizes: tuple[int, ...] = (ICON_SIZE,), cull: bool = False, timings: dict[str, float] | None = None) -> list[str]:
+  # Returns the filenames that were (re)rendered; the rest were up to date in the cache manifest.
+  # timings, when given, receives the render seconds of each re-rendered icon (all sizes).
+  canvas_backend(backend)  # Fail fast on an unavailable backend, before any workers start.
+  out_dir.mkdir(parents=True, exist_ok=True)
+
+  cached = {} if force else load_cache_manifest(out_dir)
+  keys = {icon_filename(filename, size): icon_cache_key(draw_fn, png, aa, size) for filename, draw_fn in ICONS for size in sizes}
+  # Per icon, the sizes that are missing or stale; each icon is recorded once for all of them.
+  todo: list[tuple[str, Callable[[DisplayList], None], tuple[int, ...]]] = []
+  for filename, draw_fn in ICONS:
+    names = {size: icon_filename(filename, size) for size in sizes}
+    stale = tuple(size for size in sizes if not cache_hit(cached.get(names[size]), keys[names[size]], out_dir / names[size]))
+    if stale:
+      todo.append((filename, draw_fn, stale))
+
+  if jobs > 1 and len(todo) > 1:
+    # Icons share no state, so each one can render in its own process; map() keeps
+    # submission order, so the files come out exactly as in a serial run.
+    with ProcessPoolExecutor(max_workers=min(jobs, len(todo))) as pool:
+      n = len(todo)
+      results = list(pool.map(_render_icon_sizes_timed, [draw_fn for _, draw_fn, _ in todo], [stale for _, _, stale in todo], [backend] * n, [png] * n, [aa] * n, [tile] * n, [tile_jobs] * n, [cull] * n))
+  else:
+    results = [_render_icon_sizes_timed(draw_fn, stale, backend, png, aa, tile, tile_jobs, cull) for _, draw_fn, stale in todo]
+
+  # Keep entries for variants rendered by earlier runs with other --sizes.
+  known = {icon_filename(filename, size) for filename, _ in ICONS for size in {*ICON_SIZES, *sizes}}
+  entries = {name: entry for name, entry in cached.items() if name in known}
+  rendered: list[str] = []
+  for (filename, _, stale), (pngs, seconds) in zip(todo, results):
+    if timings is not None:
+      timings[filename] = seconds
+    for size, data in zip(stale, pngs):
+      name = icon_filename(filename, size)
+      write_atomic(out_dir / name, data)
+      entries[name] = {"key": keys[name], "sha256": hashlib.sha256(data).hexdigest()}
+      rendered.append(name)
+  if todo or force or not cache_manifest_path(out_dir).exists():
+    save_cache_manifest(out_dir, entries)
+  return rendered
+
+
+def _load_live_module(path: Path, generation: int) -> types.ModuleType:
+  # Execute the current text of `path` as a new module, leaving this one untouched. It is
+  # registered in sys.modules because dataclasses resolve annotations through it. The
+  # resource_icons package is dropped from sys.modules first, so the new module imports
+  # the current text of its modules too.
+  for loaded in [m for m in sys.modules if m.partition(".")[0] == "resource_icons"]:
+    del sys.modules[loaded]
+  name = f"_{path.stem}_live{generation}"
+  spec = importlib.util.spec_from_file_location(name, path)
+  assert spec is not None and spec.loader is not None
+  module = importlib.util.module_from_spec(spec)
+  sys.modules[name] = module
+  try:
+    spec.loader.exec_module(module)
+  except BaseException:
+    del sys.modules[name]
+    raise
+  sys.modules.pop(f"_{path.stem}_live{generation - 1}", None)
+  return module
+
+
+def _source_signature() -> tuple[tuple[int, int] | None, ...]:
+  signature = []
+  for path in SOURCE_FILES:
+    try:
+      st = path.stat()
+      signature.append((st.st_mtime_ns, st.st_size))
+    except OSError:
+      signature.append(None)
+  return tuple(signature)
+
+
+def watch_icons(out_dir: Path, interval: float = 0.5, force: bool = False, png: PngOptions = PngOptions(), **options: object) -> None:
+  # Poll this script and the resource_icons modules and, on every change, run
+  # generate_icons() from a fresh load of the edited source. The cache keys hash each
+  # icon's draw function plus the primitives it reaches, so only icons affected by the edit
+  # re-render. The process (NumPy import, parsed source) stays warm, and renders run
+  # serially: worker processes could not import the live module.
+  path = Path(__file__).resolve()
+  seen = None
+  generation = 0
+  print(f"Watching {path} and {path.with_name('resource_icons')}/ (Ctrl-C to stop)", flush=True)
+  while True:
+    signature = _source_signature()
+    if signature != seen:
+      seen = signature
+      generation += 1
+      t0 = time.perf_counter()
+      timings: dict[str, float] = {}
+      try:
+        live = _load_live_module(path, generation)
+        rendered = live.generate_icons(out_dir, jobs=1, force=force, png=live.PngOptions(**asdict(png)), timings=timings, **options)
+      except Exception:
+        traceback.print_exc()
+        print("Render failed; waiting for the next change.", flush=True)
+      else:
+        for filename, seconds in timings.items():
+          print(f"- {filename}: {seconds * 1e3:.0f} ms", flush=True)
+        status = f"{len(timings)} icon(s), {len(rendered)} file(s)" if rendered else "up to date"
+        print(f"[{time.strftime('%H:%M:%S')}] {status} in {(time.perf_counter() - t0) * 1e3:.0f} ms", flush=True)
+      force = False
+    time.sleep(interval)
+
+
+def svg_filename(filename: str) -> str:
+  return filename.rpartition(".")[0] + ".svg"
+
+
+def generate_svgs(out_dir: Path, force: bool = False, digits: int = SVG_DIGITS) -> list[str]:
+  # Write <icon>.svg next to the PNGs from the same draw functions. Emitting is cheap, so
+  # instead of a cache key, a file is only rewritten when its content would change.
+  # Returns the filenames that were (re)written.
+  out_dir.mkdir(parents=True, exist_ok=True)
+  written: list[str] = []
+  for filename, draw_fn in ICONS:
+    name = svg_filename(filename)
+    data = render_svg(record_icon(draw_fn), digits).encode()
+    path = out_dir / name
+    if not force and path.is_file() and path.read_bytes() == data:
+      continue
+    write_atomic(path, data)
+    written.append(name)
+  return written
+
+
+PALETTE_DIR = "palettes"
+PALETTE_MANIFEST = "palettes.json"
+# `--res-<resource>-rgb: r, g, b` as written in styles.css, theme.json cssVars and theme-loader.js.
+_RES_RGB = re.compile(r"""["']?--res-(\w+)-rgb["']?\s*:\s*["']?(\d+)\s*,\s*(\d+)\s*,\s*(\d+)""")
+# HLS saturation below which an icon color counts as neutral (outlines, shadows, white
+# highlights) and keeps its color in every palette.
+NEUTRAL_SATURATION = 0.25
+
+
+def _resource_colors(text: str) -> dict[str, RGB]:
+  return {m[1]: (int(m[2]), int(m[3]), int(m[4])) for m in _RES_RGB.finditer(text)}
+
+
+def load_palettes(public_dir: Path = PUBLIC_DIR) -> dict[str, dict[str, RGB]]:
+  # Resource colors per client palette: the styles.css defaults, each theme's cssVars
+  # over them, and colorblind mode (theme-loader.js), whose overrides win over any theme.
+  default = _resource_colors((public_dir / "shared" / "styles.css").read_text())
+  palettes = {"default": default}
+  for path in sorted((public_dir / "themes").glob("*/theme.json")):
+    theme = json.loads(path.read_text())
+    palettes[theme.get("id", path.parent.name)] = {**default, **_resource_colors(json.dumps(theme.get("cssVars", {})))}
+  palettes["colorblind"] = {**default, **_resource_colors((public_dir / "shared" / "theme-loader.js").read_text())}
+  return palettes
+
+
+def palette_recolor(base: RGB, target: RGB) -> Callable[[RGB], RGB]:
+  # Move an icon's chromatic colors onto the target resource color: take its hue, scale
+  # saturation by how much more (or less) saturated the target is than the base, and keep
+  # each color's own lightness so the shading survives. Neutral colors are left alone.
+  th, _, ts = colorsys.rgb_to_hls(*(c / 255 for c in target))
+  _, _, bs = colorsys.rgb_to_hls(*(c / 255 for c in base))
+  gain = ts / bs if bs > 0 else 1.0
+
+  def recolor(rgb: RGB) -> RGB:
+    _, l, s = colorsys.rgb_to_hls(*(c / 255 for c in rgb))
+    if s < NEUTRAL_SATURATION:
+      return rgb
+    r, g, b = colorsys.hls_to_rgb(th, l, min(1.0, s * gain))
+    return (round(r * 255), round(g * 255), round(b * 255))
+
+  return recolor
 
 
-def main() -> int:
+@dataclass
+class CoverageLayers:
+  # An icon rasterized once as ordered, colored coverage fragments (spans, pixels, masks).
+  # composite() turns them into pixels for any recoloring without touching the geometry,
+  # so N palettes cost one rasterization plus N blends.
+  canvas_cls: type[Canvas]
+  size: int
+  aa: str
+  fragments: list[tuple]
+
+  @classmethod
+  def capture(cls, recording: DisplayList, size: int = ICON_SIZE, backend: str = "auto", aa: str = "ssaa") -> "CoverageLayers":
+    canvas_cls = canvas_backend(backend)
+    side = raster_side(size, aa)
+    capture = capture_backend(canvas_cls).create(side, side, antialias=aa == "analytic")
+    capture.fragments = []  # type: ignore[attr-defined]
+    recording.replay(capture, side / ICON_SIZE)
+    return cls(canvas_cls, size, aa, capture.fragments)  # type: ignore[attr-defined]
+
+  def layers(self) -> list[RGB]:
+    # Distinct colors, in first-use order: the units a palette recolors.
+    return list(dict.fromkeys(frag[1][:3] for frag in self.fragments))
+
+  def composite(self, recolor: Callable[[RGB], RGB] | None = None) -> Canvas:
+    side = raster_side(self.size, self.aa)
+    canvas = self.canvas_cls.create(side, side, antialias=self.aa == "analytic")
+    composite_fragments(canvas, self.fragments, recolor)
+    return reduce_ssaa(canvas, self.aa)
+
+
+def generate_palette_variants(out_dir: Path, backend: str = "auto", force: bool = False, png: PngOptions = PngOptions(), aa: str = "ssaa", public_dir: Path = PUBLIC_DIR) -> list[str]:
+  # Writes palettes/<name>/<icon>.png for every palette whose resource colors differ from
+  # the defaults, and palettes.json mapping each palette (default, themes, colorblind) to
+  # the directory, relative to out_dir, that holds its icons. Returns the files written.
+  palettes = load_palettes(public_dir)
+  default = palettes["default"]
+  variants = {name: colors for name, colors in palettes.items() if name != "default" and colors != default}
+  index = {name: f"{PALETTE_DIR}/{name}" if name in variants else "." for name in palettes}
+  cached = {} if force else load_cache_manifest(out_dir / PALETTE_DIR)
+
+  entries: dict[str, dict[str, str]] = {}
+  written: list[str] = []
+  for filename, draw_fn in ICONS:
+    resource = filename.rpartition(".")[0]
+    base_key = icon_cache_key(draw_fn, png, aa)
+    todo = []
+    for name, colors in variants.items():
+      rel = f"{name}/{filename}"
+      # The recolor maps the default color onto the palette's, so both are inputs.
+      key = hashlib.sha256(f"{base_key}:{default.get(resource)}:{colors.get(resource)}:{NEUTRAL_SATURATION}".encode()).hexdigest()
+      if cache_hit(cached.get(rel), key, out_dir / PALETTE_DIR / rel):
+        entries[rel] = cached[rel]
+      else:
+        todo.append((name, rel, key, colors))
+    if not todo:
+      continue
+    layers = CoverageLayers.capture(record_icon(draw_fn), ICON_SIZE, backend, aa)
+    for name, rel, key, colors in todo:
+      recolor = palette_recolor(default[resource], colors[resource]) if resource in default and resource in colors else None
+      data = layers.composite(recolor).to_png_bytes(png)
+      path = out_dir / PALETTE_DIR / rel
+      path.parent.mkdir(parents=True, exist_ok=True)
+      write_atomic(path, data)
+      entries[rel] = {"key": key, "sha256": hashlib.sha256(data).hexdigest()}
+      written.append(f"{PALETTE_DIR}/{rel}")
+
+  (out_dir / PALETTE_DIR).mkdir(parents=True, exist_ok=True)
+  save_cache_manifest(out_dir / PALETTE_DIR, entries)
+  index_text = json.dumps({"version": 1, "palettes": index}, indent=2, sort_keys=True) + "\n"
+  index_path = out_dir / PALETTE_MANIFEST
+  if not index_path.exists() or index_path.read_text() != index_text:
+    write_atomic(index_path, index_text.encode())
+    written.append(PALETTE_MANIFEST)
+  return written
+
+
+def profile_icons(backend: str = "auto", png: PngOptions = PngOptions(), aa: str = "ssaa", sizes: tuple[int, ...] = (ICON_SIZE,)) -> RenderProfile:
+  # Render every icon through the instrumented path, without writing anything.
+  profile = RenderProfile()
+  for _, draw_fn in ICONS:
+    recording = record_icon(draw_fn)
+    for size in sizes:
+      rasterize_icon(recording, size, backend, png, aa, profile=profile)
+  return profile
+
+
+def _psnr(a: bytes, b: bytes) -> float:
+  # PSNR in dB between two straight RGBA buffers, compared premultiplied so that color
+  # differences under low alpha count for as little as they show; inf when identical.
+  if a == b:
+    return math.inf
+  if np is not None:
+    pa, pb = (np.frombuffer(x, dtype=np.uint8).reshape(-1, 4).astype(np.float64) for x in (a, b))
+    pa[:, :3] *= pa[:, 3:] / 255
+    pb[:, :3] *= pb[:, 3:] / 255
+    mse = float(((pa - pb) ** 2).mean())
+  else:
+    total = 0.0
+    for i in range(0, len(a), 4):
+      fa, fb = a[i + 3] / 255, b[i + 3] / 255
+      total += sum((a[i + c] * fa - b[i + c] * fb) ** 2 for c in range(3)) + (a[i + 3] - b[i + 3]) ** 2
+    mse = total / len(a)
+  return 10 * math.log10(255 * 255 / mse) if mse else math.inf
+
+
+def png_size_report(backend: str = "auto", png: PngOptions = PngOptions(), aa: str = "ssaa", sizes: tuple[int, ...] = (ICON_SIZE,)) -> str:
+  # Per icon and size: RGBA vs indexed PNG bytes, palette size and the quantization error.
+  lines = [f"{'icon':<16} {'rgba':>8} {'indexed':>8} {'ratio':>6} {'colors':>6} {'psnr':>9}"]
+  totals = [0, 0]
+  for filename, draw_fn in ICONS:
+    recording = record_icon(draw_fn)
+    for size in sizes:
+      canvas = rasterize_canvas(recording, size, backend, aa)
+      full = canvas.to_png_bytes(replace(png, indexed=False))
+      indexed = canvas.to_png_bytes(replace(png, indexed=True))
+      palette, _ = quantize_rgba(canvas.straight_rows(0, canvas.h))
+      psnr = _psnr(decode_png(full)[2], decode_png(indexed)[2])
+      totals[0] += len(full)
+      totals[1] += len(indexed)
+      quality = "exact" if math.isinf(psnr) else f"{psnr:.1f}dB"
+      lines.append(f"{icon_filename(filename, size):<16} {len(full):>8} {len(indexed):>8} {len(full) / len(indexed):>5.2f}x {len(palette):>6} {quality:>9}")
+  lines.append(f"{'total':<16} {totals[0]:>8} {totals[1]:>8} {totals[0] / totals[1]:>5.2f}x")
+  return "\n".join(lines) + "\n"
+
+
+def _parse_sizes(text: str) -> tuple[int, ...]:
+  try:
+    sizes = tuple(dict.fromkeys(int(part) for part in text.split(",") if part.strip()))
+  except ValueError:
+    raise argparse.ArgumentTypeError(f"expected comma-separated pixel sizes, got {text!r}")
+  if not sizes or min(sizes) < 1:
+    raise argparse.ArgumentTypeError("sizes must be positive integers")
+  return sizes
+
+
+def _parse_dims(text: str) -> tuple[int, int]:
+  w, _, h = text.lower().partition("x")
+  try:
+    dims = (int(w), int(h))
+  except ValueError:
+    raise argparse.ArgumentTypeError(f"expected WIDTHxHEIGHT, got {text!r}")
+  if min(dims) < 1:
+    raise argparse.ArgumentTypeError("width and height must be positive integers")
+  return dims
+
+
+def main(argv: list[str] | None = None) -> int:
+  parser = argparse.ArgumentParser(description="Generate the resource PNG icons.")
+  parser.add_argument(
+    "--backend",
+    choices=["auto", "python", "numpy"],
+    default="auto",
+    help="Canvas rasterizer; 'auto' uses NumPy when it is installed (default: auto)",
+  )
+  parser.add_argument(
+    "--jobs",
+    type=int,
+    default=1,
+    metavar="N",
+    help="render icons in N worker processes; 0 means one per CPU (default: 1)",
+  )
+  parser.add_argument(
+    "--png-filter",
+    choices=PNG_FILTERS,
+    default=PngOptions.filter,
+    help="PNG row filter; 'adaptive' picks per row by the minimum-sum heuristic (default: none)",
+  )
+  parser.add_argument(
+    "--png-level",
+    type=int,
+    choices=range(10),
+    default=PngOptions.level,
+    metavar="0-9",
+    help="zlib level: lower encodes faster, higher gives smaller files (default: 9)",
+  )
+  parser.add_argument(
+    "--aa",
+    choices=AA_MODES,
+    default="ssaa",
+    help="anti-aliasing: supersample + filter down (see --ssaa), or analytic edge coverage at output size; analytic edges take any of 255 alpha levels instead of a few, so its PNGs are about twice as large (default and recommended: ssaa)",
+  )
+  parser.add_argument(
+    "--ssaa",
+    type=int,
+    default=2,
+    metavar="N",
+    help=f"with --aa ssaa, rasterize at N x N samples per pixel, 1-{SSAA_MAX}: 1 for fast drafts, 4 for finals (default: 2)",
+  )
+  parser.add_argument(
+    "--ssaa-filter",
+    choices=SSAA_FILTERS,
+    default="box",
+    help="with --aa ssaa, reduction filter: box averages each N x N block, tent also blends in the neighbouring blocks (default: box)",
+  )
+  parser.add_argument(
+    "--tile",
+    type=int,
+    default=0,
+    metavar="PX",
+    help=f"rasterize in PX-sized tiles, skipping empty ones; 0 draws directly (default: 0, try {TILE_SIZE})",
+  )
+  parser.add_argument(
+    "--tile-jobs",
+    type=int,
+    default=1,
+    metavar="N",
+    help="with --tile, rasterize bands of tiles in N worker processes (default: 1)",
+  )
+  parser.add_argument(
+    "--sizes",
+    type=_parse_sizes,
+    default=(ICON_SIZE,),
+    metavar="PX[,PX...]",
+    help=f"output sizes, each rendered from one recording of the icon; sizes other than {ICON_SIZE} are written as <name>-<size>.png (default: {ICON_SIZE}, e.g. {','.join(map(str, ICON_SIZES))})",
+  )
+  parser.add_argument(
+    "--svg",
+    action="store_true",
+    help="also write <icon>.svg from the same draw calls next to the PNGs (overwrites brick/wheat/sheep/wood/ore.svg; the committed SVGs are hand-drawn, so review the diff)",
+  )
+  parser.add_argument(
+    "--svg-digits",
+    type=int,
+    default=SVG_DIGITS,
+    metavar="N",
+    help=f"decimal places kept in SVG coordinates, in 256-unit icon space (default: {SVG_DIGITS})",
+  )
+  parser.add_argument(
+    "--palettes",
+    action="store_true",
+    help=f"also write {PALETTE_DIR}/<palette>/ variants for every theme/colorblind palette that changes resource colors, indexed in {PALETTE_MANIFEST}",
+  )
+  parser.add_argument(
+    "--backgrounds",
+    action="store_true",
+    help=f"also render the procedural backgrounds into shared/backgrounds/{BACKGROUND_DIR}/, streamed to disk in bands of rows",
+  )
+  parser.add_argument(
+    "--background-size",
+    type=_parse_dims,
+    default=BACKGROUND_SIZE,
+    metavar="WxH",
+    help=f"with --backgrounds, output size (default: {BACKGROUND_SIZE[0]}x{BACKGROUND_SIZE[1]})",
+  )
+  parser.add_argument(
+    "--band-rows",
+    type=int,
+    default=BAND_ROWS,
+    metavar="N",
+    help=f"with --backgrounds or --poster, output rows rasterized per band; peak memory grows with N, not the image height (default: {BAND_ROWS})",
+  )
+  parser.add_argument(
+    "--hex-tiles",
+    action="store_true",
+    help=f"also render hex-<resource>-1..{HEX_VARIANTS}.png terrain textures into shared/tiles/ from seeded noise fields",
+  )
+  parser.add_argument(
+    "--hex-size",
+    type=int,
+    default=HEX_TILE_SIZE,
+    metavar="PX",
+    help=f"with --hex-tiles, tile size (default: {HEX_TILE_SIZE})",
+  )
+  parser.add_argument(
+    "--hex-seed",
+    type=int,
+    default=0,
+    metavar="N",
+    help="with --hex-tiles, seed for the terrain fields and detail placement (default: 0)",
+  )
+  parser.add_argument(
+    "--cull",
+    action="store_true",
+    help="rasterize each icon front-to-back and skip pixels that nearer opaque layers already cover; same output, pays off with the numpy backend",
+  )
+  parser.add_argument("--force", action="store_true", help="re-render every icon, ignoring the cache manifest")
+  parser.add_argument(
+    "--watch",
+    action="store_true",
+    help="keep running: poll this script and tools/resource_icons/ and re-render (atomically) only the icons whose draw code or primitives changed",
+  )
+  parser.add_argument(
+    "--watch-interval",
+    type=float,
+    default=0.5,
+    metavar="S",
+    help="with --watch, seconds between polls (default: 0.5)",
+  )
+  parser.add_argument(
+    "--poster",
+    type=int,
+    default=0,
+    metavar="PX",
+    help="instead of the icons, render each one at PX x PX into --poster-dir, splitting every image into bands across --jobs processes that share one output buffer",
+  )
+  parser.add_argument(
+    "--poster-dir",
+    type=Path,
+    default=Path("posters"),
+    metavar="DIR",
+    help="where --poster writes <icon>-<PX>.png (default: ./posters)",
+  )
+  parser.add_argument(
+    "--png-indexed",
+    action="store_true",
+    help="write palette PNGs: exact when an image has <= 256 colors, else median-cut quantized, with tRNS alpha (backgrounds stay RGBA)",
+  )
+  parser.add_argument(
+    "--png-report",
+    action="store_true",
+    help="print RGBA vs indexed PNG size and quantization PSNR for every icon and --sizes size instead of writing icons",
+  )
+  parser.add_argument(
+    "--profile",
+    action="store_true",
+    help="render every icon with per-primitive counters and timers and print a report instead of writing icons",
+  )
+  parser.add_argument(
+    "--profile-out",
+    type=Path,
+    metavar="PATH",
+    help="with --profile, also write the profile: speedscope JSON if PATH ends in .json, else collapsed stacks",
+  )
+  args = parser.parse_args(argv)
+  if args.jobs < 0:
+    parser.error("--jobs must be >= 0")
+  if args.tile < 0 or args.tile_jobs < 1:
+    parser.error("--tile must be >= 0 and --tile-jobs >= 1")
+  if args.cull and args.tile:
+    parser.error("--cull cannot be combined with --tile")
+  if args.profile_out and not args.profile:
+    parser.error("--profile-out requires --profile")
+  if args.watch_interval <= 0:
+    parser.error("--watch-interval must be > 0")
+  if args.poster < 0:
+    parser.error("--poster must be >= 0")
+  if args.hex_size < 1:
+    parser.error("--hex-size must be >= 1")
+  if args.band_rows < 1:
+    parser.error("--band-rows must be >= 1")
+  if not 0 <= args.svg_digits <= 6:
+    parser.error("--svg-digits must be 0-6")
+  if args.backend not in ("auto", *CANVAS_BACKENDS):
+    parser.error(f"--backend {args.backend} requires NumPy, which is not installed")
+  if not 1 <= args.ssaa <= SSAA_MAX:
+    parser.error(f"--ssaa must be 1-{SSAA_MAX}")
+  if args.aa == "analytic" and (args.ssaa, args.ssaa_filter) != (2, "box"):
+    parser.error("--ssaa and --ssaa-filter only apply to --aa ssaa")
+  if args.aa == "ssaa":
+    args.aa = ssaa_mode(args.ssaa, args.ssaa_filter)
+
+  png = PngOptions(level=args.png_level, filter=args.png_filter, indexed=args.png_indexed)
+  if args.poster:
+    args.poster_dir.mkdir(parents=True, exist_ok=True)
+    for filename, draw_fn in ICONS:
+      path = args.poster_dir / icon_filename(filename, args.poster)
+      t0 = time.perf_counter()
+      with open(path, "wb") as fp:
+        render_shared(record_icon(draw_fn), args.poster, args.poster, fp, args.backend, png, args.aa, args.jobs or os.cpu_count() or 1, args.band_rows)
+      print(f"- {path}: {path.stat().st_size} bytes in {time.perf_counter() - t0:.2f}s", flush=True)
+    return 0
+  if args.png_report:
+    sys.stdout.write(png_size_report(args.backend, png, args.aa, args.sizes))
+    return 0
+  if args.profile:
+    profile = profile_icons(args.backend, png, args.aa, args.sizes)
+    sys.stdout.write(profile.report())
+    if args.profile_out:
+      if args.profile_out.suffix == ".json":
+        args.profile_out.write_text(json.dumps(profile.speedscope()) + "\n")
+      else:
+        args.profile_out.write_text(profile.collapsed())
+      print("Wrote profile to:", args.profile_out)
+    return 0
+
   repo_root = Path(__file__).resolve().parents[1]
   out_dir = repo_root / "apps" / "server" / "public" / "shared" / "icons"
-  generate_icons(out_dir)
+  if args.watch:
+    try:
+      watch_icons(out_dir, args.watch_interval, force=args.force, png=png, backend=args.backend, aa=args.aa, tile=args.tile, tile_jobs=args.tile_jobs, sizes=args.sizes, cull=args.cull)
+    except KeyboardInterrupt:
+      pass
+    return 0
+  rendered = generate_icons(out_dir, backend=args.backend, jobs=args.jobs or os.cpu_count() or 1, force=args.force, png=png, aa=args.aa, tile=args.tile, tile_jobs=args.tile_jobs, sizes=args.sizes, cull=args.cull)
   print("Wrote PNG icons to:", out_dir)
-  for name in ["brick.png", "wheat.png", "sheep.png", "wood.png", "ore.png"]:
+  for name in (icon_filename(filename, size) for filename, _ in ICONS for size in args.sizes):
     p = out_dir / name
-    print(f"- {name}: {p.stat().st_size} bytes")
+    status = "" if name in rendered else " (cached)"
+    print(f"- {name}: {p.stat().st_size} bytes{status}")
+  if args.palettes:
+    for name in generate_palette_variants(out_dir, backend=args.backend, force=args.force, png=png, aa=args.aa):
+      print(f"- {name}: {(out_dir / name).stat().st_size} bytes")
+  if args.svg:
+    rendered = generate_svgs(out_dir, force=args.force, digits=args.svg_digits)
+    for name in (svg_filename(filename) for filename, _ in ICONS):
+      status = "" if name in rendered else " (unchanged)"
+      print(f"- {name}: {(out_dir / name).stat().st_size} bytes{status}")
+  if args.backgrounds:
+    bg_dir = PUBLIC_DIR / "shared" / "backgrounds" / BACKGROUND_DIR
+    # Backgrounds are encoded band by band, before a palette for the whole image could exist.
+    rendered = generate_backgrounds(bg_dir, backend=args.backend, force=args.force, png=replace(png, indexed=False), aa=args.aa, size=args.background_size, band_rows=args.band_rows)
+    print("Wrote backgrounds to:", bg_dir)
+    for name in (background_filename(bg.name, *args.background_size) for bg in BACKGROUNDS):
+      status = "" if name in rendered else " (cached)"
+      print(f"- {name}: {(bg_dir / name).stat().st_size} bytes{status}")
+  if args.hex_tiles:
+    tile_dir = PUBLIC_DIR / "shared" / "tiles"
+    rendered = generate_hex_tiles(tile_dir, backend=args.backend, jobs=args.jobs or os.cpu_count() or 1, force=args.force, png=png, aa=args.aa, size=args.hex_size, seed=args.hex_seed)
+    print("Wrote hex tiles to:", tile_dir)
+    for name in (hex_tile_filename(t.resource, v) for t in TERRAINS for v in range(1, HEX_VARIANTS + 1)):
+      status = "" if name in rendered else " (cached)"
+      print(f"- {name}: {(tile_dir / name).stat().st_size} bytes{status}")
   return 0
 
 
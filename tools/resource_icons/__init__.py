@@ -0,0 +1,4 @@
+"""
+The modules behind tools/generate_resource_icons.py: rasterizer backends, PNG and SVG
+writers, build cache, and the background and hex tile generators.
+"""
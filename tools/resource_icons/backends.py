@@ -0,0 +1,215 @@
+"""
+The canvas backend registry, plus the capturing and occlusion-culling subclasses built
+from any backend.
+"""
+
+from __future__ import annotations
+
+import functools
+import math
+from typing import Callable
+
+try:
+  import numpy as np
+except ImportError:  # NumPy is optional; the pure-Python Canvas always works.
+  np = None
+
+from .canvas import Canvas
+from .display_list import DisplayList, _op_boxes
+from .numpy_canvas import NumpyCanvas
+
+
+CANVAS_BACKENDS: dict[str, type[Canvas]] = {"python": Canvas}
+if np is not None:
+  CANVAS_BACKENDS["numpy"] = NumpyCanvas
+
+
+def canvas_backend(name: str = "auto") -> type[Canvas]:
+  if name == "auto":
+    return NumpyCanvas if np is not None else Canvas
+  if name not in CANVAS_BACKENDS:
+    raise ValueError(f"canvas backend {name!r} is not available (have: {', '.join(sorted(CANVAS_BACKENDS))})")
+  return CANVAS_BACKENDS[name]
+
+
+class _FragmentCapture:
+  # Mixed into a Canvas class by capture_backend(): instead of blending, every call that
+  # would reach the buffer is appended to `fragments` with its color. Rasterization never
+  # reads the buffer, so replaying the fragments onto a real canvas (composite_fragments)
+  # gives the same pixels as drawing the geometry again, for any substitute colors.
+  fragments: list[tuple]
+
+  def blend_px(self, x: int, y: int, color: tuple[int, int, int, int]) -> None:
+    if color[3] > 0:
+      self.fragments.append(("px", color, x, y))
+
+  def blend_span(self, y: int, x0: int, x1: int, color: tuple[int, int, int, int]) -> None:
+    if color[3] > 0:
+      self.fragments.append(("span", color, y, x0, x1))
+
+  def _blend_mask(self, x0: int, y0: int, mask: "np.ndarray", color: tuple[int, int, int, int]) -> None:
+    if color[3] > 0:
+      self.fragments.append(("mask", color, x0, y0, mask))
+
+  def _blend_alpha(self, x0: int, y0: int, alpha: "np.ndarray", color: tuple[int, int, int, int]) -> None:
+    if alpha.any():
+      self.fragments.append(("alpha", color, x0, y0, alpha))
+
+
+@functools.lru_cache(maxsize=None)
+def capture_backend(canvas_cls: type[Canvas]) -> type[Canvas]:
+  return type(f"Capture{canvas_cls.__name__}", (_FragmentCapture, canvas_cls), {})  # type: ignore[return-value]
+
+
+def composite_fragments(canvas: Canvas, fragments: list[tuple], recolor: Callable[[tuple[int, int, int]], tuple[int, int, int]] | None = None) -> None:
+  # Blend captured fragments in order, passing each color's RGB through recolor (alpha,
+  # which carries the anti-aliasing coverage, is kept). Recolors are computed once per
+  # distinct color, i.e. once per color layer.
+  mapped: dict[tuple[int, int, int, int], tuple[int, int, int, int]] = {}
+  for frag in fragments:
+    color = frag[1]
+    if recolor is not None:
+      new = mapped.get(color)
+      if new is None:
+        new = mapped[color] = (*recolor(color[:3]), color[3])
+      color = new
+    kind = frag[0]
+    if kind == "span":
+      canvas.blend_span(frag[2], frag[3], frag[4], color)
+    elif kind == "px":
+      canvas.blend_px(frag[2], frag[3], color)
+    elif kind == "alpha":
+      canvas._blend_alpha(frag[2], frag[3], frag[4], color)  # type: ignore[attr-defined]
+    else:
+      canvas._blend_mask(frag[2], frag[3], frag[4], color)  # type: ignore[attr-defined]
+
+
+class _OcclusionCapture:
+  # Mixed into a Canvas class by occlusion_backend(). Ops are replayed nearest-first and
+  # `opaque` holds one byte per pixel, set once a nearer op has blended the pixel at full
+  # alpha. A full-alpha blend replaces the destination outright, so anything an earlier op
+  # would put under it can never show: those fragments are dropped, the rest are captured
+  # into `fragments` for composite_fragments() to blend back-to-front. Marks made while an
+  # op draws are held in `pending` until end_op(), so an op never hides its own fragments.
+  fragments: list[tuple]
+  opaque: bytearray
+  pending: list[tuple]
+
+  def end_op(self) -> None:
+    w = self.w  # type: ignore[attr-defined]
+    opaque = self.opaque
+    for mark in self.pending:
+      if mark[0] == "span":
+        _, y, x0, x1 = mark
+        i = (y - self.row0) * w  # type: ignore[attr-defined]
+        opaque[i + x0 : i + x1 + 1] = b"\x01" * (x1 - x0 + 1)
+      else:
+        _, x0, y0, mask = mark
+        mh, mw = mask.shape
+        np.frombuffer(opaque, dtype=np.uint8).reshape(-1, w)[y0 - self.row0 : y0 - self.row0 + mh, x0 : x0 + mw][mask] = 1  # type: ignore[attr-defined]
+    self.pending.clear()
+
+  def hidden(self, x0: int, y0: int, x1: int, y1: int) -> bool:
+    # True when every pixel of the inclusive rect (clamped to the canvas) is already opaque.
+    w = self.w  # type: ignore[attr-defined]
+    x0 = max(0, x0)
+    x1 = min(w - 1, x1)
+    y0 = max(self.clip_y0, y0)  # type: ignore[attr-defined]
+    y1 = min(self.clip_y1, y1)  # type: ignore[attr-defined]
+    if x0 > x1 or y0 > y1:
+      return True
+    for y in range(y0, y1 + 1):
+      i = (y - self.row0) * w  # type: ignore[attr-defined]
+      if self.opaque.find(0, i + x0, i + x1 + 1) >= 0:
+        return False
+    return True
+
+  def blend_px(self, x: int, y: int, color: tuple[int, int, int, int]) -> None:
+    if color[3] <= 0 or x < self.clip_x0 or y < self.clip_y0 or x > self.clip_x1 or y > self.clip_y1:  # type: ignore[attr-defined]
+      return
+    if self.opaque[(y - self.row0) * self.w + x]:  # type: ignore[attr-defined]
+      return
+    self.fragments.append(("px", color, x, y))
+    if color[3] >= 255:
+      self.pending.append(("span", y, x, x))
+
+  def blend_span(self, y: int, x0: int, x1: int, color: tuple[int, int, int, int]) -> None:
+    if color[3] <= 0 or y < self.clip_y0 or y > self.clip_y1:  # type: ignore[attr-defined]
+      return
+    x0 = max(self.clip_x0, x0)  # type: ignore[attr-defined]
+    x1 = min(self.clip_x1, x1)  # type: ignore[attr-defined]
+    if x1 < x0:
+      return
+    # Split the span into its runs of still-visible pixels.
+    i = (y - self.row0) * self.w  # type: ignore[attr-defined]
+    opaque = self.opaque
+    end = i + x1 + 1
+    start = opaque.find(0, i + x0, end)
+    while start >= 0:
+      stop = opaque.find(1, start, end)
+      if stop < 0:
+        stop = end
+      self.fragments.append(("span", color, y, start - i, stop - 1 - i))
+      start = opaque.find(0, stop, end) if stop < end else -1
+    if color[3] >= 255:
+      self.pending.append(("span", y, x0, x1))
+
+  def _blend_mask(self, x0: int, y0: int, mask: "np.ndarray", color: tuple[int, int, int, int]) -> None:
+    if color[3] <= 0:
+      return
+    mh, mw = mask.shape
+    region = np.frombuffer(self.opaque, dtype=np.uint8).reshape(-1, self.w)[y0 - self.row0 : y0 - self.row0 + mh, x0 : x0 + mw]  # type: ignore[attr-defined]
+    visible = mask & (region == 0)
+    if visible.any():
+      self.fragments.append(("mask", color, x0, y0, visible))
+    if color[3] >= 255:
+      self.pending.append(("mask", x0, y0, mask))
+
+  def _blend_alpha(self, x0: int, y0: int, alpha: "np.ndarray", color: tuple[int, int, int, int]) -> None:
+    mh, mw = alpha.shape
+    region = np.frombuffer(self.opaque, dtype=np.uint8).reshape(-1, self.w)[y0 - self.row0 : y0 - self.row0 + mh, x0 : x0 + mw]  # type: ignore[attr-defined]
+    visible = np.where(region == 0, alpha, 0)
+    if visible.any():
+      self.fragments.append(("alpha", color, x0, y0, visible))
+    self.pending.append(("mask", x0, y0, alpha >= 255))
+
+
+@functools.lru_cache(maxsize=None)
+def occlusion_backend(canvas_cls: type[Canvas]) -> type[Canvas]:
+  return type(f"Occlusion{canvas_cls.__name__}", (_OcclusionCapture, canvas_cls), {})  # type: ignore[return-value]
+
+
+def replay_occluded(recording: DisplayList, canvas: Canvas, scale: float = 1.0) -> int:
+  # Same pixels as recording.replay(canvas, scale), but rasterized front-to-back against
+  # an opaque-pixel buffer (see _OcclusionCapture): fragments under a nearer full-alpha
+  # blend are never composited, and an op whose whole scan box is already opaque is not
+  # rasterized at all. Returns the number of ops skipped that way.
+  capture = occlusion_backend(type(canvas)).create_band(canvas.w, canvas.h, canvas.row0, len(canvas.buf) // (canvas.w * 4), canvas.antialias)
+  capture.opaque = bytearray(len(canvas.buf) // 4)  # type: ignore[attr-defined]
+  capture.pending = []  # type: ignore[attr-defined]
+  capture.set_clip((canvas.clip_x0, canvas.clip_y0, canvas.clip_x1, canvas.clip_y1))
+  layers: list[list[tuple]] = []
+  skipped = 0
+  for index in range(len(recording.ops) - 1, -1, -1):
+    name, args = recording.ops[index]
+    boxes = _op_boxes(name, args)
+    # The rasterizers' scan box: the op's bounds plus their 2px padding.
+    x0 = math.floor(min(b[0] for b in boxes) * scale - 2)
+    y0 = math.floor(min(b[1] for b in boxes) * scale - 2)
+    x1 = math.ceil(max(b[2] for b in boxes) * scale + 2)
+    y1 = math.ceil(max(b[3] for b in boxes) * scale + 2)
+    if name in ("fill_ellipse", "fill_circle") and canvas.antialias:
+      # Analytic ellipses scan max(rx, ry) around the center on both axes (see _op_reach).
+      grow = max(x1 - x0, y1 - y0) // 2 + 1
+      x0, x1 = (x0 + x1) // 2 - grow, (x0 + x1) // 2 + grow
+      y0, y1 = (y0 + y1) // 2 - grow, (y0 + y1) // 2 + grow
+    if capture.hidden(x0, y0, x1, y1):  # type: ignore[attr-defined]
+      skipped += 1
+      continue
+    capture.fragments = []  # type: ignore[attr-defined]
+    recording.replay(capture, scale, index, index + 1)
+    capture.end_op()  # type: ignore[attr-defined]
+    layers.append(capture.fragments)  # type: ignore[attr-defined]
+  for fragments in reversed(layers):
+    composite_fragments(canvas, fragments)
+  return skipped
@@ -0,0 +1,171 @@
+"""
+Procedural backgrounds (--backgrounds), streamed to PNG one band of rows at a time.
+"""
+
+from __future__ import annotations
+
+import functools
+import hashlib
+import math
+import random
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import BinaryIO
+
+from .backends import canvas_backend
+from .bands import BAND_ROWS, _filtered_rows, _row_bands
+from .cache import atomic_file, cache_hit, load_cache_manifest, render_key, save_cache_manifest
+from .canvas import RGB, Canvas, rgba
+from .display_list import DisplayList
+from .png import PngOptions, PngWriter
+
+
+BACKGROUND_DIR = "procedural"
+BACKGROUND_SIZE = (1920, 1080)
+
+
+VIGNETTE_LEVELS = 128
+
+
+@dataclass(frozen=True)
+class Background:
+  # A procedural backdrop: a vertical gradient, soft smudge ellipses scattered from `seed`
+  # (the same kind as the smudges behind the bricks icon) and a radial vignette.
+  name: str
+  top: RGB
+  bottom: RGB
+  smudge: RGB
+  seed: int
+  smudges: int = 48
+  vignette: float = 0.45  # Brightness lost at the corners, 0-1.
+
+
+BACKGROUNDS = (
+  Background("table", top=(38, 44, 56), bottom=(18, 20, 28), smudge=(92, 104, 128), seed=1),
+  Background("hearth", top=(60, 46, 36), bottom=(26, 20, 16), smudge=(150, 96, 60), seed=2),
+  Background("harbor", top=(30, 72, 98), bottom=(12, 30, 46), smudge=(120, 180, 210), seed=3),
+)
+
+
+def background_filename(name: str, w: int, h: int) -> str:
+  return f"{name}-{w}x{h}.png"
+
+
+def record_background(bg: Background, w: int, h: int) -> DisplayList:
+  # The smudge layer in output pixels; shapes scale with the image so every size matches.
+  canvas = DisplayList(w, h)
+  rng = random.Random(bg.seed)
+  s = max(w, h) / BACKGROUND_SIZE[0]
+  with canvas.group(f"background {bg.name}"):
+    for _ in range(bg.smudges):
+      cx = rng.uniform(0, w)
+      cy = rng.uniform(0, h)
+      rx = rng.uniform(60, 340) * s
+      # Axis-aligned like the icon smudges: the ssaa ellipse rasterizer bounds rows by ry.
+      canvas.fill_ellipse(cx, cy, rx, rx * rng.uniform(0.4, 0.8), 0.0, rgba(*bg.smudge, rng.randint(5, 18)))
+  return canvas
+
+
+@functools.lru_cache(maxsize=None)
+def _vignette_tables(strength: float) -> list[bytes]:
+  # Channel lookup per vignette level, each level scaled by its mid-level brightness.
+  n = VIGNETTE_LEVELS
+  return [bytes(round(c * (1.0 - strength * (level + 0.5) / n)) for c in range(256)) for level in range(n)]
+
+
+def _vignette_rows(rows: bytearray, w: int, h: int, y0: int, strength: float) -> None:
+  # Darken straight RGBA rows y0.. of a w x h image toward the corners. A pixel's level is
+  # its squared distance from the center, normalized to 1 at the corners, in
+  # VIGNETTE_LEVELS steps; levels grow outward, so each row splits into concentric spans
+  # and every pixel goes through exactly one bytes.translate(). Alpha is left alone.
+  if strength <= 0:
+    return
+  n = VIGNETTE_LEVELS
+  tables = _vignette_tables(strength)
+  cx = w / 2
+  cy = h / 2
+  stride = w * 4
+  for row in range(len(rows) // stride):
+    gy = (y0 + row + 0.5 - cy) / cy
+    level = min(n - 1, int(gy * gy / 2 * n))
+    base = row * stride
+    # Pixels lo..hi are the ones below the current level (none yet).
+    lo = w
+    hi = w - 1
+    while lo > 0 or hi < w - 1:
+      if level >= n - 1:
+        nlo, nhi = 0, w - 1
+      else:
+        # Level <= L exactly where |x + 0.5 - cx| < t.
+        t = cx * math.sqrt(max(0.0, 2 * (level + 1) / n - gy * gy))
+        nlo = max(0, math.floor(cx - 0.5 - t) + 1)
+        nhi = min(w - 1, math.ceil(cx - 0.5 + t) - 1)
+      spans = [(nlo, nhi)] if lo > hi else [(nlo, lo - 1), (hi + 1, nhi)]
+      for a, b in spans:
+        if a > b:
+          continue
+        i0 = base + a * 4
+        i1 = base + (b + 1) * 4
+        for c in range(3):
+          rows[i0 + c : i1 : 4] = rows[i0 + c : i1 : 4].translate(tables[level])
+      if nlo <= nhi:
+        lo, hi = nlo, nhi
+      level += 1
+
+
+def write_background_png(fp: BinaryIO, bg: Background, w: int, h: int, backend: str = "auto", png: PngOptions = PngOptions(), aa: str = "ssaa", band_rows: int = BAND_ROWS) -> None:
+  # Stream the background to fp one band of output rows at a time: each band gets its own
+  # (supersampled) canvas, is downsampled, vignetted and pushed through the PngWriter's
+  # zlib stream, so neither the full raster nor the raw image ever exists in memory.
+  canvas_cls = canvas_backend(backend)
+
+  def gradient(band: Canvas) -> None:
+    # One opaque span per raster row of the band, top color to bottom color.
+    for y in range(band.clip_y0, band.clip_y1 + 1):
+      t = (y + 0.5) / band.h
+      band.blend_span(y, 0, band.w - 1, (*(round(a + (b - a) * t) for a, b in zip(bg.top, bg.bottom)), 255))  # type: ignore[arg-type]
+
+  writer = PngWriter(fp, w, h, png)
+  for y0, y1, ops in _row_bands(record_background(bg, w, h).ops, h, 1.0, aa, band_rows):
+    band, r0 = _filtered_rows(canvas_cls, ops, w, h, 1.0, aa, y0, y1, base=gradient)
+    rows = bytearray(band.straight_rows(y0 - r0, y1 - r0))
+    _vignette_rows(rows, w, h, y0, bg.vignette)
+    writer.write_rows(rows)
+  writer.close()
+
+
+def generate_backgrounds(out_dir: Path, backend: str = "auto", force: bool = False, png: PngOptions = PngOptions(), aa: str = "ssaa", size: tuple[int, int] = BACKGROUND_SIZE, band_rows: int = BAND_ROWS) -> list[str]:
+  # Writes <name>-<w>x<h>.png per BACKGROUNDS entry, skipping ones whose cache entry in
+  # out_dir is current. Returns the filenames written.
+  canvas_backend(backend)
+  out_dir.mkdir(parents=True, exist_ok=True)
+  cached = {} if force else load_cache_manifest(out_dir)
+  known = {background_filename(bg.name, *size) for bg in BACKGROUNDS}
+  entries = {name: entry for name, entry in cached.items() if name not in known}
+  written: list[str] = []
+  for bg in BACKGROUNDS:
+    name = background_filename(bg.name, *size)
+    key = render_key(("write_background_png",), {"background": asdict(bg), "size": size, "aa": aa, "png": asdict(png)})
+    path = out_dir / name
+    if cache_hit(cached.get(name), key, path):
+      entries[name] = cached[name]
+      continue
+    digest = hashlib.sha256()
+    with atomic_file(path) as fp:
+      write_background_png(_HashingWriter(fp, digest), bg, *size, backend=backend, png=png, aa=aa, band_rows=band_rows)  # type: ignore[arg-type]
+    entries[name] = {"key": key, "sha256": digest.hexdigest()}
+    written.append(name)
+  save_cache_manifest(out_dir, entries)
+  return written
+
+
+class _HashingWriter:
+  # File wrapper that hashes everything written through it, so a streamed PNG's digest
+  # is known without reading the file back.
+  def __init__(self, fp: BinaryIO, digest: "hashlib._Hash") -> None:
+    self.fp = fp
+    self.digest = digest
+
+  def write(self, data: bytes) -> int:
+    self.digest.update(data)
+    return self.fp.write(data)
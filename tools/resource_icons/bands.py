@@ -0,0 +1,103 @@
+"""
+Band rendering for large images: output rows are rasterized and filtered a band at a
+time, serially or in worker processes that share one output buffer.
+"""
+
+from __future__ import annotations
+
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import BinaryIO, Callable, Iterator
+
+from .backends import canvas_backend
+from .canvas import Canvas, aa_params, raster_side, reduce_ssaa
+from .display_list import DisplayList, _op_reach
+from .png import PngOptions
+
+
+# Output rows per band: peak memory is about (raster width * 2 * BAND_ROWS * 4) bytes
+# for the supersampled band plus one compressed IDAT chunk, whatever the image height.
+BAND_ROWS = 64
+
+
+def _band_halo(aa: str) -> int:
+  # A tent filter reads up to half a block past each output row, so each band is rendered
+  # with one extra output row above and below it (inside the image) and then cropped.
+  return 1 if raster_side(1, aa) > 1 and aa_params(aa)[1] == "tent" else 0
+
+
+def _row_bands(ops: list[tuple[str, tuple]], h: int, scale: float, aa: str, band_rows: int) -> Iterator[tuple[int, int, list[tuple[str, tuple]]]]:
+  # (y0, y1, ops) per band of band_rows output rows: just the ops that reach the band's
+  # raster rows, halo included.
+  ss = raster_side(1, aa)
+  halo = _band_halo(aa)
+  reach = _op_reach(ops, scale * ss, aa == "analytic")
+  for y0 in range(0, h, band_rows):
+    y1 = min(h, y0 + band_rows)
+    r0, r1 = max(0, y0 - halo) * ss, min(h, y1 + halo) * ss
+    yield y0, y1, [op for op, (top, bottom) in zip(ops, reach) if top < r1 and bottom >= r0]
+
+
+def _filtered_rows(canvas_cls: type[Canvas], ops: list[tuple[str, tuple]], w: int, h: int, scale: float, aa: str, y0: int, y1: int, base: Callable[[Canvas], None] | None = None) -> tuple[Canvas, int]:
+  # Rasterize output rows y0..y1-1 of a w x h image (recording units * scale = output
+  # pixels) into a band canvas holding just those rows plus the halo, after `base` has
+  # painted it, and filter it down. Returns the filtered rows and the output row the first
+  # of them is. ops must include every op that reaches the band.
+  ss = raster_side(1, aa)
+  halo = _band_halo(aa)
+  r0 = max(0, y0 - halo)
+  r1 = min(h, y1 + halo)
+  band = canvas_cls.create_band(w * ss, h * ss, r0 * ss, (r1 - r0) * ss, antialias=aa == "analytic")
+  if base is not None:
+    base(band)
+  visible = DisplayList(w, h)
+  visible.ops = ops
+  visible.replay(band, scale * ss)
+  return reduce_ssaa(canvas_cls(w=band.w, h=(r1 - r0) * ss, buf=band.buf), aa), r0
+
+
+def _render_rows(out: "bytearray | memoryview", canvas_cls: type[Canvas], ops: list[tuple[str, tuple]], w: int, h: int, scale: float, aa: str, y0: int, y1: int) -> None:
+  # Filter output rows y0..y1-1 (see _filtered_rows) and store them at their place in `out`.
+  rows, r0 = _filtered_rows(canvas_cls, ops, w, h, scale, aa, y0, y1)
+  stride = w * 4
+  out[y0 * stride : y1 * stride] = rows.buf[(y0 - r0) * stride : (y1 - r0) * stride]
+
+
+def _render_shared_rows(name: str, *args: object) -> None:
+  # Worker side of render_shared: write the band straight into the parent's buffer.
+  shm = shared_memory.SharedMemory(name=name)
+  try:
+    _render_rows(shm.buf, *args)  # type: ignore[arg-type]
+  finally:
+    shm.close()
+
+
+def render_shared(recording: DisplayList, w: int, h: int, fp: BinaryIO, backend: str = "auto", png: PngOptions = PngOptions(), aa: str = "ssaa", jobs: int = 1, band_rows: int = BAND_ROWS) -> None:
+  # Render one large image band-parallel: `jobs` worker processes each rasterize bands of
+  # band_rows output rows (only the ops that reach a band are sent to it) and write the
+  # filtered rows into one shared-memory buffer, which the parent then encodes to fp in
+  # place. No process ever holds the whole supersampled raster. Output matches
+  # rasterize_canvas() for the same scale.
+  canvas_cls = canvas_backend(backend)
+  scale = w / recording.w
+  bands = [(canvas_cls, ops, w, h, scale, aa, y0, y1) for y0, y1, ops in _row_bands(recording.ops, h, scale, aa, band_rows)]
+  if jobs <= 1:
+    out = canvas_cls.create(w, h)
+    for band in bands:
+      _render_rows(out.buf, *band)
+    out.write_png(fp, png)
+    return
+  shm = shared_memory.SharedMemory(create=True, size=w * h * 4)
+  try:
+    with ProcessPoolExecutor(max_workers=min(jobs, len(bands))) as pool:
+      for future in [pool.submit(_render_shared_rows, shm.name, *band) for band in bands]:
+        future.result()
+    out = canvas_cls(w=w, h=h, buf=shm.buf)  # type: ignore[arg-type]
+    try:
+      out.write_png(fp, png)
+    finally:
+      # The canvas (and a NumPy view over the buffer) must be gone before the mapping closes.
+      del out
+  finally:
+    shm.close()
+    shm.unlink()
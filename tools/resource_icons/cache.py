@@ -0,0 +1,165 @@
+"""
+Build cache for the generator's outputs: cache keys over the source that renders each
+output, and the per-directory manifests that record them.
+"""
+
+from __future__ import annotations
+
+import ast
+import contextlib
+import functools
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import BinaryIO, Iterator
+
+
+TOOLS_DIR = Path(__file__).resolve().parents[1]
+PUBLIC_DIR = TOOLS_DIR.parent / "apps" / "server" / "public"
+# Cache manifests live in tools/.cache/, not next to the output, so they are never
+# served from public/ or picked up by git (tools/.cache/ is ignored).
+CACHE_DIR = TOOLS_DIR / ".cache"
+# The source cache keys are computed over: the generator script and this package.
+SOURCE_FILES = (TOOLS_DIR / "generate_resource_icons.py", *sorted(Path(__file__).resolve().parent.glob("*.py")))
+# Per-def source digests of SOURCE_FILES, keyed on each file's mtime and size, so a run
+# over unchanged source skips parsing it.
+SOURCE_INDEX = "_sources.json"
+
+
+def _parse_defs(path: Path) -> dict[str, list]:
+  # Top-level def/class name -> [sha256 of its source text, sorted names it references].
+  defs: dict[str, list] = {}
+  text = path.read_text()
+  lines = text.splitlines(keepends=True)
+  for node in ast.parse(text).body:
+    if isinstance(node, (ast.FunctionDef, ast.ClassDef)):
+      start = min([node.lineno, *(d.lineno for d in node.decorator_list)])
+      digest = hashlib.sha256("".join(lines[start - 1 : node.end_lineno]).encode()).hexdigest()
+      names = {n.id for n in ast.walk(node) if isinstance(n, ast.Name)}
+      if node.name in defs:
+        digest = defs[node.name][0] + digest
+        names |= set(defs[node.name][1])
+      defs[node.name] = [digest, sorted(names)]
+  return defs
+
+
+def _load_source_index(path: Path) -> dict[str, dict]:
+  try:
+    data = json.loads(path.read_text())
+  except (OSError, ValueError):
+    return {}
+  if not isinstance(data, dict) or data.get("version") != 1 or not isinstance(data.get("files"), dict):
+    return {}
+  return data["files"]
+
+
+@functools.lru_cache(maxsize=1)
+def _module_defs() -> dict[str, tuple[str, frozenset[str]]]:
+  # Top-level def/class name -> (source digest, names it references) across SOURCE_FILES,
+  # computed once per process. Only files whose mtime or size changed since the last run
+  # are parsed again. A name defined in more than one file keeps all its digests.
+  index_path = CACHE_DIR / SOURCE_INDEX
+  old = _load_source_index(index_path)
+  files: dict[str, dict] = {}
+  for path in SOURCE_FILES:
+    st = path.stat()
+    entry = old.get(str(path))
+    if not entry or entry.get("mtime_ns") != st.st_mtime_ns or entry.get("size") != st.st_size:
+      entry = {"mtime_ns": st.st_mtime_ns, "size": st.st_size, "defs": _parse_defs(path)}
+    files[str(path)] = entry
+  if files != old:
+    index_path.parent.mkdir(parents=True, exist_ok=True)
+    write_atomic(index_path, (json.dumps({"version": 1, "files": files}, sort_keys=True) + "\n").encode())
+
+  defs: dict[str, tuple[str, frozenset[str]]] = {}
+  for entry in files.values():
+    for name, (digest, names) in entry["defs"].items():
+      if name in defs:
+        digest = defs[name][0] + digest
+        names = defs[name][1] | frozenset(names)
+      defs[name] = (digest, frozenset(names))
+  return defs
+
+
+def source_closure(*roots: str) -> dict[str, str]:
+  # Source digest of each named top-level def/class plus every other one it reaches by name.
+  defs = _module_defs()
+  sources: dict[str, str] = {}
+  stack = list(roots)
+  while stack:
+    name = stack.pop()
+    if name in sources or name not in defs:
+      continue
+    digest, names = defs[name]
+    sources[name] = digest
+    stack.extend(names)
+  return sources
+
+
+def render_key(roots: tuple[str, ...], settings: dict[str, object]) -> str:
+  # Cache key over the source reachable from `roots` plus the settings that shape the output.
+  h = hashlib.sha256()
+  for name, digest in sorted(source_closure(*roots).items()):
+    h.update(name.encode() + b"\0" + digest.encode() + b"\0")
+  h.update(json.dumps(settings, sort_keys=True).encode())
+  return h.hexdigest()
+
+
+def cache_manifest_path(out_dir: Path) -> Path:
+  # One manifest per output directory: shared-icons.json for public/shared/icons, and
+  # <dir>-<path hash>.json for directories outside public/.
+  out = out_dir.resolve()
+  try:
+    label = out.relative_to(PUBLIC_DIR).as_posix().replace("/", "-")
+  except ValueError:
+    label = f"{out.name}-{hashlib.sha256(str(out).encode()).hexdigest()[:12]}"
+  return CACHE_DIR / f"{label}.json"
+
+
+def load_cache_manifest(out_dir: Path) -> dict[str, dict[str, str]]:
+  # Output filename -> {"key", "sha256"} as of the last run into `out_dir`; {} when there
+  # is no usable manifest.
+  try:
+    data = json.loads(cache_manifest_path(out_dir).read_text())
+  except (OSError, ValueError):
+    return {}
+  if not isinstance(data, dict) or data.get("version") != 1 or not isinstance(data.get("icons"), dict):
+    return {}
+  return data["icons"]
+
+
+def save_cache_manifest(out_dir: Path, entries: dict[str, dict[str, str]]) -> None:
+  path = cache_manifest_path(out_dir)
+  path.parent.mkdir(parents=True, exist_ok=True)
+  write_atomic(path, (json.dumps({"version": 1, "icons": entries}, indent=2, sort_keys=True) + "\n").encode())
+
+
+def cache_hit(entry: dict[str, str] | None, key: str, out_path: Path) -> bool:
+  # True when a manifest entry was rendered with `key` and `out_path` still holds its bytes.
+  if not entry or entry.get("key") != key:
+    return False
+  try:
+    return hashlib.sha256(out_path.read_bytes()).hexdigest() == entry.get("sha256")
+  except OSError:
+    return False
+
+
+@contextlib.contextmanager
+def atomic_file(path: Path) -> Iterator[BinaryIO]:
+  # Open a sibling temp file for writing and rename it over `path` when the block exits
+  # cleanly, so a reader (the running server) sees either the old file or the new one,
+  # never a partial write. On any exception the temp file is removed and `path` is untouched.
+  tmp = path.with_name(f".{path.name}.tmp")
+  try:
+    with tmp.open("wb") as fp:
+      yield fp
+    os.replace(tmp, path)
+  except BaseException:
+    tmp.unlink(missing_ok=True)
+    raise
+
+
+def write_atomic(path: Path, data: bytes) -> None:
+  with atomic_file(path) as fp:
+    fp.write(data)
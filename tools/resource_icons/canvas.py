@@ -0,0 +1,801 @@
+"""
+The pure-Python rasterizer (Canvas), its tiled wrapper (TiledCanvas), and the
+anti-aliasing modes every renderer accepts.
+"""
+
+from __future__ import annotations
+
+import functools
+import io
+import math
+import operator
+import re
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import BinaryIO, Callable
+
+from .png import _PARTIAL_ALPHA, PngOptions, PngWriter, _unpremul_table, palette_chunks, quantize_rgba
+
+
+def clamp_int(n: float, lo: int, hi: int) -> int:
+  if n < lo:
+    return lo
+  if n > hi:
+    return hi
+  return int(n)
+
+
+def rgba(r: int, g: int, b: int, a: int = 255) -> tuple[int, int, int, int]:
+  return (clamp_int(r, 0, 255), clamp_int(g, 0, 255), clamp_int(b, 0, 255), clamp_int(a, 0, 255))
+
+
+RGB = tuple[int, int, int]
+
+
+def chamfered_rect_points(w: float, h: float, c: float) -> list[tuple[float, float]]:
+  hw = w / 2.0
+  hh = h / 2.0
+  c = max(0.0, min(c, hw, hh))
+  # Clockwise.
+  return [
+    (hw - c, -hh),
+    (hw, -hh + c),
+    (hw, hh - c),
+    (hw - c, hh),
+    (-hw + c, hh),
+    (-hw, hh - c),
+    (-hw, -hh + c),
+    (-hw + c, -hh),
+  ]
+
+
+@functools.lru_cache(maxsize=512)
+def _over_tables(pr: int, pg: int, pb: int, pa: int) -> tuple[bytes, bytes, bytes, bytes]:
+  # Per-channel 256-entry lookup tables for premultiplied "over": dst -> src + dst * (255 - a) / 255.
+  inv = 255 - pa
+  return tuple(bytes(p + (d * inv) // 255 for d in range(256)) for p in (pr, pg, pb, pa))  # type: ignore[return-value]
+
+
+def _ellipse_row(rx: float, ry: float, cos_a: float, sin_a: float, py: float) -> tuple[float, float]:
+  # x-interval (relative to the center) where a rotated ellipse crosses the row at offset py:
+  # in local coordinates the row is a line, so solve qa*px^2 + qb*px + qc <= 0. A row that
+  # misses returns the degenerate interval at the closest approach.
+  inv_rx2 = 1.0 / (rx * rx)
+  inv_ry2 = 1.0 / (ry * ry)
+  qa = cos_a * cos_a * inv_rx2 + sin_a * sin_a * inv_ry2
+  qb = 2.0 * cos_a * sin_a * (inv_rx2 - inv_ry2) * py
+  qc = (sin_a * sin_a * inv_rx2 + cos_a * cos_a * inv_ry2) * py * py - 1.0
+  disc = qb * qb - 4.0 * qa * qc
+  root = math.sqrt(disc) if disc > 0.0 else 0.0
+  return (-qb - root) / (2.0 * qa), (-qb + root) / (2.0 * qa)
+
+
+def _capsule_row(x1: float, y1: float, x2: float, y2: float, r: float, py: float) -> tuple[float, float] | None:
+  # x-interval where the capsule (segment x1,y1-x2,y2 swept by radius r) crosses the row
+  # y = py. The capsule is convex, so this is the hull of the intervals through the two
+  # end caps and the body (0 <= t <= 1, |perpendicular| <= r).
+  vx = x2 - x1
+  vy = y2 - y1
+  vv = vx * vx + vy * vy
+  length = math.sqrt(vv)
+  wy = py - y1
+  lo = math.inf
+  hi = -math.inf
+  for ex, ey in ((x1, y1), (x2, y2)):
+    k = r * r - (py - ey) * (py - ey)
+    if k >= 0.0:
+      half = math.sqrt(k)
+      lo = min(lo, ex - half)
+      hi = max(hi, ex + half)
+  body_lo = -math.inf
+  body_hi = math.inf
+  # t(px) = ((px - x1) * vx + wy * vy) / vv in [0, 1].
+  if vx != 0.0:
+    ta = x1 - wy * vy / vx
+    tb = x1 + (vv - wy * vy) / vx
+    body_lo, body_hi = max(body_lo, min(ta, tb)), min(body_hi, max(ta, tb))
+  elif not 0.0 <= wy * vy / vv <= 1.0:
+    return (lo, hi) if lo <= hi else None
+  # perp(px) = ((px - x1) * vy - wy * vx) / length in [-r, r].
+  if vy != 0.0:
+    pa = x1 + (wy * vx - r * length) / vy
+    pb = x1 + (wy * vx + r * length) / vy
+    body_lo, body_hi = max(body_lo, min(pa, pb)), min(body_hi, max(pa, pb))
+  elif abs(wy * vx) > r * length:
+    return (lo, hi) if lo <= hi else None
+  if body_lo <= body_hi:
+    lo = min(lo, body_lo)
+    hi = max(hi, body_hi)
+  return (lo, hi) if lo <= hi else None
+
+
+SSAA_FILTERS = ("box", "tent")
+SSAA_MAX = 8
+
+
+@functools.lru_cache(maxsize=None)
+def _ssaa_taps(k: int, filt: str) -> tuple[tuple[tuple[int, int], ...], int]:
+  # ((source offset from the block's first sample, integer weight), ...) for one axis of a
+  # k-times reduction, plus the weights' sum. The tent is 2k samples wide, centered on the
+  # output pixel; its weights 2k - |2j + 1 - k| sum to 2k^2.
+  if filt == "box":
+    return tuple((j, 1) for j in range(k)), k
+  taps = tuple((j, 2 * k - abs(2 * j + 1 - k)) for j in range(-k, 2 * k) if abs(2 * j + 1 - k) < 2 * k)
+  return taps, 2 * k * k
+
+
+def _segment_dist(px: float, py: float, x1: float, y1: float, vx: float, vy: float, inv_vv: float) -> float:
+  t = ((px - x1) * vx + (py - y1) * vy) * inv_vv
+  if t < 0.0:
+    t = 0.0
+  elif t > 1.0:
+    t = 1.0
+  dx = px - (x1 + t * vx)
+  dy = py - (y1 + t * vy)
+  return math.sqrt(dx * dx + dy * dy)
+
+
+@dataclass
+class Canvas:
+  w: int
+  h: int
+  # Premultiplied RGBA bytes.
+  buf: bytearray
+  # Coverage-based anti-aliasing: primitives blend fractional edge coverage instead of
+  # a hard pixel-center test, so icons can be drawn directly at output resolution.
+  antialias: bool = False
+  # First image row held in buf. A band canvas (see create_band) stores only rows
+  # row0..row0 + len(buf) // (w * 4) - 1 of its h rows and clips every primitive to them,
+  # so shapes are rasterized in image coordinates exactly as on the full canvas.
+  row0: int = 0
+
+  @classmethod
+  def create(cls, w: int, h: int, antialias: bool = False) -> "Canvas":
+    return cls(w=w, h=h, buf=bytearray(w * h * 4), antialias=antialias)
+
+  @classmethod
+  def create_band(cls, w: int, h: int, row0: int, rows: int, antialias: bool = False) -> "Canvas":
+    return cls(w=w, h=h, buf=bytearray(w * rows * 4), antialias=antialias, row0=row0)
+
+  def __post_init__(self) -> None:
+    self.set_clip(None)
+
+  def set_clip(self, rect: tuple[int, int, int, int] | None) -> None:
+    # Inclusive (x0, y0, x1, y1) pixel rect that every primitive is limited to; None
+    # means the whole canvas. Pixels are independent, so drawing the same calls once per
+    # clip rect produces the same result as one unclipped pass.
+    x0, y0, x1, y1 = rect if rect is not None else (0, 0, self.w - 1, self.h - 1)
+    self.clip_x0 = max(0, x0)
+    self.clip_y0 = max(self.row0, y0)
+    self.clip_x1 = min(self.w - 1, x1)
+    self.clip_y1 = min(self.row0 + len(self.buf) // (self.w * 4) - 1, self.h - 1, y1)
+
+  def _blend_px_premul(self, x: int, y: int, pr: int, pg: int, pb: int, pa: int) -> None:
+    if pa <= 0:
+      return
+    if x < self.clip_x0 or y < self.clip_y0 or x > self.clip_x1 or y > self.clip_y1:
+      return
+    i = ((y - self.row0) * self.w + x) * 4
+    dst_r = self.buf[i + 0]
+    dst_g = self.buf[i + 1]
+    dst_b = self.buf[i + 2]
+    dst_a = self.buf[i + 3]
+    inv = 255 - pa
+    self.buf[i + 0] = pr + (dst_r * inv) // 255
+    self.buf[i + 1] = pg + (dst_g * inv) // 255
+    self.buf[i + 2] = pb + (dst_b * inv) // 255
+    self.buf[i + 3] = pa + (dst_a * inv) // 255
+
+  def blend_px(self, x: int, y: int, color: tuple[int, int, int, int]) -> None:
+    r, g, b, a = color
+    if a <= 0:
+      return
+    pr = (r * a) // 255
+    pg = (g * a) // 255
+    pb = (b * a) // 255
+    self._blend_px_premul(x, y, pr, pg, pb, a)
+
+  def _convex_span(self, lo_f: float, hi_f: float, inside: "Callable[[int], bool]", min_x: int, max_x: int) -> tuple[int, int] | None:
+    # Turn an analytic row interval [lo_f, hi_f] (pixel-center x) into the pixel span the
+    # exact per-pixel test would accept. The shape is convex, so only the two ends need
+    # checking; this absorbs any rounding difference between the closed form and the test.
+    x0 = max(min_x, int(math.ceil(lo_f - 0.5)))
+    x1 = min(max_x, int(math.floor(hi_f - 0.5)))
+    if x0 > x1:
+      mid = clamp_int(math.floor((lo_f + hi_f) * 0.5), min_x, max_x)
+      for x in (mid, mid - 1, mid + 1):
+        if min_x <= x <= max_x and inside(x):
+          x0 = x1 = x
+          break
+      else:
+        return None
+    while x0 <= x1 and not inside(x0):
+      x0 += 1
+    while x1 >= x0 and not inside(x1):
+      x1 -= 1
+    if x0 > x1:
+      return None
+    while x0 > min_x and inside(x0 - 1):
+      x0 -= 1
+    while x1 < max_x and inside(x1 + 1):
+      x1 += 1
+    return x0, x1
+
+  def fill_ellipse(self, cx: float, cy: float, rx: float, ry: float, angle_rad: float, color: tuple[int, int, int, int]) -> None:
+    if rx <= 0 or ry <= 0:
+      return
+    if self.antialias:
+      self._fill_ellipse_aa(cx, cy, rx, ry, angle_rad, color)
+      return
+    cos_a = math.cos(angle_rad)
+    sin_a = math.sin(angle_rad)
+
+    min_x = max(self.clip_x0, clamp_int(math.floor(cx - rx - 2), 0, self.w - 1))
+    max_x = min(self.clip_x1, clamp_int(math.ceil(cx + rx + 2), 0, self.w - 1))
+    min_y = max(self.clip_y0, clamp_int(math.floor(cy - ry - 2), 0, self.h - 1))
+    max_y = min(self.clip_y1, clamp_int(math.ceil(cy + ry + 2), 0, self.h - 1))
+    if min_x > max_x or min_y > max_y:
+      return
+
+    inv_rx2 = 1.0 / (rx * rx)
+    inv_ry2 = 1.0 / (ry * ry)
+
+    for y in range(min_y, max_y + 1):
+      py = (y + 0.5) - cy
+      lo_f, hi_f = _ellipse_row(rx, ry, cos_a, sin_a, py)
+
+      def inside(x: int) -> bool:
+        px = (x + 0.5) - cx
+        lx = px * cos_a + py * sin_a
+        ly = -px * sin_a + py * cos_a
+        return (lx * lx) * inv_rx2 + (ly * ly) * inv_ry2 <= 1.0
+
+      span = self._convex_span(cx + lo_f, cx + hi_f, inside, min_x, max_x)
+      if span is not None:
+        self.blend_span(y, span[0], span[1], color)
+
+  def fill_circle(self, cx: float, cy: float, r: float, color: tuple[int, int, int, int]) -> None:
+    self.fill_ellipse(cx, cy, r, r, 0.0, color)
+
+  def blend_span(self, y: int, x0: int, x1: int, color: tuple[int, int, int, int]) -> None:
+    # Blend pixels x0..x1 (inclusive) of row y. Same arithmetic as blend_px, but each
+    # channel of the span goes through one bytes.translate() lookup instead of a Python
+    # call per pixel; opaque colors are written with a single slice assignment.
+    r, g, b, a = color
+    if a <= 0 or y < self.clip_y0 or y > self.clip_y1:
+      return
+    x0 = max(self.clip_x0, x0)
+    x1 = min(self.clip_x1, x1)
+    if x1 < x0:
+      return
+    i0 = ((y - self.row0) * self.w + x0) * 4
+    i1 = ((y - self.row0) * self.w + x1 + 1) * 4
+    buf = self.buf
+    if a >= 255:
+      buf[i0:i1] = bytes((r, g, b, 255)) * (x1 - x0 + 1)
+      return
+    for c, table in enumerate(_over_tables((r * a) // 255, (g * a) // 255, (b * a) // 255, a)):
+      buf[i0 + c : i1 : 4] = buf[i0 + c : i1 : 4].translate(table)
+
+  def fill_polygon(self, pts: list[tuple[float, float]], color: tuple[int, int, int, int]) -> None:
+    # Scanline fill with an edge table bucketed by first row and an active edge list,
+    # so each row only intersects the edges that actually cross it.
+    if len(pts) < 3:
+      return
+    if self.antialias:
+      self._fill_polygon_aa(pts, color)
+      return
+
+    min_y = max(self.clip_y0, clamp_int(math.floor(min(y for _, y in pts)), 0, self.h - 1))
+    max_y = min(self.clip_y1, clamp_int(math.ceil(max(y for _, y in pts)), 0, self.h - 1))
+    if min_y > max_y:
+      return
+
+    # Edge (x1, y1, dx, dy, last_row) covers rows whose center lies in [min(y1, y2), max(y1, y2)).
+    edge_table: dict[int, list[tuple[float, float, float, float, int]]] = {}
+    n = len(pts)
+    for i in range(n):
+      x1, y1 = pts[i]
+      x2, y2 = pts[(i + 1) % n]
+      if y1 == y2:
+        continue
+      lo = min(y1, y2)
+      hi = max(y1, y2)
+      first = math.ceil(lo - 0.5)
+      while first - 0.5 >= lo:
+        first -= 1
+      while first + 0.5 < lo:
+        first += 1
+      last = math.ceil(hi - 0.5)
+      while last + 0.5 < hi:
+        last += 1
+      while last + 0.5 >= hi:
+        last -= 1
+      first = max(first, min_y)
+      last = min(last, max_y)
+      if first > last:
+        continue
+      edge_table.setdefault(first, []).append((x1, y1, x2 - x1, y2 - y1, last))
+
+    active: list[tuple[float, float, float, float, int]] = []
+    for y in range(min_y, max_y + 1):
+      if y in edge_table:
+        active.extend(edge_table[y])
+      if not active:
+        continue
+      active = [e for e in active if e[4] >= y]
+      scan_y = y + 0.5
+      xs = sorted(x1 + ((scan_y - y1) / dy) * dx for x1, y1, dx, dy, _ in active)
+      for i in range(0, len(xs) - 1, 2):
+        self.blend_span(y, int(math.ceil(xs[i] - 0.5)), int(math.floor(xs[i + 1] - 0.5)), color)
+
+  def stroke_segment(self, x1: float, y1: float, x2: float, y2: float, width: float, color: tuple[int, int, int, int]) -> None:
+    if width <= 0:
+      return
+    r = width / 2.0
+    min_x = max(self.clip_x0, clamp_int(math.floor(min(x1, x2) - r - 2), 0, self.w - 1))
+    max_x = min(self.clip_x1, clamp_int(math.ceil(max(x1, x2) + r + 2), 0, self.w - 1))
+    min_y = max(self.clip_y0, clamp_int(math.floor(min(y1, y2) - r - 2), 0, self.h - 1))
+    max_y = min(self.clip_y1, clamp_int(math.ceil(max(y1, y2) + r + 2), 0, self.h - 1))
+    if min_x > max_x or min_y > max_y:
+      return
+
+    vx = x2 - x1
+    vy = y2 - y1
+    vv = vx * vx + vy * vy
+    if vv <= 1e-6:
+      self.fill_circle(x1, y1, r, color)
+      return
+    if self.antialias:
+      self._stroke_segment_aa(x1, y1, x2, y2, r, color)
+      return
+    inv_vv = 1.0 / vv
+    rr = r * r
+
+    for y in range(min_y, max_y + 1):
+      py = y + 0.5
+      wy = py - y1
+      row = _capsule_row(x1, y1, x2, y2, r, py)
+      if row is None:
+        continue
+
+      def inside(x: int) -> bool:
+        px = x + 0.5
+        wx = px - x1
+        t = (wx * vx + wy * vy) * inv_vv
+        if t < 0.0:
+          t = 0.0
+        elif t > 1.0:
+          t = 1.0
+        dx = px - (x1 + t * vx)
+        dy = py - (y1 + t * vy)
+        return dx * dx + dy * dy <= rr
+
+      span = self._convex_span(row[0], row[1], inside, min_x, max_x)
+      if span is not None:
+        self.blend_span(y, span[0], span[1], color)
+
+  def blend_coverage(self, x: int, y: int, color: tuple[int, int, int, int], coverage: float) -> None:
+    if coverage <= 0.0:
+      return
+    if coverage < 1.0:
+      r, g, b, a = color
+      color = (r, g, b, (a * int(coverage * 255.0 + 0.5) + 127) // 255)
+    self.blend_px(x, y, color)
+
+  def _aa_bounds(self, outer: tuple[float, float], inner: tuple[float, float] | None) -> tuple[int, int, int, int] | None:
+    # Pixel columns (x0, x1, i0, i1) of an anti-aliased row: x0..x1 has a center inside
+    # `outer`, i0..i1 (empty as x1 + 1, x1) inside `inner` as well. None when x0 > x1.
+    x0 = max(self.clip_x0, int(math.ceil(outer[0] - 0.5)))
+    x1 = min(self.clip_x1, int(math.floor(outer[1] - 0.5)))
+    if x0 > x1:
+      return None
+    i0, i1 = x1 + 1, x1
+    if inner is not None:
+      i0 = max(x0, int(math.ceil(inner[0] - 0.5)))
+      i1 = min(x1, int(math.floor(inner[1] - 0.5)))
+      if i0 > i1:
+        i0, i1 = x1 + 1, x1
+    return x0, x1, i0, i1
+
+  def _aa_row(self, y: int, outer: tuple[float, float], inner: tuple[float, float] | None, coverage: "Callable[[int], float]", color: tuple[int, int, int, int]) -> None:
+    # `outer` bounds every pixel center with nonzero coverage and `inner` (if any) holds
+    # only fully covered ones: the inner span is one bulk blend, the ring between gets
+    # per-pixel coverage.
+    bounds = self._aa_bounds(outer, inner)
+    if bounds is None:
+      return
+    x0, x1, i0, i1 = bounds
+    for x in range(x0, i0):
+      self.blend_coverage(x, y, color, coverage(x))
+    if i0 <= i1:
+      self.blend_span(y, i0, i1, color)
+    for x in range(max(x0, i1 + 1), x1 + 1):
+      self.blend_coverage(x, y, color, coverage(x))
+
+  def _ellipse_aa_rows(self, cx: float, cy: float, rx: float, ry: float, cos_a: float, sin_a: float) -> list[tuple[int, tuple[float, float], tuple[float, float] | None]]:
+    # (y, outer, inner) for every row an anti-aliased ellipse can touch: ellipses
+    # grown/shrunk by `margin` bracket the anti-aliased ring.
+    margin = 1.5
+    min_y = max(self.clip_y0, clamp_int(math.floor(cy - max(rx, ry) - 2), 0, self.h - 1))
+    max_y = min(self.clip_y1, clamp_int(math.ceil(cy + max(rx, ry) + 2), 0, self.h - 1))
+    rows = []
+    for y in range(min_y, max_y + 1):
+      py = (y + 0.5) - cy
+      lo, hi = _ellipse_row(rx + margin, ry + margin, cos_a, sin_a, py)
+      inner = None
+      if rx > margin and ry > margin:
+        ilo, ihi = _ellipse_row(rx - margin, ry - margin, cos_a, sin_a, py)
+        if ilo < ihi:
+          inner = (cx + ilo, cx + ihi)
+      rows.append((y, (cx + lo, cx + hi), inner))
+    return rows
+
+  def _capsule_aa_rows(self, x1: float, y1: float, x2: float, y2: float, r: float) -> list[tuple[int, tuple[float, float], tuple[float, float] | None]]:
+    # (y, outer, inner) for every row an anti-aliased capsule touches: the capsules of
+    # radius r + 0.5 and r - 0.5 bracket the ring where coverage is fractional.
+    min_y = max(self.clip_y0, clamp_int(math.floor(min(y1, y2) - r - 2), 0, self.h - 1))
+    max_y = min(self.clip_y1, clamp_int(math.ceil(max(y1, y2) + r + 2), 0, self.h - 1))
+    rows = []
+    for y in range(min_y, max_y + 1):
+      py = y + 0.5
+      outer = _capsule_row(x1, y1, x2, y2, r + 0.5, py)
+      if outer is not None:
+        rows.append((y, outer, _capsule_row(x1, y1, x2, y2, r - 0.5, py) if r > 0.5 else None))
+    return rows
+
+  def _fill_ellipse_aa(self, cx: float, cy: float, rx: float, ry: float, angle_rad: float, color: tuple[int, int, int, int]) -> None:
+    cos_a = math.cos(angle_rad)
+    sin_a = math.sin(angle_rad)
+    inv_rx2 = 1.0 / (rx * rx)
+    inv_ry2 = 1.0 / (ry * ry)
+
+    for y, outer, inner in self._ellipse_aa_rows(cx, cy, rx, ry, cos_a, sin_a):
+      py = (y + 0.5) - cy
+
+      def coverage(x: int) -> float:
+        # Signed distance from the implicit form: with k = sqrt(lx^2/rx^2 + ly^2/ry^2),
+        # d ~= (k - 1) / |grad k|, which is exact for circles.
+        px = (x + 0.5) - cx
+        lx = px * cos_a + py * sin_a
+        ly = -px * sin_a + py * cos_a
+        gx = lx * inv_rx2
+        gy = ly * inv_ry2
+        grad = math.sqrt(gx * gx + gy * gy)
+        if grad == 0.0:
+          return 1.0
+        k = math.sqrt(lx * gx + ly * gy)
+        return 0.5 - (k - 1.0) * k / grad
+
+      self._aa_row(y, outer, inner, coverage, color)
+
+  def _stroke_segment_aa(self, x1: float, y1: float, x2: float, y2: float, r: float, color: tuple[int, int, int, int]) -> None:
+    # Capsules have an exact distance field: coverage = r + 0.5 - dist(pixel center, segment).
+    vx = x2 - x1
+    vy = y2 - y1
+    inv_vv = 1.0 / (vx * vx + vy * vy)
+
+    for y, outer, inner in self._capsule_aa_rows(x1, y1, x2, y2, r):
+      py = y + 0.5
+
+      def coverage(x: int) -> float:
+        return r + 0.5 - _segment_dist(x + 0.5, py, x1, y1, vx, vy, inv_vv)
+
+      self._aa_row(y, outer, inner, coverage, color)
+
+  def _fill_polygon_aa(self, pts: list[tuple[float, float]], color: tuple[int, int, int, int]) -> None:
+    # Pixel centers inside the polygon (same even-odd spans as the aliased fill) get
+    # coverage 0.5 + distance to the nearest edge, centers outside 0.5 - distance. Only
+    # pixels within reach of an edge are evaluated; the rest of each span is one bulk blend.
+    min_y = max(self.clip_y0, clamp_int(math.floor(min(y for _, y in pts)) - 1, 0, self.h - 1))
+    max_y = min(self.clip_y1, clamp_int(math.ceil(max(y for _, y in pts)) + 1, 0, self.h - 1))
+    if min_y > max_y:
+      return
+
+    n = len(pts)
+    edges = []
+    for i in range(n):
+      x1, y1 = pts[i]
+      x2, y2 = pts[(i + 1) % n]
+      vx = x2 - x1
+      vy = y2 - y1
+      vv = vx * vx + vy * vy
+      if vv > 0.0:
+        edges.append((min(y1, y2), max(y1, y2), x1, y1, x2, y2, vx, vy, 1.0 / vv))
+    edges.sort()
+
+    pending = 0
+    active: list[tuple[float, float, float, float, float, float, float, float, float]] = []
+    for y in range(min_y, max_y + 1):
+      py = y + 0.5
+      while pending < len(edges) and edges[pending][0] <= py + 1.0:
+        active.append(edges[pending])
+        pending += 1
+      active = [e for e in active if e[1] >= py - 1.0]
+      if not active:
+        continue
+
+      xs = sorted(x1 + ((py - y1) / vy) * vx for lo, hi, x1, y1, _, _, vx, vy, _ in active if vy != 0.0 and (y1 <= py < y1 + vy or y1 + vy <= py < y1))
+      spans = [(int(math.ceil(xs[i] - 0.5)), int(math.floor(xs[i + 1] - 0.5))) for i in range(0, len(xs) - 1, 2)]
+
+      # Pixels whose center is within reach of an edge passing through this row. Edges
+      # outside the band are more than 0.5px from every center, so they never change coverage.
+      near = []
+      ring: list[list[int]] = []
+      for lo, hi, x1, y1, x2, y2, vx, vy, inv_vv in active:
+        if hi < py - 0.75 or lo > py + 0.75:
+          continue
+        near.append((x1, y1, vx, vy, inv_vv))
+        if vy == 0.0:
+          ex0, ex1 = min(x1, x2), max(x1, x2)
+        else:
+          ta = min(1.0, max(0.0, (py - 0.75 - y1) / vy))
+          tb = min(1.0, max(0.0, (py + 0.75 - y1) / vy))
+          ex0 = min(x1 + ta * vx, x1 + tb * vx)
+          ex1 = max(x1 + ta * vx, x1 + tb * vx)
+        ring.append([max(self.clip_x0, int(math.floor(ex0 - 1.0))), min(self.clip_x1, int(math.ceil(ex1)))])
+      ring.sort()
+      merged: list[list[int]] = []
+      for r0, r1 in ring:
+        if merged and r0 <= merged[-1][1] + 1:
+          merged[-1][1] = max(merged[-1][1], r1)
+        elif r0 <= r1:
+          merged.append([r0, r1])
+
+      for r0, r1 in merged:
+        for x in range(r0, r1 + 1):
+          px = x + 0.5
+          dist = min(_segment_dist(px, py, x1, y1, vx, vy, inv_vv) for x1, y1, vx, vy, inv_vv in near)
+          inside = any(s0 <= x <= s1 for s0, s1 in spans)
+          self.blend_coverage(x, y, color, 0.5 + dist if inside else 0.5 - dist)
+
+      # Interior: span pixels not already handled in the ring.
+      for s0, s1 in spans:
+        x = s0
+        for r0, r1 in merged:
+          if r1 < x or r0 > s1:
+            continue
+          if r0 > x:
+            self.blend_span(y, x, r0 - 1, color)
+          x = r1 + 1
+        if x <= s1:
+          self.blend_span(y, x, s1, color)
+
+  def stroke_polyline(self, pts: list[tuple[float, float]], width: float, color: tuple[int, int, int, int], closed: bool = False) -> None:
+    if len(pts) < 2:
+      return
+    for i in range(len(pts) - 1):
+      x1, y1 = pts[i]
+      x2, y2 = pts[i + 1]
+      self.stroke_segment(x1, y1, x2, y2, width, color)
+    if closed:
+      x1, y1 = pts[-1]
+      x2, y2 = pts[0]
+      self.stroke_segment(x1, y1, x2, y2, width, color)
+
+  def downsample2(self) -> "Canvas":
+    return self.downsample(2)
+
+  def downsample(self, k: int, filt: str = "box") -> "Canvas":
+    # Reduce a k-times supersampled canvas to (w // k) x (h // k) on the premultiplied
+    # buffer. "box" averages each k x k block, rounding down; "tent" is separable, 2k
+    # samples wide per axis with edge samples repeated, and rounds to nearest. Rows are
+    # combined a whole row at a time, then columns one channel-strided slice per tap.
+    taps, weight = _ssaa_taps(k, filt)
+    out_w = self.w // k
+    out_h = self.h // k
+    out = Canvas.create(out_w, out_h)
+    stride = self.w * 4
+    lo = min(j for j, _ in taps)
+    hi = max(j for j, _ in taps) - (k - 1)
+    pad_l = max(0, -lo) * 4
+    pad_r = max(0, hi) * 4
+    total = weight * weight
+    half = total // 2 if filt == "tent" else 0
+    for y in range(out_h):
+      acc: list[int] | None = None
+      for j, wt in taps:
+        sy = min(self.h - 1, max(0, y * k + j))
+        row = self.buf[sy * stride : (sy + 1) * stride]
+        term = row if wt == 1 else map(wt.__mul__, row)
+        acc = list(term) if acc is None else list(map(operator.add, acc, term))
+      assert acc is not None
+      acc = acc[:4] * (pad_l // 4) + acc + acc[-4:] * (pad_r // 4)
+      out_row = bytearray(out_w * 4)
+      for c in range(4):
+        col: list[int] | None = None
+        for j, wt in taps:
+          start = pad_l + j * 4 + c
+          part = acc[start : start + out_w * k * 4 : k * 4]
+          term = part if wt == 1 else map(wt.__mul__, part)
+          col = list(term) if col is None else list(map(operator.add, col, term))
+        assert col is not None
+        out_row[c::4] = bytes((v + half) // total for v in col)
+      out.buf[y * out_w * 4 : (y + 1) * out_w * 4] = out_row
+    return out
+
+  def straight_rows(self, y0: int, y1: int) -> bytes:
+    # Rows y0..y1-1 converted from premultiplied to straight-alpha RGBA. Only partially
+    # transparent pixels need the per-alpha lookup table; opaque ones are unchanged and
+    # fully transparent ones are already (0, 0, 0, 0) in a premultiplied buffer.
+    stride = self.w * 4
+    # A copy even when buf is a memoryview (e.g. over shared memory).
+    raw = bytearray(self.buf[y0 * stride : y1 * stride])
+    partial = raw[3::4].translate(_PARTIAL_ALPHA)
+    p = partial.find(1)
+    while p >= 0:
+      i = p * 4
+      table = _unpremul_table(raw[i + 3])
+      raw[i + 0] = table[raw[i + 0]]
+      raw[i + 1] = table[raw[i + 1]]
+      raw[i + 2] = table[raw[i + 2]]
+      p = partial.find(1, p + 1)
+    return bytes(raw)
+
+  def write_png(self, fp: BinaryIO, options: PngOptions = PngOptions(), band_rows: int = 64) -> None:
+    if options.indexed:
+      palette, indices = quantize_rgba(self.straight_rows(0, self.h))
+      writer = PngWriter(fp, self.w, self.h, options, color_type=3, chunks=palette_chunks(palette))
+      for y0 in range(0, self.h, band_rows):
+        writer.write_rows(indices[y0 * self.w : min(self.h, y0 + band_rows) * self.w])
+      writer.close()
+      return
+    writer = PngWriter(fp, self.w, self.h, options)
+    for y0 in range(0, self.h, band_rows):
+      writer.write_rows(self.straight_rows(y0, min(self.h, y0 + band_rows)))
+    writer.close()
+
+  def to_png_bytes(self, options: PngOptions = PngOptions()) -> bytes:
+    out = io.BytesIO()
+    self.write_png(out, options)
+    return out.getvalue()
+
+
+TILE_SIZE = 32
+
+
+class TiledCanvas:
+  # Canvas-compatible recorder. Each draw call is binned into the tiles its bounding box
+  # touches; flush() then rasterizes `target` one tile at a time, clipped to the tile and
+  # replaying that tile's calls in submission order. Tiles no call touches (most of an
+  # icon's transparent border) are never visited, and bands of tile rows are independent,
+  # so flush(jobs=N) can hand them to worker processes.
+
+  # Rasterizers reach up to ~3.5px past a shape's geometric extent (bbox padding plus the
+  # anti-aliased ring); bin with some slack beyond that.
+  PAD = 4.0
+
+  def __init__(self, target: Canvas, tile: int = TILE_SIZE) -> None:
+    self.target = target
+    self.w = target.w
+    self.h = target.h
+    self.tile = tile
+    self.ops: list[tuple[str, tuple]] = []
+    self.bins: dict[tuple[int, int], list[int]] = {}
+
+  def _record(self, name: str, args: tuple, x0: float, y0: float, x1: float, y1: float) -> None:
+    x0 -= self.PAD
+    y0 -= self.PAD
+    x1 += self.PAD
+    y1 += self.PAD
+    # Calls that miss the canvas still land in the edge tiles: the rasterizers clamp their
+    # bounding boxes to the canvas, which can put edge pixels in play.
+    t = self.tile
+    tx0 = clamp_int(math.floor(x0), 0, self.w - 1) // t
+    tx1 = clamp_int(math.ceil(x1), 0, self.w - 1) // t
+    ty0 = clamp_int(math.floor(y0), 0, self.h - 1) // t
+    ty1 = clamp_int(math.ceil(y1), 0, self.h - 1) // t
+    index = len(self.ops)
+    self.ops.append((name, args))
+    for ty in range(ty0, ty1 + 1):
+      for tx in range(tx0, tx1 + 1):
+        self.bins.setdefault((tx, ty), []).append(index)
+
+  def blend_px(self, x: int, y: int, color: tuple[int, int, int, int]) -> None:
+    self._record("blend_px", (x, y, color), x, y, x, y)
+
+  def fill_ellipse(self, cx: float, cy: float, rx: float, ry: float, angle_rad: float, color: tuple[int, int, int, int]) -> None:
+    r = max(rx, ry)
+    self._record("fill_ellipse", (cx, cy, rx, ry, angle_rad, color), cx - r, cy - r, cx + r, cy + r)
+
+  def fill_circle(self, cx: float, cy: float, r: float, color: tuple[int, int, int, int]) -> None:
+    self.fill_ellipse(cx, cy, r, r, 0.0, color)
+
+  def fill_polygon(self, pts: list[tuple[float, float]], color: tuple[int, int, int, int]) -> None:
+    if len(pts) < 3:
+      return
+    xs = [x for x, _ in pts]
+    ys = [y for _, y in pts]
+    self._record("fill_polygon", (list(pts), color), min(xs), min(ys), max(xs), max(ys))
+
+  def stroke_segment(self, x1: float, y1: float, x2: float, y2: float, width: float, color: tuple[int, int, int, int]) -> None:
+    r = width / 2.0
+    self._record("stroke_segment", (x1, y1, x2, y2, width, color), min(x1, x2) - r, min(y1, y2) - r, max(x1, x2) + r, max(y1, y2) + r)
+
+  def stroke_polyline(self, pts: list[tuple[float, float]], width: float, color: tuple[int, int, int, int], closed: bool = False) -> None:
+    Canvas.stroke_polyline(self, pts, width, color, closed)  # type: ignore[arg-type]
+
+  def bands(self) -> list[tuple[int, int, list[tuple[tuple[int, int, int, int], list[int]]]]]:
+    # (y0, y1, [(tile rect, op indices), ...]) per row of tiles that has any work.
+    t = self.tile
+    rows: dict[int, list[tuple[tuple[int, int, int, int], list[int]]]] = {}
+    for (tx, ty), indices in sorted(self.bins.items(), key=lambda item: (item[0][1], item[0][0])):
+      rect = (tx * t, ty * t, min(self.w, (tx + 1) * t) - 1, min(self.h, (ty + 1) * t) - 1)
+      rows.setdefault(ty, []).append((rect, indices))
+    return [(ty * t, min(self.h, (ty + 1) * t), tiles) for ty, tiles in rows.items()]
+
+  def flush(self, jobs: int = 1) -> None:
+    bands = self.bands()
+    target = self.target
+    if jobs > 1 and len(bands) > 1:
+      stride = target.w * 4
+      with ProcessPoolExecutor(max_workers=min(jobs, len(bands))) as pool:
+        futures = []
+        for y0, y1, tiles in bands:
+          # Ship each worker only the calls its band uses, renumbered.
+          used = sorted({i for _, indices in tiles for i in indices})
+          remap = {old: new for new, old in enumerate(used)}
+          local_tiles = [(rect, [remap[i] for i in indices]) for rect, indices in tiles]
+          band = bytes(target.buf[y0 * stride : y1 * stride])
+          job = (type(target), target.w, target.h, target.antialias, y0, y1, band, local_tiles, [self.ops[i] for i in used])
+          futures.append((y0, y1, pool.submit(_render_band, *job)))
+        for y0, y1, future in futures:
+          target.buf[y0 * stride : y1 * stride] = future.result()
+    else:
+      for _, _, tiles in bands:
+        _replay_tiles(target, tiles, self.ops)
+    self.ops = []
+    self.bins = {}
+
+
+def _replay_tiles(canvas: Canvas, tiles: list[tuple[tuple[int, int, int, int], list[int]]], ops: list[tuple[str, tuple]]) -> None:
+  try:
+    for rect, indices in tiles:
+      canvas.set_clip(rect)
+      for i in indices:
+        name, args = ops[i]
+        getattr(canvas, name)(*args)
+  finally:
+    canvas.set_clip(None)
+
+
+def _render_band(canvas_cls: type[Canvas], w: int, h: int, antialias: bool, y0: int, y1: int, band: bytes, tiles: list[tuple[tuple[int, int, int, int], list[int]]], ops: list[tuple[str, tuple]]) -> bytes:
+  # Worker side of TiledCanvas.flush: every tile is clipped to rows y0..y1-1, so the
+  # worker only allocates that band of the w x h canvas.
+  canvas = canvas_cls.create_band(w, h, y0, y1 - y0, antialias=antialias)
+  canvas.buf[:] = band
+  _replay_tiles(canvas, tiles, ops)
+  return bytes(canvas.buf)
+
+
+AA_MODES = ("ssaa", "analytic")
+
+
+def ssaa_mode(factor: int = 2, filt: str = "box") -> str:
+  # The aa string for factor x factor supersampling: "ssaa" is the default 2x box filter,
+  # others read "ssaa4" or "ssaa3-tent". It is what every aa parameter in the generator accepts.
+  if factor == 2 and filt == "box":
+    return "ssaa"
+  return f"ssaa{factor}" + ("" if filt == "box" else f"-{filt}")
+
+
+def aa_params(aa: str) -> tuple[int, str]:
+  # (supersampling factor, reduction filter) for an aa string; analytic is (1, "box").
+  if aa == "analytic":
+    return 1, "box"
+  m = re.fullmatch(r"ssaa(\d*)(?:-(box|tent))?", aa)
+  factor = int(m.group(1) or 2) if m else 0
+  if not 1 <= factor <= SSAA_MAX:
+    raise ValueError(f"unknown aa mode {aa!r} (expected analytic, ssaa, ssaa<1-{SSAA_MAX}> or ssaa<N>-tent)")
+  return factor, m.group(2) or "box"  # type: ignore[union-attr]
+
+
+def raster_side(size: int, aa: str) -> int:
+  # Supersampling rasterizes at factor times the output size, then filters down.
+  return size * aa_params(aa)[0]
+
+
+def reduce_ssaa(canvas: Canvas, aa: str) -> Canvas:
+  # A raster_side() canvas filtered down to output size.
+  factor, filt = aa_params(aa)
+  return canvas if factor == 1 else canvas.downsample(factor, filt)
@@ -0,0 +1,220 @@
+"""
+DisplayList records draw calls once, through a canvas-style transform stack, and replays
+them into any Canvas-compatible sink at any scale.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import math
+from typing import Iterator
+
+from .canvas import Canvas, TiledCanvas
+
+
+Affine = tuple[float, float, float, float, float, float]
+
+# (a, b, c, d, e, f) maps (x, y) to (a*x + c*y + e, b*x + d*y + f), as in canvas/SVG.
+IDENTITY: Affine = (1.0, 0.0, 0.0, 1.0, 0.0, 0.0)
+
+
+def _affine_ellipse(m: Affine, rx: float, ry: float, angle_rad: float) -> tuple[float, float, float]:
+  # Radii and angle of the image of an ellipse under the linear part of m: the singular
+  # values / left singular vector of J = m . R(angle) . diag(rx, ry), in closed form.
+  a, b, c, d = m[0], m[1], m[2], m[3]
+  cos_a = math.cos(angle_rad)
+  sin_a = math.sin(angle_rad)
+  p = (a * cos_a + c * sin_a) * rx
+  q = (c * cos_a - a * sin_a) * ry
+  r = (b * cos_a + d * sin_a) * rx
+  s = (d * cos_a - b * sin_a) * ry
+  e = (p + s) / 2
+  f = (p - s) / 2
+  g = (r + q) / 2
+  h = (r - q) / 2
+  big = math.hypot(e, h)
+  small = math.hypot(f, g)
+  return big + small, abs(big - small), (math.atan2(h, e) + math.atan2(g, f)) / 2
+
+
+class DisplayList:
+  # Canvas-compatible recorder with a canvas-style transform stack (save/restore/translate/
+  # rotate/scale). Calls are mapped through the current matrix as they are recorded, so a
+  # draw function runs once and replay() can rasterize the result at any resolution.
+  #
+  # The matrix is kept together with its uniform scale and rotation, updated per transform
+  # call rather than re-derived per shape: radii, stroke widths and ellipse angles stay exact
+  # under translate/rotate/uniform scale, and only a non-uniform scale falls back to the
+  # general ellipse mapping (stroke widths then scale by sqrt(|det|)).
+
+  def __init__(self, w: int, h: int) -> None:
+    self.w = w
+    self.h = h
+    self.ops: list[tuple[str, tuple]] = []
+    self._ctm = IDENTITY
+    self._uniform: float | None = 1.0  # None once a non-uniform scale is applied.
+    self._angle = 0.0
+    self._stack: list[tuple[Affine, float | None, float]] = []
+    # (first op index, group path) each time the open group changes; see group().
+    self.groups: list[tuple[int, tuple[str, ...]]] = []
+    self._group_path: tuple[str, ...] = ()
+
+  @contextlib.contextmanager
+  def group(self, name: str) -> Iterator[None]:
+    # Label the calls made inside the block (nesting builds a path) so --profile can
+    # attribute their cost; rendering ignores groups.
+    outer = self._group_path
+    self._group_path = (*outer, name)
+    self.groups.append((len(self.ops), self._group_path))
+    try:
+      yield
+    finally:
+      self._group_path = outer
+      self.groups.append((len(self.ops), outer))
+
+  def save(self) -> None:
+    self._stack.append((self._ctm, self._uniform, self._angle))
+
+  def restore(self) -> None:
+    self._ctm, self._uniform, self._angle = self._stack.pop()
+
+  def _concat(self, a2: float, b2: float, c2: float, d2: float, e2: float, f2: float) -> None:
+    a, b, c, d, e, f = self._ctm
+    self._ctm = (a * a2 + c * b2, b * a2 + d * b2, a * c2 + c * d2, b * c2 + d * d2, a * e2 + c * f2 + e, b * e2 + d * f2 + f)
+
+  def translate(self, dx: float, dy: float) -> None:
+    a, b, c, d, e, f = self._ctm
+    self._ctm = (a, b, c, d, a * dx + c * dy + e, b * dx + d * dy + f)
+
+  def rotate(self, angle_rad: float) -> None:
+    cos_a = math.cos(angle_rad)
+    sin_a = math.sin(angle_rad)
+    self._concat(cos_a, sin_a, -sin_a, cos_a, 0.0, 0.0)
+    self._angle += angle_rad
+
+  def scale(self, sx: float, sy: float | None = None) -> None:
+    sy = sx if sy is None else sy
+    a, b, c, d, e, f = self._ctm
+    self._ctm = (a * sx, b * sx, c * sy, d * sy, e, f)
+    if self._uniform is not None:
+      self._uniform = self._uniform * sx if sx == sy else None
+
+  def map_point(self, x: float, y: float) -> tuple[float, float]:
+    a, b, c, d, e, f = self._ctm
+    return (x * a + y * c + e, x * b + y * d + f)
+
+  def map_points(self, pts: list[tuple[float, float]]) -> list[tuple[float, float]]:
+    if self._ctm == IDENTITY:
+      return list(pts)
+    a, b, c, d, e, f = self._ctm
+    return [(x * a + y * c + e, x * b + y * d + f) for x, y in pts]
+
+  def map_length(self, n: float) -> float:
+    if self._uniform is not None:
+      return n * self._uniform
+    a, b, c, d = self._ctm[:4]
+    return n * math.sqrt(abs(a * d - b * c))
+
+  def blend_px(self, x: int, y: int, color: tuple[int, int, int, int]) -> None:
+    x, y = self.map_point(x, y)
+    self.ops.append(("blend_px", (int(x), int(y), color)))
+
+  def fill_ellipse(self, cx: float, cy: float, rx: float, ry: float, angle_rad: float, color: tuple[int, int, int, int]) -> None:
+    if self._ctm != IDENTITY:
+      cx, cy = self.map_point(cx, cy)
+      if self._uniform is not None:
+        rx *= self._uniform
+        ry *= self._uniform
+        angle_rad += self._angle
+      else:
+        rx, ry, angle_rad = _affine_ellipse(self._ctm, rx, ry, angle_rad)
+    self.ops.append(("fill_ellipse", (cx, cy, rx, ry, angle_rad, color)))
+
+  def fill_circle(self, cx: float, cy: float, r: float, color: tuple[int, int, int, int]) -> None:
+    if self._uniform is None:
+      self.fill_ellipse(cx, cy, r, r, 0.0, color)
+      return
+    cx, cy = self.map_point(cx, cy)
+    self.ops.append(("fill_circle", (cx, cy, r * self._uniform, color)))
+
+  def fill_polygon(self, pts: list[tuple[float, float]], color: tuple[int, int, int, int]) -> None:
+    self.ops.append(("fill_polygon", (self.map_points(pts), color)))
+
+  def stroke_segment(self, x1: float, y1: float, x2: float, y2: float, width: float, color: tuple[int, int, int, int]) -> None:
+    x1, y1 = self.map_point(x1, y1)
+    x2, y2 = self.map_point(x2, y2)
+    self.ops.append(("stroke_segment", (x1, y1, x2, y2, self.map_length(width), color)))
+
+  def stroke_polyline(self, pts: list[tuple[float, float]], width: float, color: tuple[int, int, int, int], closed: bool = False) -> None:
+    self.ops.append(("stroke_polyline", (self.map_points(pts), self.map_length(width), color, closed)))
+
+  def replay(self, target: Canvas | TiledCanvas, scale: float = 1.0, start: int = 0, stop: int | None = None) -> None:
+    # Draw ops[start:stop] into target with every coordinate and length multiplied by scale.
+    ops = self.ops if start == 0 and stop is None else self.ops[start:stop]
+    if scale == 1.0:
+      for name, args in ops:
+        getattr(target, name)(*args)
+      return
+    k = scale
+    for name, args in ops:
+      if name == "fill_polygon":
+        pts, color = args
+        target.fill_polygon([(x * k, y * k) for x, y in pts], color)
+      elif name == "stroke_polyline":
+        pts, width, color, closed = args
+        target.stroke_polyline([(x * k, y * k) for x, y in pts], width * k, color, closed=closed)
+      elif name == "fill_ellipse":
+        cx, cy, rx, ry, angle_rad, color = args
+        target.fill_ellipse(cx * k, cy * k, rx * k, ry * k, angle_rad, color)
+      elif name == "fill_circle":
+        cx, cy, r, color = args
+        target.fill_circle(cx * k, cy * k, r * k, color)
+      elif name == "stroke_segment":
+        x1, y1, x2, y2, width, color = args
+        target.stroke_segment(x1 * k, y1 * k, x2 * k, y2 * k, width * k, color)
+      else:
+        # A single pixel becomes the k x k block it covers.
+        x, y, color = args
+        y0 = y * k
+        y1 = (y + 1) * k
+        target.fill_polygon([(x * k, y0), ((x + 1) * k, y0), ((x + 1) * k, y1), (x * k, y1)], color)
+
+
+def _op_boxes(name: str, args: tuple) -> list[tuple[float, float, float, float]]:
+  # Bounding boxes (in recording units, before the rasterizers' 2px padding) a recorded
+  # op scans: one per primitive, one per segment for polylines.
+  if name in ("fill_ellipse", "fill_circle"):
+    cx, cy, rx = args[0], args[1], args[2]
+    ry = args[3] if name == "fill_ellipse" else rx
+    return [(cx - rx, cy - ry, cx + rx, cy + ry)]
+  if name == "fill_polygon":
+    xs = [x for x, _ in args[0]]
+    ys = [y for _, y in args[0]]
+    return [(min(xs), min(ys), max(xs), max(ys))]
+  if name == "stroke_segment":
+    x1, y1, x2, y2, width = args[:5]
+    r = width / 2
+    return [(min(x1, x2) - r, min(y1, y2) - r, max(x1, x2) + r, max(y1, y2) + r)]
+  if name == "stroke_polyline":
+    pts, width, _, closed = args
+    r = width / 2
+    pairs = list(zip(pts, pts[1:])) + ([(pts[-1], pts[0])] if closed and len(pts) > 2 else [])
+    return [(min(ax, bx) - r, min(ay, by) - r, max(ax, bx) + r, max(ay, by) + r) for (ax, ay), (bx, by) in pairs]
+  x, y = args[0], args[1]
+  return [(x, y, x + 1, y + 1)]
+
+
+def _op_reach(ops: list[tuple[str, tuple]], scale: float, antialias: bool) -> list[tuple[int, int]]:
+  # (first, last) raster row each op scans when replayed at `scale`: its boxes plus the
+  # rasterizers' 2px padding. Band renderers only replay an op into bands it reaches - a
+  # band canvas clamps out-of-range shapes onto its edge rows, which the full-height
+  # canvas would never scan. Anti-aliased ellipses scan max(rx, ry) around the center, so
+  # there every box grows to a square.
+  reach = []
+  for name, args in ops:
+    rows = []
+    for x0, y0, x1, y1 in _op_boxes(name, args):
+      grow = max(0.0, (x1 - x0) - (y1 - y0)) / 2 if antialias else 0.0
+      rows.append((y0 - grow, y1 + grow))
+    reach.append((math.floor(min(r[0] for r in rows) * scale - 2), math.ceil(max(r[1] for r in rows) * scale + 2)))
+  return reach
@@ -0,0 +1,362 @@
+"""
+Procedural hex tile textures (--hex-tiles): a colored, tileable fBm field with
+per-terrain detail drawn on top.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import math
+import random
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Callable
+
+try:
+  import numpy as np
+except ImportError:  # NumPy is optional; it only speeds up the noise field.
+  np = None
+
+from .backends import canvas_backend
+from .cache import cache_hit, load_cache_manifest, render_key, save_cache_manifest, write_atomic
+from .canvas import RGB, Canvas, chamfered_rect_points, raster_side, reduce_ssaa, rgba
+from .display_list import DisplayList
+from .png import PngOptions
+
+
+HEX_TILE_SIZE = 512
+HEX_VARIANTS = 5
+
+
+class ValueNoise:
+  # Tileable fractal (fBm) value noise over the unit square. Octave o is a wrapped
+  # (cells * 2**o)^2 lattice of random values, smoothstep-interpolated and weighted gain**o;
+  # the sum is normalized to 0-1. field() evaluates a whole raster per octave (NumPy when
+  # installed, else a row at a time from pre-interpolated lattice rows); sample() evaluates
+  # one point with the same arithmetic, for placing detail.
+
+  def __init__(self, seed: str, cells: int = 4, octaves: int = 5, gain: float = 0.5) -> None:
+    rng = random.Random(seed)
+    self.layers: list[tuple[int, list[list[float]], float]] = []
+    for o in range(octaves):
+      c = cells << o
+      self.layers.append((c, [[rng.random() for _ in range(c)] for _ in range(c)], gain**o))
+    self.norm = sum(amp for _, _, amp in self.layers)
+
+  @staticmethod
+  def _axis(c: int, coords: list[float]) -> tuple[list[int], list[int], list[float]]:
+    # Lattice cell, next cell (wrapped) and smoothstep weight per coordinate in 0-1.
+    lo = []
+    hi = []
+    weights = []
+    for u in coords:
+      x = u * c
+      i = math.floor(x)
+      t = x - i
+      lo.append(i % c)
+      hi.append((i + 1) % c)
+      weights.append(t * t * (3 - 2 * t))
+    return lo, hi, weights
+
+  def sample(self, u: float, v: float) -> float:
+    total = 0.0
+    for c, grid, amp in self.layers:
+      (ix,), (jx,), (sx,) = self._axis(c, [u])
+      (iy,), (jy,), (sy,) = self._axis(c, [v])
+      a = grid[iy][ix] * (1 - sx) + grid[iy][jx] * sx
+      b = grid[jy][ix] * (1 - sx) + grid[jy][jx] * sx
+      total += amp * (a * (1 - sy) + b * sy)
+    return total / self.norm
+
+  def field(self, n: int) -> "list[list[float]] | np.ndarray":
+    # Values at the pixel centers of an n x n raster, row-major.
+    coords = [(k + 0.5) / n for k in range(n)]
+    if np is not None:
+      out = np.zeros((n, n))
+      for c, grid, amp in self.layers:
+        lo, hi, weights = (np.array(a) for a in self._axis(c, coords))
+        g = np.array(grid)
+        rows = g[:, lo] * (1 - weights) + g[:, hi] * weights  # Lattice rows, interpolated along x.
+        out += amp * (rows[lo] * (1 - weights)[:, None] + rows[hi] * weights[:, None])
+      return out / self.norm
+    acc = [[0.0] * n for _ in range(n)]
+    for c, grid, amp in self.layers:
+      lo, hi, weights = self._axis(c, coords)
+      rows = [[r[i] * (1 - s) + r[j] * s for i, j, s in zip(lo, hi, weights)] for r in grid]
+      for y in range(n):
+        ra = rows[lo[y]]
+        rb = rows[hi[y]]
+        w = weights[y]
+        acc[y] = [t + amp * (a * (1 - w) + b * w) for t, a, b in zip(acc[y], ra, rb)]
+    return [[t / self.norm for t in row] for row in acc]
+
+
+@dataclass(frozen=True)
+class Terrain:
+  # A hex tile texture: an fBm field, contrast-stretched around 0.5 and colored through
+  # `ramp` ((position 0-1, RGB) stops), with `detail` drawn on top in HEX_TILE_SIZE units.
+  resource: str
+  ramp: tuple[tuple[float, RGB], ...]
+  detail: Callable[[DisplayList, random.Random, ValueNoise], None]
+  cells: int = 4
+  octaves: int = 5
+  contrast: float = 2.2
+
+  def lut(self) -> tuple[bytes, bytes, bytes]:
+    # Per-channel lookup from the field quantized to 0-255.
+    channels: list[list[int]] = [[], [], []]
+    for i in range(256):
+      t = min(1.0, max(0.0, ((i + 0.5) / 256 - 0.5) * self.contrast + 0.5))
+      k = next((k for k in range(1, len(self.ramp)) if t <= self.ramp[k][0]), len(self.ramp) - 1)
+      (p0, c0), (p1, c1) = self.ramp[k - 1], self.ramp[k]
+      f = min(1.0, max(0.0, (t - p0) / (p1 - p0))) if p1 > p0 else 1.0
+      for ch in range(3):
+        channels[ch].append(round(c0[ch] + (c1[ch] - c0[ch]) * f))
+    return bytes(channels[0]), bytes(channels[1]), bytes(channels[2])
+
+
+def _paint_field(canvas: Canvas, noise: ValueNoise, terrain: Terrain, n: int) -> None:
+  # Fill canvas (a multiple of n on each side) with the opaque colored field evaluated at
+  # n x n; each field pixel covers a k x k block, so supersampling only pays for detail.
+  k = canvas.w // n
+  field = noise.field(n)
+  luts = terrain.lut()
+  if np is not None:
+    idx = np.minimum(255, (np.asarray(field) * 256).astype(np.intp))
+    lut = np.array([list(ch) for ch in luts], dtype=np.uint8).T
+    px = np.frombuffer(canvas.buf, dtype=np.uint8).reshape(canvas.h, canvas.w, 4)
+    px[..., :3] = np.repeat(np.repeat(lut[idx], k, axis=0), k, axis=1)
+    px[..., 3] = 255
+    return
+  stride = canvas.w * 4
+  for y, values in enumerate(field):
+    idx = bytes(min(255, int(v * 256)) for v in values)
+    if k > 1:
+      idx = bytes(b for b in idx for _ in range(k))
+    row = bytearray(stride)
+    for ch in range(3):
+      row[ch::4] = idx.translate(luts[ch])
+    row[3::4] = b"\xff" * canvas.w
+    for r in range(y * k, (y + 1) * k):
+      canvas.buf[r * stride : (r + 1) * stride] = row
+
+
+def _scatter(rng: random.Random, noise: ValueNoise, count: int, lo: float, hi: float = 1.0, tries: int = 40) -> list[tuple[float, float]]:
+  # Up to `count` points (HEX_TILE_SIZE units) where the field lies in [lo, hi], top to
+  # bottom so later (lower) ones overlap earlier ones like a painting.
+  s = HEX_TILE_SIZE
+  pts = []
+  for _ in range(count * tries):
+    if len(pts) >= count:
+      break
+    x = rng.uniform(0, s)
+    y = rng.uniform(0, s)
+    if lo <= noise.sample(x / s, y / s) <= hi:
+      pts.append((x, y))
+  return sorted(pts, key=lambda p: p[1])
+
+
+def draw_forest_detail(canvas: DisplayList, rng: random.Random, noise: ValueNoise) -> None:
+  for x, y in _scatter(rng, noise, 150, 0.44):
+    r = rng.uniform(12, 21)
+    canvas.fill_ellipse(x + r * 0.35, y + r * 0.5, r * 1.05, r * 0.75, 0.0, rgba(0, 0, 0, 60))
+    if rng.random() < 0.35:
+      # Pine: stacked triangles, darkest at the bottom.
+      for k, shade in enumerate(((22, 58, 34), (30, 72, 40), (40, 88, 48))):
+        w = r * (1.0 - 0.25 * k)
+        top = y - r * (1.2 - 0.35 * k)
+        canvas.fill_polygon([(x, top), (x + w, top + w * 1.4), (x - w, top + w * 1.4)], rgba(*shade))
+    else:
+      canvas.fill_circle(x, y, r, rgba(30, 70, 38))
+      canvas.fill_circle(x - r * 0.2, y - r * 0.25, r * 0.72, rgba(46, 96, 50))
+      canvas.fill_circle(x - r * 0.35, y - r * 0.4, r * 0.32, rgba(88, 140, 72, 150))
+
+
+def draw_hills_detail(canvas: DisplayList, rng: random.Random, noise: ValueNoise) -> None:
+  s = HEX_TILE_SIZE
+  # Terraces: wavy contour strokes across the slope.
+  for k in range(7):
+    y0 = (k + rng.uniform(0.2, 0.8)) * s / 7
+    phase = rng.uniform(0, math.tau)
+    pts = [(x, y0 + 9 * math.sin(x / 46 + phase) + 5 * math.sin(x / 17 + phase * 2)) for x in range(-8, s + 16, 8)]
+    canvas.stroke_polyline(pts, 4, rgba(96, 44, 30, 90))
+    canvas.stroke_polyline([(x, y - 4) for x, y in pts], 2, rgba(222, 140, 100, 70))
+  # Rocks.
+  for x, y in _scatter(rng, noise, 28, 0.0, 0.46):
+    r = rng.uniform(5, 11)
+    pts = [(x + r * math.cos(a) * rng.uniform(0.7, 1.0), y + r * 0.7 * math.sin(a) * rng.uniform(0.7, 1.0)) for a in (i * math.tau / 7 for i in range(7))]
+    canvas.fill_ellipse(x + 2, y + r * 0.5, r, r * 0.45, 0.0, rgba(0, 0, 0, 50))
+    canvas.fill_polygon(pts, rgba(128, 96, 84))
+    canvas.fill_circle(x - r * 0.3, y - r * 0.2, r * 0.35, rgba(180, 150, 136, 140))
+  # Clay brick stacks at the quarries.
+  outline = rgba(60, 30, 24, 255)
+  for x, y in _scatter(rng, noise, 4, 0.55):
+    for bx, by in ((0, 0), (20, 2), (10, -10)):
+      canvas.save()
+      canvas.translate(x + bx, y + by)
+      canvas.rotate(rng.uniform(-0.2, 0.2))
+      pts = chamfered_rect_points(20, 10, 2)
+      canvas.fill_polygon(pts, rgba(186, 82, 58))
+      canvas.stroke_polyline(pts, 2, outline, closed=True)
+      canvas.restore()
+
+
+def draw_pasture_detail(canvas: DisplayList, rng: random.Random, noise: ValueNoise) -> None:
+  # Grass tufts.
+  for x, y in _scatter(rng, noise, 220, 0.0):
+    for dx in (-3, 0, 3):
+      canvas.stroke_segment(x + dx * 0.6, y, x + dx, y - rng.uniform(4, 8), 1.6, rgba(60, 118, 46, 150))
+  # Bushes.
+  for x, y in _scatter(rng, noise, 10, 0.0, 0.42):
+    r = rng.uniform(9, 14)
+    canvas.fill_ellipse(x + 3, y + r * 0.5, r, r * 0.6, 0.0, rgba(0, 0, 0, 50))
+    canvas.fill_circle(x, y, r, rgba(52, 102, 44))
+    canvas.fill_circle(x - r * 0.3, y - r * 0.3, r * 0.45, rgba(96, 150, 70, 150))
+  # Flocks: sheep dots around a few centers on the greener ground.
+  for fx, fy in _scatter(rng, noise, 3, 0.5):
+    for _ in range(rng.randint(4, 8)):
+      x = fx + rng.gauss(0, 22)
+      y = fy + rng.gauss(0, 14)
+      d = 1 if rng.random() < 0.5 else -1
+      canvas.fill_ellipse(x + 1.5, y + 4, 8, 3.5, 0.0, rgba(0, 0, 0, 60))
+      canvas.fill_ellipse(x, y, 7.5, 5.5, 0.0, rgba(242, 244, 240))
+      canvas.fill_circle(x + 7 * d, y - 1.5, 2.8, rgba(40, 40, 46))
+
+
+def draw_fields_detail(canvas: DisplayList, rng: random.Random, noise: ValueNoise) -> None:
+  s = HEX_TILE_SIZE
+  # A patchwork of four fields between two dirt lanes. Furrows run along one axis per
+  # field, which also keeps every stroke's bounding box thin.
+  lx = rng.uniform(0.3, 0.7) * s
+  ly = rng.uniform(0.3, 0.7) * s
+  dark = rgba(150, 104, 36, 70)
+  light = rgba(255, 226, 140, 50)
+  for x0, y0, x1, y1 in ((0, 0, lx, ly), (lx, 0, s, ly), (0, ly, lx, s), (lx, ly, s, s)):
+    tint = rgba(255, 240, 190, rng.randint(0, 40)) if rng.random() < 0.5 else rgba(150, 100, 30, rng.randint(10, 40))
+    canvas.fill_polygon([(x0, y0), (x1, y0), (x1, y1), (x0, y1)], tint)
+    spacing = rng.uniform(9, 13)
+    horizontal = rng.random() < 0.5
+    pos = (y0 if horizontal else x0) + spacing / 2
+    end = y1 if horizontal else x1
+    k = 0
+    while pos < end:
+      if horizontal:
+        canvas.stroke_segment(x0 + 4, pos, x1 - 4, pos, 3.2, dark if k % 2 else light)
+      else:
+        canvas.stroke_segment(pos, y0 + 4, pos, y1 - 4, 3.2, dark if k % 2 else light)
+      pos += spacing
+      k += 1
+  lane = rgba(150, 118, 72, 200)
+  canvas.stroke_segment(lx, -10, lx, s + 10, 8, lane)
+  canvas.stroke_segment(-10, ly, s + 10, ly, 8, lane)
+  for x, y in _scatter(rng, noise, 5, 0.55):
+    canvas.fill_ellipse(x + 4, y + 6, 13, 6, 0.0, rgba(0, 0, 0, 60))
+    canvas.fill_circle(x, y, 11, rgba(214, 164, 60))
+    canvas.fill_circle(x - 3, y - 3, 5, rgba(246, 214, 120, 180))
+
+
+def draw_mountain_detail(canvas: DisplayList, rng: random.Random, noise: ValueNoise) -> None:
+  # Peaks: lit left face, shaded right face, snow on the higher ground.
+  for x, y in _scatter(rng, noise, 16, 0.5):
+    h = rng.uniform(34, 62)
+    w = h * rng.uniform(0.8, 1.1)
+    tx = x + rng.uniform(-0.15, 0.15) * w
+    canvas.fill_ellipse(x + w * 0.3, y + 4, w * 1.1, h * 0.18, 0.0, rgba(0, 0, 0, 60))
+    canvas.fill_polygon([(x - w, y), (tx, y - h), (x, y)], rgba(150, 152, 160))
+    canvas.fill_polygon([(x, y), (tx, y - h), (x + w, y)], rgba(92, 94, 104))
+    if noise.sample(x / HEX_TILE_SIZE, y / HEX_TILE_SIZE) > 0.56:
+      f = 0.3
+      canvas.fill_polygon([(tx - (tx - x + w) * f, y - h * (1 - f)), (tx, y - h), (tx + (x + w - tx) * f, y - h * (1 - f)), (tx, y - h * (1 - f * 0.6))], rgba(236, 240, 246))
+  # Boulders and ore glints.
+  for x, y in _scatter(rng, noise, 40, 0.0, 0.5):
+    r = rng.uniform(4, 9)
+    canvas.fill_ellipse(x, y, r, r * 0.7, 0.0, rgba(78, 80, 90))
+    canvas.fill_circle(x - r * 0.3, y - r * 0.25, r * 0.4, rgba(170, 174, 186, 160))
+    if rng.random() < 0.2:
+      canvas.fill_circle(x + r * 0.4, y, 1.6, rgba(120, 200, 255, 220))
+
+
+def draw_desert_detail(canvas: DisplayList, rng: random.Random, noise: ValueNoise) -> None:
+  s = HEX_TILE_SIZE
+  # Dune ripples: a lit and a shaded stroke per crest.
+  for k in range(14):
+    y0 = (k + rng.uniform(0, 1)) * s / 14
+    phase = rng.uniform(0, math.tau)
+    amp = rng.uniform(6, 14)
+    pts = [(x, y0 + amp * math.sin(x / 38 + phase)) for x in range(-8, s + 16, 8)]
+    canvas.stroke_polyline(pts, 3, rgba(255, 236, 190, 80))
+    canvas.stroke_polyline([(x, y + 3) for x, y in pts], 3, rgba(160, 120, 70, 60))
+  # Pebbles.
+  for x, y in _scatter(rng, noise, 30, 0.0):
+    r = rng.uniform(2, 5)
+    canvas.fill_ellipse(x + 1, y + r * 0.5, r, r * 0.5, 0.0, rgba(0, 0, 0, 45))
+    canvas.fill_ellipse(x, y, r, r * 0.75, 0.0, rgba(150, 122, 92))
+
+
+TERRAINS = (
+  Terrain("wood", ((0.0, (30, 58, 30)), (0.5, (58, 96, 44)), (1.0, (104, 132, 64))), draw_forest_detail),
+  Terrain("brick", ((0.0, (110, 54, 36)), (0.5, (168, 86, 54)), (1.0, (206, 136, 92))), draw_hills_detail, cells=3),
+  Terrain("sheep", ((0.0, (86, 136, 58)), (0.55, (126, 178, 76)), (1.0, (176, 206, 104))), draw_pasture_detail, cells=3),
+  Terrain("wheat", ((0.0, (178, 132, 46)), (0.5, (222, 178, 72)), (1.0, (244, 214, 120))), draw_fields_detail, octaves=4),
+  Terrain("ore", ((0.0, (70, 72, 82)), (0.5, (112, 114, 124)), (1.0, (160, 162, 170))), draw_mountain_detail),
+  Terrain("desert", ((0.0, (188, 150, 96)), (0.5, (222, 190, 134)), (1.0, (244, 222, 174))), draw_desert_detail, cells=2),
+)
+
+
+def hex_tile_filename(resource: str, variant: int) -> str:
+  return f"hex-{resource}-{variant}.png"
+
+
+def render_hex_tile(terrain: Terrain, variant: int, seed: int = 0, size: int = HEX_TILE_SIZE, backend: str = "auto", aa: str = "ssaa") -> Canvas:
+  # Deterministic for (seed, resource, variant): the field and the detail draw from their
+  # own streams, so changing one never reshuffles the other.
+  key = f"{seed}:{terrain.resource}:{variant}"
+  noise = ValueNoise(key, terrain.cells, terrain.octaves)
+  detail = DisplayList(HEX_TILE_SIZE, HEX_TILE_SIZE)
+  with detail.group(f"{terrain.detail.__name__} {variant}"):
+    terrain.detail(detail, random.Random(key + ":detail"), noise)
+  side = raster_side(size, aa)
+  canvas = canvas_backend(backend).create(side, side, antialias=aa == "analytic")
+  _paint_field(canvas, noise, terrain, size)
+  detail.replay(canvas, side / HEX_TILE_SIZE)
+  return reduce_ssaa(canvas, aa)
+
+
+def _hex_tile_png(terrain: Terrain, variant: int, seed: int, size: int, backend: str, aa: str, png: PngOptions) -> bytes:
+  return render_hex_tile(terrain, variant, seed, size, backend, aa).to_png_bytes(png)
+
+
+def generate_hex_tiles(out_dir: Path, backend: str = "auto", jobs: int = 1, force: bool = False, png: PngOptions = PngOptions(), aa: str = "ssaa", size: int = HEX_TILE_SIZE, seed: int = 0) -> list[str]:
+  # Writes hex-<resource>-<1..HEX_VARIANTS>.png per TERRAINS entry, skipping tiles whose
+  # cache entry in out_dir is current. Returns the filenames written.
+  canvas_backend(backend)
+  out_dir.mkdir(parents=True, exist_ok=True)
+  cached = {} if force else load_cache_manifest(out_dir)
+  known = {hex_tile_filename(t.resource, v) for t in TERRAINS for v in range(1, HEX_VARIANTS + 1)}
+  entries = {name: entry for name, entry in cached.items() if name not in known}
+  todo: list[tuple[str, str, Terrain, int]] = []
+  for terrain in TERRAINS:
+    settings = {"terrain": {k: v for k, v in asdict(terrain).items() if k != "detail"}, "seed": seed, "size": size, "aa": aa, "png": asdict(png)}
+    for variant in range(1, HEX_VARIANTS + 1):
+      name = hex_tile_filename(terrain.resource, variant)
+      key = render_key(("render_hex_tile", terrain.detail.__name__), {**settings, "variant": variant})
+      if cache_hit(cached.get(name), key, out_dir / name):
+        entries[name] = cached[name]
+      else:
+        todo.append((name, key, terrain, variant))
+
+  args = [[t for _, _, t, _ in todo], [v for _, _, _, v in todo], *([x] * len(todo) for x in (seed, size, backend, aa, png))]
+  if jobs > 1 and len(todo) > 1:
+    with ProcessPoolExecutor(max_workers=min(jobs, len(todo))) as pool:
+      results = list(pool.map(_hex_tile_png, *args))
+  else:
+    results = list(map(_hex_tile_png, *args))
+
+  written: list[str] = []
+  for (name, key, _, _), data in zip(todo, results):
+    write_atomic(out_dir / name, data)
+    entries[name] = {"key": key, "sha256": hashlib.sha256(data).hexdigest()}
+    written.append(name)
+  save_cache_manifest(out_dir, entries)
+  return written
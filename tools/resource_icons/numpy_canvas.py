@@ -0,0 +1,287 @@
+"""
+NumpyCanvas: the Canvas drawing API with each primitive blended in whole-array operations.
+Pick backends through backends.canvas_backend(), which only offers it when NumPy imports.
+"""
+
+from __future__ import annotations
+
+import math
+from dataclasses import dataclass
+from typing import Callable
+
+try:
+  import numpy as np
+except ImportError:  # canvas_backend() only offers NumpyCanvas when NumPy imports.
+  np = None
+
+from .canvas import Canvas, _ssaa_taps, clamp_int
+
+
+@dataclass
+class NumpyCanvas(Canvas):
+  # Same drawing API as Canvas, but each primitive builds a coverage mask for its whole
+  # bounding box and blends it in one array operation. `px` is a writable (h, w, 4) view
+  # over `buf`, so the pure-Python methods (blend_px, to_png_bytes) keep working.
+  # Anti-aliased primitives take their row spans from the Canvas rasterizers, evaluate
+  # coverage for all ring pixels in one array expression and blend a per-pixel alpha
+  # (_blend_alpha); the quantization matches blend_coverage, so output is byte-identical.
+
+  def __post_init__(self) -> None:
+    super().__post_init__()
+    self.px = np.frombuffer(self.buf, dtype=np.uint8).reshape(-1, self.w, 4)
+
+  def _blend_mask(self, x0: int, y0: int, mask: "np.ndarray", color: tuple[int, int, int, int]) -> None:
+    r, g, b, a = color
+    if a <= 0 or not mask.any():
+      return
+    mh, mw = mask.shape
+    region = self.px[y0 - self.row0 : y0 - self.row0 + mh, x0 : x0 + mw]
+    src = np.array(((r * a) // 255, (g * a) // 255, (b * a) // 255, a), dtype=np.uint16)
+    dst = region[mask].astype(np.uint16)
+    region[mask] = (src + (dst * (255 - a)) // 255).astype(np.uint8)
+
+  def _blend_alpha(self, x0: int, y0: int, alpha: "np.ndarray", color: tuple[int, int, int, int]) -> None:
+    # Blend color's RGB with a per-pixel alpha, which replaces color's own: per pixel,
+    # exactly blend_px(x, y, (r, g, b, alpha)). Alpha 0 works out to dst * 255 // 255, so
+    # the whole region is blended without masking.
+    mh, mw = alpha.shape
+    region = self.px[y0 - self.row0 : y0 - self.row0 + mh, x0 : x0 + mw]
+    a = alpha.astype(np.uint16)[..., None]
+    src = (np.array((*color[:3], 255), dtype=np.uint16) * a) // 255
+    region[...] = src + (region * (255 - a)) // 255
+
+  @staticmethod
+  def _coverage_alpha(coverage: "np.ndarray", a: int) -> "np.ndarray":
+    # blend_coverage's alpha for an array of coverages: 0 where nothing is covered.
+    level = np.floor(coverage * 255.0 + 0.5).astype(np.int64)
+    partial = np.where(coverage > 0.0, (a * level + 127) // 255, 0)
+    return np.where(coverage >= 1.0, a, partial).astype(np.uint16)
+
+  def _aa_rows(self, rows: list[tuple[int, tuple[float, float], tuple[float, float] | None]], coverage: "Callable[[np.ndarray, np.ndarray], np.ndarray]", color: tuple[int, int, int, int]) -> None:
+    # Canvas._aa_row for a whole primitive: the same per-row spans, with coverage(xs, ys)
+    # evaluated once over every ring pixel and everything blended in one _blend_alpha.
+    a = color[3]
+    spans = [(y, *bounds) for y, outer, inner in rows if (bounds := self._aa_bounds(outer, inner)) is not None]
+    if a <= 0 or not spans:
+      return
+    s = np.array(spans, dtype=np.int64)
+    min_x = int(s[:, 1].min())
+    min_y = int(s[0, 0])
+    cols = np.arange(min_x, int(s[:, 2].max()) + 1)[None, :]
+    inner = (cols >= s[:, 3:4]) & (cols <= s[:, 4:5])
+    ring = (cols >= s[:, 1:2]) & (cols <= s[:, 2:3]) & ~inner
+    ri, ci = np.nonzero(ring)
+    alpha = np.zeros((int(s[-1, 0]) - min_y + 1, cols.shape[1]), dtype=np.uint16)
+    part = alpha[s[:, 0] - min_y]
+    part[inner] = a
+    part[ri, ci] = self._coverage_alpha(coverage(ci + min_x, s[ri, 0]), a)
+    alpha[s[:, 0] - min_y] = part
+    self._blend_alpha(min_x, min_y, alpha, color)
+
+  def _grid(self, min_x: int, max_x: int, min_y: int, max_y: int) -> tuple["np.ndarray", "np.ndarray"]:
+    # Pixel centers, shaped for broadcasting to (rows, cols).
+    xs = np.arange(min_x, max_x + 1, dtype=np.float64) + 0.5
+    ys = np.arange(min_y, max_y + 1, dtype=np.float64) + 0.5
+    return xs[None, :], ys[:, None]
+
+  def fill_ellipse(self, cx: float, cy: float, rx: float, ry: float, angle_rad: float, color: tuple[int, int, int, int]) -> None:
+    if rx <= 0 or ry <= 0 or self.antialias:
+      super().fill_ellipse(cx, cy, rx, ry, angle_rad, color)
+      return
+    cos_a = math.cos(angle_rad)
+    sin_a = math.sin(angle_rad)
+
+    min_x = max(self.clip_x0, clamp_int(math.floor(cx - rx - 2), 0, self.w - 1))
+    max_x = min(self.clip_x1, clamp_int(math.ceil(cx + rx + 2), 0, self.w - 1))
+    min_y = max(self.clip_y0, clamp_int(math.floor(cy - ry - 2), 0, self.h - 1))
+    max_y = min(self.clip_y1, clamp_int(math.ceil(cy + ry + 2), 0, self.h - 1))
+    if min_x > max_x or min_y > max_y:
+      return
+
+    inv_rx2 = 1.0 / (rx * rx)
+    inv_ry2 = 1.0 / (ry * ry)
+
+    xs, ys = self._grid(min_x, max_x, min_y, max_y)
+    px = xs - cx
+    py = ys - cy
+    lx = px * cos_a + py * sin_a
+    ly = -px * sin_a + py * cos_a
+    self._blend_mask(min_x, min_y, (lx * lx) * inv_rx2 + (ly * ly) * inv_ry2 <= 1.0, color)
+
+  def fill_polygon(self, pts: list[tuple[float, float]], color: tuple[int, int, int, int]) -> None:
+    if len(pts) < 3 or self.antialias:
+      super().fill_polygon(pts, color)
+      return
+
+    min_y = max(self.clip_y0, clamp_int(math.floor(min(y for _, y in pts)), 0, self.h - 1))
+    max_y = min(self.clip_y1, clamp_int(math.ceil(max(y for _, y in pts)), 0, self.h - 1))
+    min_x = max(self.clip_x0, clamp_int(math.floor(min(x for x, _ in pts)), 0, self.w - 1))
+    max_x = min(self.clip_x1, clamp_int(math.ceil(max(x for x, _ in pts)), 0, self.w - 1))
+    if min_x > max_x or min_y > max_y:
+      return
+
+    p1 = np.array(pts, dtype=np.float64)
+    p2 = np.roll(p1, -1, axis=0)
+    x1, y1 = p1[:, 0], p1[:, 1]
+    x2, y2 = p2[:, 0], p2[:, 1]
+
+    # (rows, edges) crossings; edges that miss a row sort to the end as +inf.
+    scan_y = np.arange(min_y, max_y + 1, dtype=np.float64)[:, None] + 0.5
+    hit = ((y1 <= scan_y) & (scan_y < y2)) | ((y2 <= scan_y) & (scan_y < y1))
+    with np.errstate(divide="ignore", invalid="ignore"):
+      t = (scan_y - y1) / (y2 - y1)
+      xs = np.where(hit, x1 + t * (x2 - x1), np.inf)
+    xs.sort(axis=1)
+
+    # Spans that touch at a shared crossing both cover that pixel, and the scalar path
+    # blends it once per span, so count coverage rather than or-ing a boolean mask.
+    cols = np.arange(min_x, max_x + 1)[None, :]
+    cover = np.zeros((max_y - min_y + 1, max_x - min_x + 1), dtype=np.uint8)
+    for k in range(0, xs.shape[1] - 1, 2):
+      left = xs[:, k]
+      right = xs[:, k + 1]
+      ok = np.isfinite(right)
+      if not ok.any():
+        break
+      x0 = np.ceil(np.where(ok, left, 0.0) - 0.5)[:, None]
+      x1s = np.floor(np.where(ok, right, 0.0) - 0.5)[:, None]
+      cover += ok[:, None] & (cols >= x0) & (cols <= x1s)
+    for k in range(1, int(cover.max(initial=0)) + 1):
+      self._blend_mask(min_x, min_y, cover >= k, color)
+
+  def stroke_segment(self, x1: float, y1: float, x2: float, y2: float, width: float, color: tuple[int, int, int, int]) -> None:
+    if width <= 0 or self.antialias:
+      super().stroke_segment(x1, y1, x2, y2, width, color)
+      return
+    r = width / 2.0
+    min_x = max(self.clip_x0, clamp_int(math.floor(min(x1, x2) - r - 2), 0, self.w - 1))
+    max_x = min(self.clip_x1, clamp_int(math.ceil(max(x1, x2) + r + 2), 0, self.w - 1))
+    min_y = max(self.clip_y0, clamp_int(math.floor(min(y1, y2) - r - 2), 0, self.h - 1))
+    max_y = min(self.clip_y1, clamp_int(math.ceil(max(y1, y2) + r + 2), 0, self.h - 1))
+    if min_x > max_x or min_y > max_y:
+      return
+
+    vx = x2 - x1
+    vy = y2 - y1
+    vv = vx * vx + vy * vy
+    if vv <= 1e-6:
+      self.fill_circle(x1, y1, r, color)
+      return
+    inv_vv = 1.0 / vv
+    rr = r * r
+
+    px, py = self._grid(min_x, max_x, min_y, max_y)
+    wx = px - x1
+    wy = py - y1
+    t = np.clip((wx * vx + wy * vy) * inv_vv, 0.0, 1.0)
+    dx = px - (x1 + t * vx)
+    dy = py - (y1 + t * vy)
+    self._blend_mask(min_x, min_y, dx * dx + dy * dy <= rr, color)
+
+  def _fill_ellipse_aa(self, cx: float, cy: float, rx: float, ry: float, angle_rad: float, color: tuple[int, int, int, int]) -> None:
+    cos_a = math.cos(angle_rad)
+    sin_a = math.sin(angle_rad)
+    inv_rx2 = 1.0 / (rx * rx)
+    inv_ry2 = 1.0 / (ry * ry)
+
+    def coverage(x: "np.ndarray", y: "np.ndarray") -> "np.ndarray":
+      # Canvas._fill_ellipse_aa's distance estimate, elementwise.
+      px = (x + 0.5) - cx
+      py = (y + 0.5) - cy
+      lx = px * cos_a + py * sin_a
+      ly = -px * sin_a + py * cos_a
+      gx = lx * inv_rx2
+      gy = ly * inv_ry2
+      grad = np.sqrt(gx * gx + gy * gy)
+      k = np.sqrt(lx * gx + ly * gy)
+      with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(grad == 0.0, 1.0, 0.5 - (k - 1.0) * k / grad)
+
+    self._aa_rows(self._ellipse_aa_rows(cx, cy, rx, ry, cos_a, sin_a), coverage, color)
+
+  def _stroke_segment_aa(self, x1: float, y1: float, x2: float, y2: float, r: float, color: tuple[int, int, int, int]) -> None:
+    # The capsule's coverage is an exact distance, so the scalar path's r +- 0.5 row spans
+    # only separate coverage >= 1 (bulk blended) from <= 0 (skipped), which
+    # _coverage_alpha maps to the same alphas: evaluate the whole bounding box instead.
+    min_x = max(self.clip_x0, clamp_int(math.floor(min(x1, x2) - r - 2), 0, self.w - 1))
+    max_x = min(self.clip_x1, clamp_int(math.ceil(max(x1, x2) + r + 2), 0, self.w - 1))
+    min_y = max(self.clip_y0, clamp_int(math.floor(min(y1, y2) - r - 2), 0, self.h - 1))
+    max_y = min(self.clip_y1, clamp_int(math.ceil(max(y1, y2) + r + 2), 0, self.h - 1))
+    if min_x > max_x or min_y > max_y or color[3] <= 0:
+      return
+    vx = x2 - x1
+    vy = y2 - y1
+    inv_vv = 1.0 / (vx * vx + vy * vy)
+    px, py = self._grid(min_x, max_x, min_y, max_y)
+    t = np.clip(((px - x1) * vx + (py - y1) * vy) * inv_vv, 0.0, 1.0)
+    dx = px - (x1 + t * vx)
+    dy = py - (y1 + t * vy)
+    self._blend_alpha(min_x, min_y, self._coverage_alpha(r + 0.5 - np.sqrt(dx * dx + dy * dy), color[3]), color)
+
+  def _fill_polygon_aa(self, pts: list[tuple[float, float]], color: tuple[int, int, int, int]) -> None:
+    # Coverage 0.5 +- distance to the nearest edge, evaluated over the whole bounding box.
+    # The scalar path only measures edges near each row and bulk-fills pixels outside its
+    # edge ring, but both leave out only distances over 0.75px, where coverage clamps to
+    # the same full or empty value, so the results are identical.
+    min_y = max(self.clip_y0, clamp_int(math.floor(min(y for _, y in pts)) - 1, 0, self.h - 1))
+    max_y = min(self.clip_y1, clamp_int(math.ceil(max(y for _, y in pts)) + 1, 0, self.h - 1))
+    min_x = max(self.clip_x0, clamp_int(math.floor(min(x for x, _ in pts)) - 1, 0, self.w - 1))
+    max_x = min(self.clip_x1, clamp_int(math.ceil(max(x for x, _ in pts)) + 1, 0, self.w - 1))
+    if min_x > max_x or min_y > max_y or color[3] <= 0:
+      return
+
+    p1 = np.array(pts, dtype=np.float64)
+    p2 = np.roll(p1, -1, axis=0)
+    v = p2 - p1
+    vv = v[:, 0] * v[:, 0] + v[:, 1] * v[:, 1]
+    keep = vv > 0.0
+    x1, y1, vx, vy = p1[keep, 0], p1[keep, 1], v[keep, 0], v[keep, 1]
+    inv_vv = 1.0 / vv[keep]
+    px, py = self._grid(min_x, max_x, min_y, max_y)
+
+    # Even-odd spans from the row crossings, as in Canvas._fill_polygon_aa.
+    y2 = y1 + vy
+    hit = (vy != 0.0) & (((y1 <= py) & (py < y2)) | ((y2 <= py) & (py < y1)))
+    with np.errstate(divide="ignore", invalid="ignore"):
+      xs = np.where(hit, x1 + ((py - y1) / vy) * vx, np.inf)
+    xs.sort(axis=1)
+    cols = np.arange(min_x, max_x + 1)[None, :]
+    inside = np.zeros((max_y - min_y + 1, max_x - min_x + 1), dtype=bool)
+    for k in range(0, xs.shape[1] - 1, 2):
+      ok = np.isfinite(xs[:, k + 1])
+      if not ok.any():
+        break
+      s0 = np.ceil(np.where(ok, xs[:, k], 0.0) - 0.5)[:, None]
+      s1 = np.floor(np.where(ok, xs[:, k + 1], 0.0) - 0.5)[:, None]
+      inside |= ok[:, None] & (cols >= s0) & (cols <= s1)
+
+    dist = np.full(inside.shape, np.inf)
+    for e in range(len(x1)):
+      t = np.clip(((px - x1[e]) * vx[e] + (py - y1[e]) * vy[e]) * inv_vv[e], 0.0, 1.0)
+      dx = px - (x1[e] + t * vx[e])
+      dy = py - (y1[e] + t * vy[e])
+      np.minimum(dist, np.sqrt(dx * dx + dy * dy), out=dist)
+    self._blend_alpha(min_x, min_y, self._coverage_alpha(np.where(inside, 0.5 + dist, 0.5 - dist), color[3]), color)
+
+  def straight_rows(self, y0: int, y1: int) -> bytes:
+    band = self.px[y0:y1].astype(np.uint16)
+    alpha = band[..., 3:4]
+    rgb = np.minimum(255, (band[..., :3] * 255) // np.maximum(alpha, 1))
+    band[..., :3] = np.where(alpha > 0, rgb, 0)
+    return band.astype(np.uint8).tobytes()
+
+  def downsample(self, k: int, filt: str = "box") -> "Canvas":
+    # Separable: a weighted sum of strided row slices, then of strided column slices (over
+    # an edge-padded copy when the taps reach outside the block).
+    out_w = self.w // k
+    out_h = self.h // k
+    out = NumpyCanvas.create(out_w, out_h)
+    taps, weight = _ssaa_taps(k, filt)
+    pad = k if filt == "tent" else 0
+    src = np.pad(self.px, ((pad, pad), (pad, pad), (0, 0)), mode="edge") if pad else self.px
+    src = src.astype(np.uint32)
+    rows = sum(wt * src[pad + j : pad + j + out_h * k : k] for j, wt in taps)
+    acc = sum(wt * rows[:, pad + j : pad + j + out_w * k : k] for j, wt in taps)
+    half = weight * weight // 2 if filt == "tent" else 0
+    out.px[...] = (acc + half) // (weight * weight)
+    return out
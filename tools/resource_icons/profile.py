@@ -0,0 +1,154 @@
+"""
+Instrumented rendering for --profile: per-primitive counters and timers, attributed to
+the DisplayList groups that issued the calls.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import functools
+import math
+import time
+from dataclasses import dataclass
+from typing import Callable, Iterator
+
+try:
+  import numpy as np
+except ImportError:  # Only the NumPy blend paths below use it.
+  np = None
+
+from .canvas import Canvas, clamp_int
+from .display_list import DisplayList, _op_boxes
+
+
+@dataclass
+class PrimitiveStats:
+  calls: int = 0
+  tested: int = 0  # Pixels in the bounding boxes the rasterizer scans.
+  blended: int = 0  # Pixels actually written.
+  seconds: float = 0.0
+
+  @property
+  def waste(self) -> float:
+    # Fraction of scanned pixels that were not blended.
+    return 1.0 - self.blended / self.tested if self.tested else 0.0
+
+
+class _BlendCounter:
+  # Mixed into a Canvas class by profiled_backend(): counts every pixel that reaches a
+  # blend routine. Only the profiled subclass carries it, so normal renders pay nothing.
+  _blended = 0
+
+  def _blend_px_premul(self, x: int, y: int, pr: int, pg: int, pb: int, pa: int) -> None:
+    if pa > 0 and self.clip_x0 <= x <= self.clip_x1 and self.clip_y0 <= y <= self.clip_y1:  # type: ignore[attr-defined]
+      self._blended += 1
+    super()._blend_px_premul(x, y, pr, pg, pb, pa)  # type: ignore[misc]
+
+  def blend_span(self, y: int, x0: int, x1: int, color: tuple[int, int, int, int]) -> None:
+    if color[3] > 0 and self.clip_y0 <= y <= self.clip_y1:  # type: ignore[attr-defined]
+      self._blended += max(0, min(x1, self.clip_x1) - max(x0, self.clip_x0) + 1)  # type: ignore[attr-defined]
+    super().blend_span(y, x0, x1, color)  # type: ignore[misc]
+
+  def _blend_mask(self, x0: int, y0: int, mask: "np.ndarray", color: tuple[int, int, int, int]) -> None:
+    if color[3] > 0:
+      self._blended += int(np.count_nonzero(mask))
+    super()._blend_mask(x0, y0, mask, color)  # type: ignore[misc]
+
+  def _blend_alpha(self, x0: int, y0: int, alpha: "np.ndarray", color: tuple[int, int, int, int]) -> None:
+    self._blended += int(np.count_nonzero(alpha))
+    super()._blend_alpha(x0, y0, alpha, color)  # type: ignore[misc]
+
+
+@functools.lru_cache(maxsize=None)
+def profiled_backend(canvas_cls: type[Canvas]) -> type[Canvas]:
+  return type(f"Profiled{canvas_cls.__name__}", (_BlendCounter, canvas_cls), {})  # type: ignore[return-value]
+
+
+class RenderProfile:
+  # Totals per (group path..., primitive), gathered by replaying a recording one op at a
+  # time into a profiled canvas. The group path starts with the draw function's name.
+
+  def __init__(self) -> None:
+    self.stats: dict[tuple[str, ...], PrimitiveStats] = {}
+
+  def _add(self, path: tuple[str, ...], seconds: float, tested: int = 0, blended: int = 0) -> None:
+    entry = self.stats.setdefault(path, PrimitiveStats())
+    entry.calls += 1
+    entry.tested += tested
+    entry.blended += blended
+    entry.seconds += seconds
+
+  def replay(self, recording: DisplayList, target: Canvas, scale: float = 1.0) -> None:
+    # Same pixels as recording.replay(target, scale); target should come from profiled_backend().
+    changes = iter(recording.groups)
+    change = next(changes, None)
+    path: tuple[str, ...] = ()
+    for i, (name, args) in enumerate(recording.ops):
+      while change is not None and change[0] <= i:
+        path = change[1]
+        change = next(changes, None)
+      tested = 0
+      for x0, y0, x1, y1 in _op_boxes(name, args):
+        w = clamp_int(math.ceil(x1 * scale + 2), 0, target.w - 1) - clamp_int(math.floor(x0 * scale - 2), 0, target.w - 1) + 1
+        h = clamp_int(math.ceil(y1 * scale + 2), 0, target.h - 1) - clamp_int(math.floor(y0 * scale - 2), 0, target.h - 1) + 1
+        tested += w * h
+      before = target._blended  # type: ignore[attr-defined]
+      t0 = time.perf_counter()
+      recording.replay(target, scale, i, i + 1)
+      seconds = time.perf_counter() - t0
+      self._add((*path, name), seconds, tested, target._blended - before)  # type: ignore[attr-defined]
+
+  @contextlib.contextmanager
+  def timed(self, *path: str) -> Iterator[None]:
+    # Attribute a non-primitive step (downsampling, encoding) to path.
+    t0 = time.perf_counter()
+    try:
+      yield
+    finally:
+      self._add(path, time.perf_counter() - t0)
+
+  def totals(self, key: Callable[[tuple[str, ...]], str]) -> dict[str, PrimitiveStats]:
+    out: dict[str, PrimitiveStats] = {}
+    for path, st in self.stats.items():
+      agg = out.setdefault(key(path), PrimitiveStats())
+      agg.calls += st.calls
+      agg.tested += st.tested
+      agg.blended += st.blended
+      agg.seconds += st.seconds
+    return out
+
+  def report(self, limit: int = 25) -> str:
+    def table(title: str, rows: dict[str, PrimitiveStats], n: int | None = None) -> list[str]:
+      lines = [title, f"  {'ms':>9} {'calls':>7} {'tested px':>11} {'blended px':>11} {'waste':>6}  name"]
+      for label, st in sorted(rows.items(), key=lambda item: -item[1].seconds)[:n]:
+        waste = f"{st.waste:6.1%}" if st.tested else f"{'-':>6}"
+        lines.append(f"  {st.seconds * 1e3:9.2f} {st.calls:7d} {st.tested:11d} {st.blended:11d} {waste}  {label}")
+      return lines
+
+    total = sum(st.seconds for st in self.stats.values())
+    lines = [f"Render profile: {total * 1e3:.1f} ms total", ""]
+    lines += table("By draw function:", self.totals(lambda path: path[0]))
+    lines += ["", *table("By primitive:", self.totals(lambda path: path[-1]))]
+    lines += ["", *table(f"Hottest call sites (top {limit}):", {" > ".join(path): st for path, st in self.stats.items()}, limit)]
+    return "\n".join(lines) + "\n"
+
+  def collapsed(self) -> str:
+    # Brendan Gregg's collapsed-stack format ("a;b;c <value>"), value in microseconds;
+    # feeds flamegraph.pl, speedscope, and most flame graph viewers.
+    return "".join(f"{';'.join(path)} {round(st.seconds * 1e6)}\n" for path, st in sorted(self.stats.items()))
+
+  def speedscope(self, name: str = "resource icons") -> dict[str, object]:
+    # speedscope's file format, as one "sampled" profile weighted by time.
+    frames: dict[str, int] = {}
+    samples = []
+    weights = []
+    for path, st in sorted(self.stats.items()):
+      samples.append([frames.setdefault(frame, len(frames)) for frame in path])
+      weights.append(round(st.seconds * 1e6))
+    return {
+      "$schema": "https://www.speedscope.app/file-format-schema.json",
+      "shared": {"frames": [{"name": frame} for frame in frames]},
+      "profiles": [{"type": "sampled", "name": name, "unit": "microseconds", "startValue": 0, "endValue": sum(weights), "samples": samples, "weights": weights}],
+      "name": name,
+      "exporter": "generate_resource_icons.py",
+    }
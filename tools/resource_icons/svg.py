@@ -0,0 +1,140 @@
+"""
+SVG output: a DisplayList replayed into path data instead of pixels.
+"""
+
+from __future__ import annotations
+
+import math
+
+from .display_list import DisplayList, _op_boxes
+
+
+SVG_DIGITS = 1
+
+
+def _boxes_overlap(a: tuple[float, float, float, float], boxes: list[tuple[float, float, float, float]]) -> bool:
+  return any(a[0] < b[2] and b[0] < a[2] and a[1] < b[3] and b[1] < a[3] for b in boxes)
+
+
+class SvgCanvas:
+  # Canvas-compatible sink that turns draw calls into SVG path data instead of pixels, so
+  # a DisplayList replays into a resolution-independent icon. Fills become closed subpaths
+  # (ellipses as two arcs), strokes become round-capped, round-joined stroked paths, which
+  # is the rasterizers' capsule per segment. Coordinates are rounded to `digits` decimals
+  # and written relative to the previous rounded point, which keeps them short without
+  # rounding error accumulating along a path. Consecutive ops with the same paint share one
+  # <path>; translucent ones only while they don't overlap, since the rasterizer blends
+  # each op separately and a merged path would cover the overlap once. Fill subpaths are
+  # all wound clockwise so nonzero filling unions them (self-intersecting polygons, which
+  # the rasterizer fills even-odd, aren't used by the icons).
+
+  def __init__(self, w: int, h: int, digits: int = SVG_DIGITS) -> None:
+    self.w = w
+    self.h = h
+    self.digits = digits
+    # (paint attributes, path data tokens, op boxes, opaque) per <path>, in paint order.
+    self.paths: list[tuple[str, list[str], list[tuple[float, float, float, float]], bool]] = []
+
+  def _q(self, v: float) -> int:
+    return round(v * 10**self.digits)
+
+  def _num(self, q: int) -> str:
+    # A quantized value as the shortest decimal: 5, .5, -.25, 12.5.
+    sign = "-" if q < 0 else ""
+    whole, frac = divmod(abs(q), 10**self.digits)
+    frac_text = f"{frac:0{self.digits}d}".rstrip("0") if self.digits > 0 else ""
+    if not frac_text:
+      return f"{sign}{whole}"
+    return f"{sign}{whole or ''}.{frac_text}"
+
+  def _path(self, pts: list[tuple[float, float]]) -> list[str]:
+    # "M x y l dx dy dx dy ..." with the deltas taken between rounded points.
+    qs = [(self._q(x), self._q(y)) for x, y in pts]
+    tokens = ["M", self._num(qs[0][0]), self._num(qs[0][1])]
+    if len(qs) > 1:
+      tokens.append("l")
+      for (x0, y0), (x1, y1) in zip(qs, qs[1:]):
+        tokens += [self._num(x1 - x0), self._num(y1 - y0)]
+    return tokens
+
+  @staticmethod
+  def _paint(color: tuple[int, int, int, int], attr: str) -> str:
+    r, g, b, a = color
+    hex_color = f"{r:02x}{g:02x}{b:02x}"
+    if all(hex_color[i] == hex_color[i + 1] for i in (0, 2, 4)):
+      hex_color = hex_color[::2]
+    paint = f'{attr}="#{hex_color}"'
+    if a < 255:
+      paint += f' {attr}-opacity="{f"{a / 255:.3f}".rstrip("0").lstrip("0")}"'
+    return paint
+
+  def _add(self, paint: str, tokens: list[str], box: tuple[float, float, float, float], opaque: bool) -> None:
+    if self.paths:
+      last_paint, last_tokens, last_boxes, last_opaque = self.paths[-1]
+      if last_paint == paint and (opaque or not _boxes_overlap(box, last_boxes)):
+        last_tokens.extend(tokens)
+        last_boxes.append(box)
+        return
+    self.paths.append((paint, tokens, [box], opaque))
+
+  def blend_px(self, x: int, y: int, color: tuple[int, int, int, int]) -> None:
+    self.fill_polygon([(x, y), (x + 1, y), (x + 1, y + 1), (x, y + 1)], color)
+
+  def fill_ellipse(self, cx: float, cy: float, rx: float, ry: float, angle_rad: float, color: tuple[int, int, int, int]) -> None:
+    if rx <= 0 or ry <= 0 or color[3] == 0:
+      return
+    # Two half-ellipse arcs between the ends of the rx axis, both clockwise.
+    dx = rx * math.cos(angle_rad)
+    dy = rx * math.sin(angle_rad)
+    (x0, y0), (x1, y1) = (self._q(cx + dx), self._q(cy + dy)), (self._q(cx - dx), self._q(cy - dy))
+    arc = [self._num(self._q(rx)), self._num(self._q(ry)), self._num(self._q(math.degrees(angle_rad) % 180) if rx != ry else 0), "0", "1"]
+    tokens = ["M", self._num(x0), self._num(y0), "a", *arc, self._num(x1 - x0), self._num(y1 - y0), *arc, self._num(x0 - x1), self._num(y0 - y1), "z"]
+    ((x0, y0, x1, y1),) = _op_boxes("fill_ellipse", (cx, cy, max(rx, ry), max(rx, ry)))
+    self._add(self._paint(color, "fill"), tokens, (x0, y0, x1, y1), color[3] == 255)
+
+  def fill_circle(self, cx: float, cy: float, r: float, color: tuple[int, int, int, int]) -> None:
+    self.fill_ellipse(cx, cy, r, r, 0.0, color)
+
+  def fill_polygon(self, pts: list[tuple[float, float]], color: tuple[int, int, int, int]) -> None:
+    if len(pts) < 3 or color[3] == 0:
+      return
+    area2 = sum(x1 * y2 - x2 * y1 for (x1, y1), (x2, y2) in zip(pts, pts[1:] + pts[:1]))
+    if area2 < 0:
+      pts = pts[::-1]
+    tokens = [*self._path(pts), "z"]
+    self._add(self._paint(color, "fill"), tokens, _op_boxes("fill_polygon", (pts, color))[0], color[3] == 255)
+
+  def stroke_polyline(self, pts: list[tuple[float, float]], width: float, color: tuple[int, int, int, int], closed: bool = False) -> None:
+    if len(pts) < 2 or width <= 0 or color[3] == 0:
+      return
+    tokens = self._path(pts)
+    if closed and len(pts) > 2:
+      tokens.append("z")
+    boxes = _op_boxes("stroke_polyline", (pts, width, color, closed))
+    box = (min(b[0] for b in boxes), min(b[1] for b in boxes), max(b[2] for b in boxes), max(b[3] for b in boxes))
+    self._add(f'{self._paint(color, "stroke")} stroke-width="{self._num(self._q(width))}"', tokens, box, color[3] == 255)
+
+  def stroke_segment(self, x1: float, y1: float, x2: float, y2: float, width: float, color: tuple[int, int, int, int]) -> None:
+    self.stroke_polyline([(x1, y1), (x2, y2)], width, color)
+
+  def to_svg(self) -> str:
+    lines = [f'<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 {self.w} {self.h}" fill="none" stroke-linecap="round" stroke-linejoin="round">']
+    for paint, tokens, _, _ in self.paths:
+      d = tokens[0]
+      for prev, token in zip(tokens, tokens[1:]):
+        # Separators are only needed between two numbers, and not before a sign or before
+        # a second decimal point (".5.5" reads as .5 .5).
+        numeric = not prev.isalpha() and not token.isalpha()
+        if numeric and not token.startswith("-") and not (token.startswith(".") and "." in prev):
+          d += " "
+        d += token
+      lines.append(f'<path d="{d}" {paint}/>')
+    lines.append("</svg>")
+    return "\n".join(lines) + "\n"
+
+
+def render_svg(recording: DisplayList, digits: int = SVG_DIGITS) -> str:
+  # The icon as SVG in its recording units (a 256x256 viewBox).
+  canvas = SvgCanvas(recording.w, recording.h, digits)
+  recording.replay(canvas)
+  return canvas.to_svg()
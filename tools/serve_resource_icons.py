@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+
+"""
+Local render service for tools/generate_resource_icons.py.
+
+Renders any icon at any size in any client palette (default, each theme, colorblind) on
+request, so a device at an unusual DPI can get an exactly sized PNG:
+
+  python3 tools/serve_resource_icons.py --port 8765
+  curl 'http://127.0.0.1:8765/render/ore.png?size=48&palette=colorblind'
+
+Identical requests that arrive while a render is running wait for that render instead of
+starting their own, and at most --max-renders renders run at once (each holds a full
+supersampled raster; the rest queue). Results are kept in an LRU cache bounded by total
+PNG bytes, and every response carries a strong ETag, so clients revalidate with
+If-None-Match and get a 304. apps/server can proxy a path prefix here, or fetch the
+sizes it needs at startup to prewarm. Standard library only (NumPy, when installed,
+speeds up rendering).
+"""
+
+from __future__ import annotations
+
+import argparse
+import collections
+import hashlib
+import sys
+import threading
+from concurrent.futures import Future
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import generate_resource_icons as gen
+
+MAX_SIZE = 1024
+CACHE_BYTES = 64 << 20
+# Concurrent renders. Rendering is CPU-bound and mostly holds the GIL, so more threads
+# mostly add memory: a 1024px ssaa render alone holds a 2048x2048 raster.
+MAX_RENDERS = 2
+
+# (icon, size, palette)
+RenderKey = tuple[str, int, str]
+# (png bytes, quoted ETag)
+Rendered = tuple[bytes, str]
+
+
+class ByteLRU:
+  # Least-recently-used mapping that evicts until the stored values total at most
+  # max_bytes. Not thread-safe; IconRenderer holds its lock around every call.
+
+  def __init__(self, max_bytes: int) -> None:
+    self.max_bytes = max_bytes
+    self.bytes = 0
+    self.entries: collections.OrderedDict[RenderKey, Rendered] = collections.OrderedDict()
+
+  def get(self, key: RenderKey) -> Rendered | None:
+    entry = self.entries.get(key)
+    if entry is not None:
+      self.entries.move_to_end(key)
+    return entry
+
+  def put(self, key: RenderKey, entry: Rendered) -> None:
+    size = len(entry[0])
+    if size > self.max_bytes:
+      return
+    old = self.entries.pop(key, None)
+    if old is not None:
+      self.bytes -= len(old[0])
+    self.entries[key] = entry
+    self.bytes += size
+    while self.bytes > self.max_bytes:
+      _, evicted = self.entries.popitem(last=False)
+      self.bytes -= len(evicted[0])
+
+
+class IconRenderer:
+  # Thread-safe front end over the generator: cache lookup, coalescing of identical
+  # in-flight renders, then the render itself outside the lock, holding one of
+  # max_renders slots.
+
+  def __init__(self, backend: str = "auto", aa: str = "ssaa", png: gen.PngOptions = gen.PngOptions(), cache_bytes: int = CACHE_BYTES, max_renders: int = MAX_RENDERS) -> None:
+    gen.canvas_backend(backend)
+    self.backend = backend
+    self.aa = aa
+    self.png = png
+    self.icons = {filename.rpartition(".")[0]: draw_fn for filename, draw_fn in gen.ICONS}
+    self.palettes = gen.load_palettes()
+    self.cache = ByteLRU(cache_bytes)
+    self.lock = threading.Lock()
+    self.inflight: dict[RenderKey, Future[Rendered]] = {}
+    self.slots = threading.BoundedSemaphore(max_renders)
+    self.recordings: dict[str, gen.DisplayList] = {}
+    self.hits = 0
+    self.misses = 0
+    self.coalesced = 0
+
+  def get(self, icon: str, size: int, palette: str) -> tuple[Rendered, str]:
+    # (png, etag) plus how it was served: "hit", "miss" or "coalesced".
+    key = (icon, size, palette)
+    with self.lock:
+      entry = self.cache.get(key)
+      if entry is not None:
+        self.hits += 1
+        return entry, "hit"
+      future = self.inflight.get(key)
+      owner = future is None
+      if owner:
+        self.misses += 1
+        future = self.inflight[key] = Future()
+      else:
+        self.coalesced += 1
+    if not owner:
+      return future.result(), "coalesced"
+    try:
+      with self.slots:
+        data = self._render(icon, size, palette)
+      entry = (data, f'"{hashlib.sha256(data).hexdigest()[:32]}"')
+    except BaseException as exc:
+      with self.lock:
+        del self.inflight[key]
+      future.set_exception(exc)
+      raise
+    with self.lock:
+      # Publish to the cache and retire the in-flight entry together, so a request that
+      # arrives now finds one or the other.
+      self.cache.put(key, entry)
+      del self.inflight[key]
+    future.set_result(entry)
+    return entry, "miss"
+
+  def _recording(self, icon: str) -> gen.DisplayList:
+    with self.lock:
+      recording = self.recordings.get(icon)
+    if recording is None:
+      recording = gen.record_icon(self.icons[icon])
+      with self.lock:
+        self.recordings.setdefault(icon, recording)
+    return recording
+
+  def _render(self, icon: str, size: int, palette: str) -> bytes:
+    recording = self._recording(icon)
+    base = self.palettes["default"].get(icon)
+    target = self.palettes[palette].get(icon)
+    if base is None or target is None or base == target:
+      return gen.rasterize_icon(recording, size, self.backend, self.png, self.aa)
+    layers = gen.CoverageLayers.capture(recording, size, self.backend, self.aa)
+    return layers.composite(gen.palette_recolor(base, target)).to_png_bytes(self.png)
+
+
+def _etag_matches(header: str | None, etag: str) -> bool:
+  if not header:
+    return False
+  tags = [tag.strip() for tag in header.split(",")]
+  return "*" in tags or etag in tags or f"W/{etag}" in tags
+
+
+class RenderHandler(BaseHTTPRequestHandler):
+  # GET/HEAD /render/<icon>.png?size=<px>&palette=<name>
+  server_version = "ResourceIconRender/1"
+  renderer: IconRenderer  # Set on the subclass made by make_server().
+  quiet = False
+
+  def do_HEAD(self) -> None:
+    self._serve(body=False)
+
+  def do_GET(self) -> None:
+    self._serve(body=True)
+
+  def _serve(self, body: bool) -> None:
+    url = urlsplit(self.path)
+    prefix = "/render/"
+    if not url.path.startswith(prefix) or not url.path.endswith(".png"):
+      self.send_error(HTTPStatus.NOT_FOUND, "expected /render/<icon>.png")
+      return
+    icon = url.path[len(prefix) : -len(".png")]
+    renderer = self.renderer
+    if icon not in renderer.icons:
+      self.send_error(HTTPStatus.NOT_FOUND, f"unknown icon {icon!r} (have {', '.join(renderer.icons)})")
+      return
+    query = parse_qs(url.query)
+    try:
+      size = int(query.get("size", [str(gen.ICON_SIZE)])[-1])
+    except ValueError:
+      size = 0
+    if not 1 <= size <= MAX_SIZE:
+      self.send_error(HTTPStatus.BAD_REQUEST, f"size must be an integer from 1 to {MAX_SIZE}")
+      return
+    palette = query.get("palette", ["default"])[-1]
+    if palette not in renderer.palettes:
+      self.send_error(HTTPStatus.BAD_REQUEST, f"unknown palette {palette!r} (have {', '.join(renderer.palettes)})")
+      return
+
+    try:
+      (data, etag), how = renderer.get(icon, size, palette)
+    except Exception as exc:
+      # Requests waiting on the same render get the same error; the next one retries.
+      self.log_error("render of %s failed: %r", self.path, exc)
+      self.send_error(HTTPStatus.INTERNAL_SERVER_ERROR, "render failed")
+      return
+    if _etag_matches(self.headers.get("If-None-Match"), etag):
+      self.send_response(HTTPStatus.NOT_MODIFIED)
+      self.send_header("ETag", etag)
+      self.send_header("Cache-Control", "no-cache")
+      self.end_headers()
+      return
+    self.send_response(HTTPStatus.OK)
+    self.send_header("Content-Type", "image/png")
+    self.send_header("Content-Length", str(len(data)))
+    self.send_header("ETag", etag)
+    # Always revalidate: the art changes whenever the generator does, and a 304 is cheap.
+    self.send_header("Cache-Control", "no-cache")
+    self.send_header("X-Render-Cache", how)
+    self.end_headers()
+    if body:
+      self.wfile.write(data)
+
+  def log_message(self, format: str, *args: object) -> None:
+    if not self.quiet:
+      super().log_message(format, *args)
+
+  def log_error(self, format: str, *args: object) -> None:
+    # Errors are logged even with --quiet.
+    super().log_message(format, *args)
+
+
+def make_server(host: str, port: int, renderer: IconRenderer, quiet: bool = False) -> ThreadingHTTPServer:
+  handler = type("BoundRenderHandler", (RenderHandler,), {"renderer": renderer, "quiet": quiet})
+  return ThreadingHTTPServer((host, port), handler)
+
+
+def main(argv: list[str] | None = None) -> int:
+  parser = argparse.ArgumentParser(description="Serve resource icons rendered on demand at any size and palette.")
+  parser.add_argument("--host", default="127.0.0.1", help="address to bind (default: 127.0.0.1)")
+  parser.add_argument("--port", type=int, default=8765, help="port to listen on (default: 8765)")
+  parser.add_argument("--backend", default="auto", choices=["auto", "python", "numpy"], help="canvas backend (default: auto)")
+  parser.add_argument("--aa", default="ssaa", choices=gen.AA_MODES, help="anti-aliasing mode (default: ssaa)")
+  parser.add_argument("--max-renders", type=int, default=MAX_RENDERS, metavar="N", help=f"renders allowed to run at once; further misses queue (default: {MAX_RENDERS})")
+  parser.add_argument("--cache-mb", type=float, default=CACHE_BYTES / (1 << 20), metavar="MB", help=f"LRU cache bound in MiB of PNG data (default: {CACHE_BYTES >> 20})")
+  parser.add_argument("--quiet", action="store_true", help="don't log each request")
+  args = parser.parse_args(argv)
+  if args.cache_mb < 0:
+    parser.error("--cache-mb must be >= 0")
+  if args.max_renders < 1:
+    parser.error("--max-renders must be >= 1")
+  if args.backend not in ("auto", *gen.CANVAS_BACKENDS):
+    parser.error(f"--backend {args.backend} requires NumPy, which is not installed")
+
+  renderer = IconRenderer(args.backend, args.aa, cache_bytes=int(args.cache_mb * (1 << 20)), max_renders=args.max_renders)
+  server = make_server(args.host, args.port, renderer, args.quiet)
+  print(f"Serving http://{args.host}:{server.server_address[1]}/render/<icon>.png?size=<px>&palette=<name>", flush=True)
+  print(f"Icons: {', '.join(renderer.icons)}; palettes: {', '.join(renderer.palettes)}", flush=True)
+  try:
+    server.serve_forever()
+  except KeyboardInterrupt:
+    pass
+  finally:
+    server.server_close()
+  return 0
+
+
+if __name__ == "__main__":
+  sys.exit(main())
@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# The generator runs as a script from tools/; make its modules importable the same way.
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
@@ -0,0 +1,67 @@
+import io
+
+import pytest
+
+import generate_resource_icons as gen
+from resource_icons.backgrounds import BACKGROUNDS, write_background_png
+from resource_icons.bands import render_shared
+from resource_icons.png import decode_png
+
+BACKENDS = sorted(gen.CANVAS_BACKENDS)
+AA = ("ssaa", "analytic", "ssaa3-tent")
+
+
+@pytest.fixture(scope="module")
+def recordings():
+  return {filename: gen.record_icon(draw_fn) for filename, draw_fn in gen.ICONS}
+
+
+def pixels(canvas):
+  return bytes(canvas.buf)
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+@pytest.mark.parametrize("aa", AA)
+def test_tiled_matches_direct(recordings, backend, aa):
+  for recording in recordings.values():
+    direct = gen.rasterize_canvas(recording, 48, backend, aa)
+    assert pixels(gen.rasterize_canvas(recording, 48, backend, aa, tile=16)) == pixels(direct)
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_tile_workers_match_serial(recordings, backend):
+  # Each worker replays its tiles on a band-sized canvas (Canvas.create_band).
+  recording = recordings["wheat.png"]
+  serial = gen.rasterize_canvas(recording, 64, backend, tile=16)
+  assert pixels(gen.rasterize_canvas(recording, 64, backend, tile=16, tile_jobs=2)) == pixels(serial)
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+@pytest.mark.parametrize("aa", AA)
+@pytest.mark.parametrize("band_rows", (1, 7, 64))
+def test_bands_match_whole_image(recordings, backend, aa, band_rows):
+  recording = recordings["sheep.png"]
+  whole = decode_png(gen.rasterize_canvas(recording, 40, backend, aa).to_png_bytes())
+  out = io.BytesIO()
+  render_shared(recording, 40, 40, out, backend, aa=aa, band_rows=band_rows)
+  assert decode_png(out.getvalue()) == whole
+
+
+def test_band_workers_match_serial(recordings):
+  recording = recordings["ore.png"]
+  serial = io.BytesIO()
+  render_shared(recording, 64, 64, serial, "python", band_rows=8)
+  shared = io.BytesIO()
+  render_shared(recording, 64, 64, shared, "python", jobs=2, band_rows=8)
+  assert shared.getvalue() == serial.getvalue()
+
+
+@pytest.mark.parametrize("aa", AA)
+def test_background_does_not_depend_on_band_height(aa):
+  bg = BACKGROUNDS[0]
+  outputs = []
+  for band_rows in (5, 36):
+    out = io.BytesIO()
+    write_background_png(out, bg, 64, 36, "python", aa=aa, band_rows=band_rows)
+    outputs.append(decode_png(out.getvalue()))
+  assert outputs[0] == outputs[1]
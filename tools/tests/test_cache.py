@@ -0,0 +1,108 @@
+import pytest
+
+import generate_resource_icons as gen
+from resource_icons import cache
+
+SIZE = (16,)
+
+
+@pytest.fixture
+def cache_dir(tmp_path, monkeypatch):
+  # Keep the manifests out of tools/.cache/.
+  monkeypatch.setattr(cache, "CACHE_DIR", tmp_path / "cache")
+  return tmp_path / "cache"
+
+
+@pytest.fixture
+def sources(tmp_path, monkeypatch, cache_dir):
+  # Edit a copy of the generator's source: returns edit(filename, old, new), after which
+  # cache keys are computed over the edited copy.
+  copies = {path.name: path for path in cache.SOURCE_FILES}
+  for name, path in list(copies.items()):
+    copies[name] = tmp_path / "src" / name
+    copies[name].parent.mkdir(exist_ok=True)
+    copies[name].write_text(path.read_text())
+  monkeypatch.setattr(cache, "SOURCE_FILES", tuple(copies.values()))
+  cache._module_defs.cache_clear()
+
+  def edit(name, old, new):
+    text = copies[name].read_text()
+    assert text.count(old) == 1
+    copies[name].write_text(text.replace(old, new))
+    cache._module_defs.cache_clear()
+
+  yield edit
+  cache._module_defs.cache_clear()
+
+
+def icon_keys(**settings):
+  return {filename: gen.icon_cache_key(draw_fn, **settings) for filename, draw_fn in gen.ICONS}
+
+
+def test_second_run_renders_nothing(tmp_path, cache_dir):
+  out = tmp_path / "icons"
+  assert gen.generate_icons(out, backend="python", sizes=SIZE) == [gen.icon_filename(f, 16) for f, _ in gen.ICONS]
+  assert gen.generate_icons(out, backend="python", sizes=SIZE) == []
+  assert len([p for p in cache_dir.glob("*.json") if p.name != cache.SOURCE_INDEX]) == 1
+
+
+def test_edited_or_missing_output_is_rendered_again(tmp_path, cache_dir):
+  out = tmp_path / "icons"
+  gen.generate_icons(out, backend="python", sizes=SIZE)
+  original = (out / "ore-16.png").read_bytes()
+  (out / "ore-16.png").write_bytes(b"not a png")
+  (out / "wood-16.png").unlink()
+  assert sorted(gen.generate_icons(out, backend="python", sizes=SIZE)) == ["ore-16.png", "wood-16.png"]
+  assert (out / "ore-16.png").read_bytes() == original
+
+
+def test_settings_change_every_key(tmp_path, cache_dir):
+  out = tmp_path / "icons"
+  gen.generate_icons(out, backend="python", sizes=SIZE)
+  assert len(gen.generate_icons(out, backend="python", sizes=SIZE, png=gen.PngOptions(level=1))) == len(gen.ICONS)
+  base = icon_keys()
+  for other in (icon_keys(aa="analytic"), icon_keys(size=128), icon_keys(png=gen.PngOptions(filter="paeth"))):
+    assert not set(base.values()) & set(other.values())
+
+
+def test_draw_function_edit_invalidates_only_that_icon(sources):
+  before = icon_keys()
+  sources("generate_resource_icons.py", "def draw_sheep(canvas: DisplayList) -> None:\n", "def draw_sheep(canvas: DisplayList) -> None:\n  pass\n")
+  after = icon_keys()
+  assert [f for f in before if before[f] != after[f]] == ["sheep.png"]
+
+
+def test_primitive_edit_in_a_module_invalidates_its_users(sources):
+  # The cache key follows names across the script and the resource_icons modules.
+  before = icon_keys()
+  bg_before = cache.render_key(("write_background_png",), {})
+  sources("canvas.py", "class Canvas:\n", "class Canvas:\n  # Edited.\n")
+  after = icon_keys()
+  assert all(before[f] != after[f] for f in before)
+  sources("svg.py", "SVG_DIGITS = 1\n", "SVG_DIGITS = 1\n\n\ndef _unused() -> None:\n  pass\n")
+  assert icon_keys() == after
+  assert cache.render_key(("write_background_png",), {}) != bg_before
+
+
+def test_unchanged_source_is_not_parsed_again(sources, monkeypatch):
+  keys = icon_keys()
+  parsed = []
+  parse_defs = cache._parse_defs
+  monkeypatch.setattr(cache, "_parse_defs", lambda path: parsed.append(path.name) or parse_defs(path))
+  cache._module_defs.cache_clear()
+  assert icon_keys() == keys and parsed == []
+  sources("svg.py", "SVG_DIGITS = 1\n", "SVG_DIGITS = 1\n\n\ndef _unused() -> None:\n  pass\n")
+  assert icon_keys() == keys and parsed == ["svg.py"]
+
+
+def test_atomic_file_leaves_the_target_alone_on_error(tmp_path):
+  path = tmp_path / "icon.png"
+  path.write_bytes(b"old")
+  with pytest.raises(RuntimeError):
+    with cache.atomic_file(path) as fp:
+      fp.write(b"partial")
+      raise RuntimeError
+  assert path.read_bytes() == b"old"
+  assert [p.name for p in tmp_path.iterdir()] == ["icon.png"]
+  cache.write_atomic(path, b"new")
+  assert path.read_bytes() == b"new" and [p.name for p in tmp_path.iterdir()] == ["icon.png"]
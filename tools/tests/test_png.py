@@ -0,0 +1,71 @@
+import io
+import random
+
+import pytest
+
+from resource_icons.canvas import Canvas, rgba
+from resource_icons.png import PNG_FILTERS, PngOptions, PngWriter, decode_png, quantize_rgba
+
+
+def noise_rgba(w, h, colors=None, seed=0):
+  rng = random.Random(seed)
+  if colors is None:
+    return bytes(rng.randrange(256) for _ in range(w * h * 4))
+  return b"".join(rng.choice(colors) for _ in range(w * h))
+
+
+def encode(rgba, w, h, options=PngOptions(), rows_per_write=3):
+  out = io.BytesIO()
+  writer = PngWriter(out, w, h, options)
+  stride = w * 4
+  for y in range(0, h, rows_per_write):
+    writer.write_rows(rgba[y * stride : min(h, y + rows_per_write) * stride])
+  writer.close()
+  return out.getvalue()
+
+
+@pytest.mark.parametrize("filt", PNG_FILTERS)
+def test_rgba_round_trip(filt):
+  w, h = 37, 23
+  rgba = noise_rgba(w, h)
+  assert decode_png(encode(rgba, w, h, PngOptions(filter=filt))) == (w, h, rgba)
+
+
+def test_round_trip_across_idat_chunks():
+  w, h = 64, 64
+  rgba = noise_rgba(w, h, seed=1)
+  data = encode(rgba, w, h, PngOptions(level=0, idat_size=1000))
+  assert data.count(b"IDAT") > 10
+  assert decode_png(data) == (w, h, rgba)
+
+
+def test_writer_rejects_missing_rows():
+  writer = PngWriter(io.BytesIO(), 4, 4)
+  writer.write_rows(bytes(4 * 4 * 3))
+  with pytest.raises(ValueError):
+    writer.close()
+
+
+def test_quantize_keeps_small_palettes_exact():
+  colors = [bytes(c) for c in ((255, 0, 0, 255), (0, 128, 255, 255), (10, 20, 30, 40), (0, 0, 0, 0))]
+  rgba = noise_rgba(16, 16, colors)
+  palette, indices = quantize_rgba(rgba)
+  assert len(palette) == len(colors)
+  assert b"".join(bytes(palette[i]) for i in indices) == rgba
+
+
+def test_quantize_caps_the_palette():
+  palette, indices = quantize_rgba(noise_rgba(32, 32, seed=2), max_colors=64)
+  assert len(palette) <= 64
+  assert len(indices) == 32 * 32
+  assert max(indices) < len(palette)
+
+
+def test_indexed_icon_round_trip():
+  # Few colors: the palette path must reproduce the RGBA encoding pixel for pixel.
+  canvas = Canvas.create(24, 24)
+  canvas.fill_circle(12, 12, 9, rgba(200, 60, 40))
+  canvas.fill_polygon([(2, 2), (20, 4), (6, 18)], rgba(30, 90, 200, 128))
+  full = decode_png(canvas.to_png_bytes(PngOptions(indexed=False)))
+  indexed = decode_png(canvas.to_png_bytes(PngOptions(indexed=True)))
+  assert indexed == full == (24, 24, canvas.straight_rows(0, 24))
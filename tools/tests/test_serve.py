@@ -0,0 +1,143 @@
+import threading
+import time
+import urllib.error
+import urllib.request
+
+import pytest
+
+import serve_resource_icons as serve
+
+
+def png(n):
+  return (b"x" * n, f'"{n}"')
+
+
+def wait_for(predicate, timeout=5.0):
+  deadline = time.monotonic() + timeout
+  while not predicate():
+    assert time.monotonic() < deadline, "timed out"
+    time.sleep(0.005)
+
+
+class GatedRender:
+  # Stand-in for IconRenderer._render that blocks until released and records how many
+  # renders ran and how many ran at once.
+  def __init__(self):
+    self.release = threading.Event()
+    self.lock = threading.Lock()
+    self.calls = 0
+    self.active = 0
+    self.peak = 0
+
+  def __call__(self, icon, size, palette):
+    with self.lock:
+      self.calls += 1
+      self.active += 1
+      self.peak = max(self.peak, self.active)
+    self.release.wait(5)
+    with self.lock:
+      self.active -= 1
+    return f"{icon}-{size}-{palette}".encode()
+
+
+def run_threads(fn, args_list):
+  results = [None] * len(args_list)
+
+  def run(i, args):
+    results[i] = fn(*args)
+
+  threads = [threading.Thread(target=run, args=(i, args)) for i, args in enumerate(args_list)]
+  for t in threads:
+    t.start()
+  return threads, results
+
+
+def test_byte_lru_evicts_least_recent_and_counts_bytes():
+  lru = serve.ByteLRU(10)
+  lru.put(("a", 1, "d"), png(4))
+  lru.put(("b", 1, "d"), png(4))
+  assert lru.get(("a", 1, "d")) is not None  # a is now the most recent.
+  lru.put(("c", 1, "d"), png(4))
+  assert list(lru.entries) == [("a", 1, "d"), ("c", 1, "d")] and lru.bytes == 8
+  lru.put(("a", 1, "d"), png(2))  # Replacing an entry releases its old bytes.
+  assert lru.bytes == 6
+  lru.put(("big", 1, "d"), png(11))  # Larger than the whole cache: not stored.
+  assert lru.get(("big", 1, "d")) is None and lru.bytes == 6
+
+
+def test_identical_inflight_renders_are_coalesced():
+  renderer = serve.IconRenderer("python")
+  gate = renderer._render = GatedRender()
+  threads, results = run_threads(renderer.get, [("ore", 16, "default")] * 3)
+  wait_for(lambda: renderer.coalesced == 2)
+  gate.release.set()
+  for t in threads:
+    t.join()
+  assert gate.calls == 1
+  assert sorted(how for _, how in results) == ["coalesced", "coalesced", "miss"]
+  assert len({entry for entry, _ in results}) == 1
+  assert renderer.get("ore", 16, "default")[1] == "hit"
+
+
+def test_max_renders_bounds_concurrent_renders():
+  renderer = serve.IconRenderer("python", max_renders=2)
+  gate = renderer._render = GatedRender()
+  threads, _ = run_threads(renderer.get, [("ore", size, "default") for size in (16, 17, 18, 19)])
+  wait_for(lambda: renderer.misses == 4 and gate.active == 2)
+  time.sleep(0.05)
+  assert gate.calls == 2
+  gate.release.set()
+  for t in threads:
+    t.join()
+  assert gate.calls == 4 and gate.peak == 2
+
+
+@pytest.fixture
+def server():
+  renderer = serve.IconRenderer("python")
+  httpd = serve.make_server("127.0.0.1", 0, renderer, quiet=True)
+  thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+  thread.start()
+  yield renderer, f"http://127.0.0.1:{httpd.server_address[1]}"
+  httpd.shutdown()
+  httpd.server_close()
+
+
+def fetch(url, headers=None):
+  try:
+    with urllib.request.urlopen(urllib.request.Request(url, headers=headers or {})) as resp:
+      return resp.status, resp.headers, resp.read()
+  except urllib.error.HTTPError as err:
+    return err.code, err.headers, err.read()
+
+
+def test_etag_revalidates_with_304(server):
+  _, base = server
+  status, headers, body = fetch(f"{base}/render/ore.png?size=16")
+  assert status == 200 and body.startswith(b"\x89PNG") and headers["X-Render-Cache"] == "miss"
+  etag = headers["ETag"]
+  status, headers, body = fetch(f"{base}/render/ore.png?size=16", {"If-None-Match": etag})
+  assert (status, headers["ETag"], body) == (304, etag, b"")
+  status, headers, _ = fetch(f"{base}/render/ore.png?size=16", {"If-None-Match": '"stale"'})
+  assert (status, headers["X-Render-Cache"]) == (200, "hit")
+
+
+def test_bad_requests(server):
+  _, base = server
+  assert fetch(f"{base}/render/nope.png")[0] == 404
+  assert fetch(f"{base}/render/ore.png?size=0")[0] == 400
+  assert fetch(f"{base}/render/ore.png?palette=nope")[0] == 400
+
+
+def test_failed_render_is_a_500_and_is_retried(server, capsys):
+  renderer, base = server
+  render = renderer._render
+
+  def broken(*args):
+    raise RuntimeError("boom")
+
+  renderer._render = broken
+  assert fetch(f"{base}/render/ore.png?size=16")[0] == 500
+  assert "boom" in capsys.readouterr().err
+  renderer._render = render
+  assert fetch(f"{base}/render/ore.png?size=16")[0] == 200